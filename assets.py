@@ -0,0 +1,195 @@
+"""
+File Outline
+===============================
+This file provides the images and sounds used by Python Alchemy. Every file is read from disk once per run
+and kept in an AssetManager, which the scenes ask for their images and sounds instead of loading them
+whenever they are entered or drawn. Images are converted to the display's pixel format the first time
+they are asked for after the display is created, which makes drawing them several times faster. The files
+can also be read in a background thread while the menu is shown, so that opening a scene does not wait
+on the disk.
+
+Copyright and Usage Information
+===============================
+This file is provided solely for the private use of the teaching staff
+of CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited.
+
+This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjamin Gavriely
+"""
+from __future__ import annotations
+from typing import Iterable
+import threading
+import pygame
+
+# Every image and sound the game uses, so that they can all be preloaded
+IMAGES = ('background.png', 'Play Rect.png', 'Options Rect.png', 'Quit Rect.png', 'optionsbackground.png',
+          'trash.png', 'Logo.png', 'up.png', 'down.png')
+SOUNDS = ('click.wav', 'combine1.wav', 'combine2.wav', 'combine3.wav')
+
+
+def _is_opaque(surface: pygame.Surface) -> bool:
+    """
+    Returns whether every pixel of surface is fully opaque.
+    """
+    if not surface.get_flags() & pygame.SRCALPHA:
+        return True
+    width, height = surface.get_size()
+    return pygame.mask.from_surface(surface, 254).count() == width * height
+
+
+class AssetManager:
+    """
+    The images and sounds read so far, by file name. Reading a file is done at most once, and can happen
+    in a background thread; converting an image to the display's pixel format is done in the thread that
+    asks for the image, once the display exists.
+
+    Instance Attributes:
+    - loads: The number of files read from disk.
+    - _loaded: The images read from disk but not converted yet.
+    - _images: The images converted to the display's pixel format.
+    - _sounds: The sounds read from disk.
+    - _locks: A lock for each file name, held while the file is read or its image is converted, so that a
+      file being read in the background is not read again by the game, while other files can be.
+    - _locks_lock: Held while adding to _locks.
+
+    Representation Invariants:
+    - self._loaded.keys() and self._images.keys() have no names in common
+    """
+    loads: int
+    _loaded: dict[str, pygame.Surface]
+    _images: dict[str, pygame.Surface]
+    _sounds: dict[str, pygame.mixer.Sound]
+    _locks: dict[str, threading.Lock]
+    _locks_lock: threading.Lock
+
+    def __init__(self) -> None:
+        """
+        Initialize a manager with nothing loaded.
+        """
+        self.loads = 0
+        self._loaded = {}
+        self._images = {}
+        self._sounds = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, name: str) -> threading.Lock:
+        """
+        Returns the lock for the file called name.
+        """
+        lock = self._locks.get(name)
+        if lock is None:
+            with self._locks_lock:
+                lock = self._locks.setdefault(name, threading.Lock())
+        return lock
+
+    def _read_image(self, name: str) -> pygame.Surface:
+        """
+        Returns the image in the file called name, reading it from disk if it has not been read yet.
+
+        Preconditions:
+        - self._lock(name) is held
+        """
+        surface = self._loaded.get(name)
+        if surface is None:
+            surface = self._loaded[name] = pygame.image.load(name)
+            self.loads += 1
+        return surface
+
+    def image(self, name: str) -> pygame.Surface:
+        """
+        Returns the image in the file called name. Once the display has been created, the image is converted
+        to its pixel format, keeping per-pixel transparency only if the image has any. The returned surface
+        is shared, so it must not be drawn on.
+        """
+        surface = self._images.get(name)
+        if surface is not None:
+            return surface
+        with self._lock(name):
+            surface = self._images.get(name)
+            if surface is not None:
+                return surface
+            surface = self._read_image(name)
+            if pygame.display.get_surface() is None:
+                return surface
+            del self._loaded[name]
+            surface = self._images[name] = surface.convert() if _is_opaque(surface) else surface.convert_alpha()
+            return surface
+
+    def sound(self, name: str) -> pygame.mixer.Sound:
+        """
+        Returns the sound in the file called name.
+        """
+        sound = self._sounds.get(name)
+        if sound is None:
+            with self._lock(name):
+                sound = self._sounds.get(name)
+                if sound is None:
+                    sound = self._sounds[name] = pygame.mixer.Sound(name)
+                    self.loads += 1
+        return sound
+
+    def preload(self, images: Iterable[str] = IMAGES, sounds: Iterable[str] = SOUNDS) -> None:
+        """
+        Reads every image and sound with the given file names that has not been read yet.
+        """
+        for name in images:
+            with self._lock(name):
+                if name not in self._images:
+                    self._read_image(name)
+        for name in sounds:
+            self.sound(name)
+
+    def preload_in_background(self, images: Iterable[str] = IMAGES,
+                              sounds: Iterable[str] = SOUNDS) -> threading.Thread:
+        """
+        Starts reading every image and sound with the given file names in a background thread, and returns
+        the thread. Asking for an asset that is still being read waits for it.
+        """
+        thread = threading.Thread(target=self.preload, args=(tuple(images), tuple(sounds)), daemon=True,
+                                  name='asset preloader')
+        thread.start()
+        return thread
+
+    def memory_usage(self) -> dict[str, int]:
+        """
+        Returns the number of images and sounds held, and the bytes of pixel and sample data they take up.
+        """
+        surfaces = list(self._loaded.values()) + list(self._images.values())
+        sound_bytes = 0
+        mixer = pygame.mixer.get_init()
+        if mixer is not None:
+            # sounds are held as samples in the mixer's format, whatever the format of their files
+            frequency, sample_format, channels = mixer
+            bytes_per_second = frequency * channels * abs(sample_format) // 8
+            sound_bytes = round(sum(sound.get_length() for sound in list(self._sounds.values()))
+                                * bytes_per_second)
+        return {'images': len(surfaces),
+                'image_bytes': sum(surface.get_pitch() * surface.get_height() for surface in surfaces),
+                'sounds': len(self._sounds), 'sound_bytes': sound_bytes}
+
+    def clear(self) -> None:
+        """
+        Forgets every image and sound, so that they are read from disk again when next asked for.
+
+        Preconditions:
+        - no preloading thread is running
+        """
+        self._loaded.clear()
+        self._images.clear()
+        self._sounds.clear()
+
+
+# The images and sounds of the game
+ASSETS = AssetManager()
+
+
+if __name__ == "__main__":
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['pygame', 'threading'],
+        'allowed-io': [],  # the names (strs) of functions that call print/open/input
+        'max-line-length': 120,
+        'no-member': False
+    })
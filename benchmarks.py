@@ -0,0 +1,955 @@
+"""
+File Outline
+===============================
+This file contains the performance benchmarks for Python Alchemy. Each benchmark is a function that
+prints its own results, and they can be run from the command line by name, e.g.
+
+    python benchmarks.py discovered
+
+Running the file without arguments runs every benchmark. Large synthetic recipe packs are generated
+on the fly so that the benchmarks can measure scaling well beyond the bundled datasets.
+
+Copyright and Usage Information
+===============================
+This file is provided solely for the private use of the teaching staff
+of CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited.
+
+This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjamin Gavriely
+"""
+import inspect
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Optional, Union
+
+import packanalyzer
+import perf
+import recipeloader
+
+
+def synthetic_rows(n_elements: int, recipes_per_element: int = 2, n_defaults: int = 4,
+                   seed: int = 0) -> list[dict[str, str]]:
+    """
+    Return the rows of a synthetic recipe pack in the same format as recipes.json.
+
+    The first n_defaults elements are $DEFAULT, and every other element can be crafted from
+    recipes_per_element random pairs of elements that come before it, so every element is reachable.
+
+    :param n_elements: The total number of elements in the pack.
+    :param recipes_per_element: The number of recipes for each non-default element.
+    :param n_defaults: The number of starting elements.
+    :param seed: The seed for the random pairs, so that runs are repeatable.
+    """
+    rng = random.Random(seed)
+    rows = [{'NAME': f'element {i}', 'RECIPES': '$DEFAULT'} for i in range(n_defaults)]
+    for i in range(n_defaults, n_elements):
+        pairs = [f'element {rng.randrange(i)}, element {rng.randrange(i)}' for _ in range(recipes_per_element)]
+        rows.append({'NAME': f'element {i}', 'RECIPES': ' / '.join(pairs)})
+    return rows
+
+
+def write_synthetic_pack(path: str, n_elements: int, recipes_per_element: int = 2) -> None:
+    """
+    Write a synthetic recipe pack (see synthetic_rows) to the file at path, one row at a time.
+    """
+    with open(path, 'w') as file:
+        file.write('[\n')
+        for i, row in enumerate(synthetic_rows(n_elements, recipes_per_element)):
+            file.write((',\n' if i else '') + json.dumps(row))
+        file.write('\n]\n')
+
+
+def synthetic_graph(n_elements: int, recipes_per_element: int = 2) -> recipeloader.Graph:
+    """
+    Return a Graph built from a synthetic recipe pack with n_elements elements.
+    """
+    return recipeloader.Graph(io.StringIO(json.dumps(synthetic_rows(n_elements, recipes_per_element))))
+
+
+def _retained_memory(build: Callable[[], object],
+                     release: Callable[[object], object] = lambda result: None) -> tuple[int, int]:
+    """
+    Return the number of bytes still allocated by the object build() returns, and the peak number of
+    bytes allocated while building it. The object is passed to release once it has been measured.
+    """
+    tracemalloc.start()
+    result = build()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    release(result)
+    del result
+    return retained, peak
+
+
+def _time(func: Callable[[], object], repeat: int = 1) -> float:
+    """
+    Return the total number of seconds taken to call func repeat times.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return time.perf_counter() - start
+
+
+def _legacy_combine(g: recipeloader.Graph, discovered: list, item1: str, item2: str) -> None:
+    """
+    Repeat the per-call work Graph.combine used to do before discovered was indexed: rebuild the set of
+    discovered names, look up the vertex item1 and item2 craft, and scan the discovered list for it.
+    discovered is the plain list of discovered vertices that Graph.discovered used to be.
+    """
+    discovered_items = {vertex.item for vertex in discovered}
+    if item1 in discovered_items and item2 in discovered_items:
+        vertices = g.get_vertices()
+        crafted = g._recipes.get(recipeloader._pair_key(vertices[item1].id, vertices[item2].id))
+        if crafted is not None:
+            _ = crafted in discovered
+
+
+def benchmark_discovered(sizes: tuple[int, ...] = (1_000, 10_000, 100_000), calls: int = 200) -> None:
+    """
+    Measure Graph.combine, Graph.update and Graph.downdate with every element of synthetic packs
+    discovered, next to the list-scanning combine that was used before.
+    """
+    print('discovered  combine (us/call)  legacy combine (us/call)  update (ms)  downdate (ms)')
+    for size in sizes:
+        g = synthetic_graph(size)
+        items = list(g.get_vertices())
+        update_time = _time(lambda: g.update(items))
+        downdate_time = _time(g.downdate)
+        rng = random.Random(1)
+        pairs = [(rng.choice(items), rng.choice(items)) for _ in range(calls)]
+        combine_time = _time(lambda: [g.combine(a, b) for a, b in pairs])
+        legacy_calls = max(1, min(calls, 2_000_000 // size))
+        discovered = list(g.discovered)
+        legacy_time = _time(lambda: [_legacy_combine(g, discovered, a, b) for a, b in pairs[:legacy_calls]])
+        print(f'{len(g.discovered):>10}  {combine_time / calls * 1e6:>17.2f}  '
+              f'{legacy_time / legacy_calls * 1e6:>24.2f}  {update_time * 1e3:>11.2f}  {downdate_time * 1e3:>13.2f}')
+
+
+def benchmark_memory() -> None:
+    """
+    Report the memory retained by Graph (a _Vertex object per element and a pair-key dictionary of
+    recipes) and by CompactGraph (integer IDs and flat arrays) for the bundled packs and synthetic packs.
+    """
+    packs: list[tuple[str, Union[str, int]]] = [('recipes.json', 'recipes.json'),
+                                                 ('chemistry.json', 'chemistry.json'),
+                                                 ('synthetic 100k', 100_000)]
+    print('pack              engine        retained (MB)  bytes/recipe')
+    for name, source in packs:
+        if isinstance(source, str):
+            with open(source) as file:
+                text = file.read()
+        else:
+            text = json.dumps(synthetic_rows(source))
+        n_recipes = sum(len(recipes) for _, recipes in recipeloader.parse_rows(json.loads(text)))
+        for engine in (recipeloader.Graph, recipeloader.CompactGraph):
+            retained, _ = _retained_memory(lambda: engine(io.StringIO(text)))
+            print(f'{name:<16}  {engine.__name__:<12}  {retained / 2 ** 20:>13.2f}  {retained / n_recipes:>12.1f}')
+
+
+def _load_whole_file(path: str) -> recipeloader.Graph:
+    """
+    Build a Graph from the pack at path by materialising the whole JSON array with json.load first,
+    which is how Graph.load_vertices used to read packs.
+    """
+    g = recipeloader.Graph(io.StringIO('[]'))
+    with open(path) as file:
+        g._load_rows(recipeloader.parse_rows(json.load(file)))
+    return g
+
+
+def _load_streaming(path: str) -> recipeloader.Graph:
+    """
+    Build a Graph from the pack at path with the streaming Graph.load_vertices.
+    """
+    with open(path) as file:
+        return recipeloader.Graph(file)
+
+
+def benchmark_loading(synthetic_recipes: int = 1_000_000) -> None:
+    """
+    Compare the load time and peak memory of building a Graph with json.load against the streaming
+    loader, for the bundled packs and a synthetic pack with synthetic_recipes recipes.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic_path = os.path.join(directory, 'synthetic.json')
+        write_synthetic_pack(synthetic_path, synthetic_recipes // 2, 2)
+        print('pack               loader      load time (s)  peak memory (MB)')
+        for name, path in [('recipes.json', 'recipes.json'), ('chemistry.json', 'chemistry.json'),
+                           (f'synthetic {synthetic_recipes}', synthetic_path)]:
+            for loader_name, loader in [('json.load', _load_whole_file), ('streaming', _load_streaming)]:
+                load_time = min(_time(lambda: loader(path)) for _ in range(3))
+                _, peak = _retained_memory(lambda: loader(path))
+                print(f'{name:<17}  {loader_name:<10}  {load_time:>13.3f}  {peak / 2 ** 20:>16.2f}')
+
+
+def benchmark_startup(synthetic_recipes: int = 1_000_000) -> None:
+    """
+    Compare the time to build a graph from JSON against loading it from the binary recipe cache, for
+    the bundled packs and a synthetic pack with synthetic_recipes recipes.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        packs = []
+        for name in ('recipes.json', 'chemistry.json'):
+            packs.append((name, shutil.copy(name, directory)))
+        synthetic_path = os.path.join(directory, 'synthetic.json')
+        write_synthetic_pack(synthetic_path, synthetic_recipes // 2, 2)
+        packs.append((f'synthetic {synthetic_recipes}', synthetic_path))
+
+        print('pack               engine        json (s)  compile (s)  cached (s)  speedup')
+        for name, path in packs:
+            for engine in (recipeloader.Graph, recipeloader.CompactGraph):
+                json_time = min(_time(lambda: recipeloader.load_graph(path, engine, use_cache=False))
+                                for _ in range(3))
+                compile_time = _time(lambda: recipeloader.load_graph(path, engine))
+                cached_time = min(_time(lambda: recipeloader.load_graph(path, engine)) for _ in range(3))
+                print(f'{name:<17}  {engine.__name__:<12}  {json_time:>8.3f}  {compile_time:>11.3f}  '
+                      f'{cached_time:>10.3f}  {json_time / cached_time:>6.1f}x')
+                os.remove(recipeloader.cache_path_for(path))
+
+
+def benchmark_mapped(synthetic_recipes: int = 1_000_000, calls: int = 20_000) -> None:
+    """
+    Compare opening a pack and combining random discovered pairs with MappedGraph against loading the
+    binary cache into Graph and CompactGraph, and report the heap memory each one holds after opening.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        packs = [('recipes.json', shutil.copy('recipes.json', directory))]
+        synthetic_path = os.path.join(directory, 'synthetic.json')
+        write_synthetic_pack(synthetic_path, synthetic_recipes // 2, 2)
+        packs.append((f'synthetic {synthetic_recipes}', synthetic_path))
+
+        print('pack               engine        open (ms)  heap (MB)  combine (us/call)')
+        for name, path in packs:
+            recipeloader.compile_to_cache(path)
+            items = list(recipeloader.load_graph(path, recipeloader.CompactGraph).get_vertices())
+            rng = random.Random(2)
+            pairs = [(rng.choice(items), rng.choice(items)) for _ in range(calls)]
+            for engine in (recipeloader.Graph, recipeloader.CompactGraph, recipeloader.MappedGraph):
+                open_time = min(_time(lambda: _close(recipeloader.load_graph(path, engine))) for _ in range(3))
+                heap, _ = _retained_memory(lambda: recipeloader.load_graph(path, engine), _close)
+                g = recipeloader.load_graph(path, engine)
+                try:
+                    g.update(items)
+                    combine_time = _time(lambda: [g.combine(a, b) for a, b in pairs])
+                finally:
+                    _close(g)
+                print(f'{name:<17}  {engine.__name__:<12}  {open_time * 1e3:>9.2f}  {heap / 2 ** 20:>9.2f}  '
+                      f'{combine_time / calls * 1e6:>17.2f}')
+
+
+def _close(graph: object) -> None:
+    """
+    Close graph if it is a MappedGraph, which holds its cache file open until it is closed.
+    """
+    if isinstance(graph, recipeloader.MappedGraph):
+        graph.close()
+
+
+def _headless_pygame() -> None:
+    """
+    Select SDL's dummy video and audio drivers, so the game's scenes can run without a display or sound card.
+    Must be called before pygame is initialised.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+
+def _current_rss() -> int:
+    """
+    Return the resident set size of this process in bytes, or 0 where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return 0
+
+
+def benchmark_scene_soak(transitions: int = 4000, report_every: int = 500) -> None:
+    """
+    Click through menu -> play -> menu -> options -> menu repeatedly with the SceneManager and report the
+    Python heap, the process RSS and the call stack depth as the number of transitions grows. With
+    scenes released on every transition all three stay flat.
+    """
+    _headless_pygame()
+    import pygame
+    import main
+    import perf
+
+    # scene entry timings are kept in bounded windows; use a small one so they fill up early in the run
+    perf.TIMINGS = perf.Timings(max_samples=100)
+    pygame.init()
+    screen = pygame.display.set_mode((1200, 700))
+    manager = main.SceneManager(screen, main.GameState(False, [], []))
+
+    def click(pos: tuple[int, int]) -> None:
+        manager.run_frame([pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=pos)])
+        manager.run_frame([])
+
+    # menu PLAY, play logo, menu OPTIONS, options BACK
+    clicks = [(640, 250), (20, 20), (640, 400), (1100, 660)]
+    tracemalloc.start()
+    print('transitions  heap (MB)  rss (MB)  stack depth')
+    for done in range(transitions + 1):
+        if done % report_every == 0:
+            heap, _ = tracemalloc.get_traced_memory()
+            print(f'{done:>11}  {heap / 2 ** 20:>9.2f}  {_current_rss() / 2 ** 20:>8.1f}  '
+                  f'{len(inspect.stack(0)):>11}')
+        if done < transitions:
+            click(clicks[done % len(clicks)])
+    tracemalloc.stop()
+    pygame.quit()
+
+
+def _scene_frame_times(scene: str, frames: int, setup: Callable[[object], None] = lambda scene: None,
+                       before_frame: Callable[[], None] = lambda: None,
+                       updated: Optional[list[int]] = None) -> list[float]:
+    """
+    Enter the scene called scene headlessly, call setup on it, then run frames frames without input,
+    calling before_frame before each one, and return the time each frame took in seconds. If updated is
+    given, the number of pixels of the display updated by each frame is appended to it.
+    """
+    _headless_pygame()
+    import pygame
+    import main
+
+    pygame.init()
+    screen = pygame.display.set_mode((1200, 700))
+    manager = main.SceneManager(screen, main.GameState(False, [], []), scene)
+    setup(manager.scene)
+    times = []
+    for _ in range(frames):
+        before_frame()
+        start = time.perf_counter()
+        manager.run_frame([])
+        times.append(time.perf_counter() - start)
+        if updated is not None:
+            updated.append(screen.get_width() * screen.get_height() if manager.last_update is None
+                           else sum(rect.width * rect.height for rect in manager.last_update))
+    return times
+
+
+def benchmark_text_cache(frames: int = 300) -> None:
+    """
+    Measure the frame time of each scene with the font and text caches, and with both caches emptied
+    before every frame so that every font is loaded and every label rendered again, as they were before
+    the caches existed.
+    """
+    _headless_pygame()
+    import rendercache
+
+    print('scene    cached (ms/frame)  uncached (ms/frame)  text hits  text misses')
+    for scene in ('menu', 'options', 'play'):
+        rendercache.clear()
+        before = rendercache.TEXT_CACHE.stats()
+        cached = _scene_frame_times(scene, frames)
+        after = rendercache.TEXT_CACHE.stats()
+        uncached = _scene_frame_times(scene, frames, before_frame=rendercache.clear)
+        print(f'{scene:<7}  {sum(cached) / frames * 1e3:>17.3f}  {sum(uncached) / frames * 1e3:>19.3f}  '
+              f'{after["hits"] - before["hits"]:>9}  {after["misses"] - before["misses"]:>11}')
+
+
+def _discover_everything(scene: object) -> None:
+    """
+    Mark every element of the play scene's graph as discovered, so that its sidebar is full.
+    """
+    scene.g.update(list(scene.g.get_vertices()))
+
+
+def benchmark_outline_cache(spawns: int = 3000) -> None:
+    """
+    Measure spawning elements onto the play scene's board, as clicking the sidebar or combining does, with
+    the outlined label cache, and with it emptied before every spawn so that every label is composed again as
+    it was before the cache existed. The labels cycle through the first ten discovered elements, like a
+    player spawning the same few elements again and again. The text cache stays warm in both runs.
+    """
+    _headless_pygame()
+    import main
+    import rendercache
+
+    scenes = []
+
+    def keep_scene(scene: object) -> None:
+        _discover_everything(scene)
+        scenes.append(scene)
+
+    _scene_frame_times('play', 1, keep_scene)
+    scene = scenes[-1]
+    labels = [vertex.item.title() for vertex in list(scene.g.discovered)[:10]]
+
+    def spawn_times(before_spawn: Callable[[], None]) -> list[float]:
+        """Returns the time each of spawns spawns took, calling before_spawn before each one."""
+        times = []
+        for i in range(spawns):
+            before_spawn()
+            start = time.perf_counter()
+            scene.board.add(main.Element(400, 300, 140, 45, labels[i % len(labels)], scene.font,
+                                         scene.text_color, scene.item_color))
+            times.append(time.perf_counter() - start)
+            if len(scene.board) >= 20:
+                # the trash bin, so the board does not grow over the run
+                scene.board.clear()
+        return times
+
+    rendercache.OUTLINE_CACHE.clear()
+    before = rendercache.OUTLINE_CACHE.stats()
+    cached = spawn_times(lambda: None)
+    after = rendercache.OUTLINE_CACHE.stats()
+    composed = spawn_times(rendercache.OUTLINE_CACHE.clear)
+    print('outlines  p50 (us/spawn)  p95 (us/spawn)  label hits  label misses')
+    for name, times in (('cached', cached), ('composed', composed)):
+        print(f'{name:<8}  {perf.percentile(times, 0.5) * 1e6:>14.1f}  {perf.percentile(times, 0.95) * 1e6:>14.1f}'
+              + (f'  {after["hits"] - before["hits"]:>10}  {after["misses"] - before["misses"]:>12}'
+                 if name == 'cached' else ''))
+
+
+def benchmark_sidebar(sizes: tuple[int, ...] = (100, 10_000, 150_000), frames: int = 300) -> None:
+    """
+    Measure the play scene frame time with sizes discovered elements, both when the sidebar is still and
+    when it is paged down every few frames so that it is always gliding and new rows keep scrolling into view.
+    """
+    print('discovered  still p50 (ms)  still p95 (ms)  scrolling p50 (ms)  scrolling p95 (ms)')
+    for size in sizes:
+        g = synthetic_graph(size)
+        g.update(list(g.get_vertices()))
+        scenes = []
+
+        def use_graph(scene: object) -> None:
+            scene.g = scene.discovered_list.graph = g
+            scenes.append(scene)
+
+        def page_down() -> None:
+            scene = scenes[-1]
+            if scene.discovered_list.offset == scene.discovered_list.target * scene.discovered_list.row_height:
+                scene.discovered_list.scroll(scene.discovered_list.visible_rows)
+
+        still = _scene_frame_times('play', frames, use_graph)
+        scrolling = _scene_frame_times('play', frames, use_graph, page_down)
+        print(f'{size:>10}  {perf.percentile(still, 0.5) * 1e3:>14.3f}  {perf.percentile(still, 0.95) * 1e3:>14.3f}  '
+              f'{perf.percentile(scrolling, 0.5) * 1e3:>18.3f}  {perf.percentile(scrolling, 0.95) * 1e3:>18.3f}')
+
+
+def benchmark_dirty_rects(frames: int = 300, board_elements: int = 20) -> None:
+    """
+    Measure the play scene's frame time and the share of the screen it updates per frame, with
+    board_elements elements on the board, when nothing happens, when one element is dragged and when the
+    sidebar is scrolling. Each is measured drawing only what changed, and redrawing the whole screen every
+    frame as the scene did before.
+    """
+    _headless_pygame()
+    import main
+
+    print('scenario   redraw   p50 (ms/frame)  p95 (ms/frame)  screen updated')
+    for scenario in ('idle', 'drag', 'scroll'):
+        for redraw_all in (False, True):
+            scenes = []
+            updated = []
+
+            def fill_board(scene: object) -> None:
+                _discover_everything(scene)
+                rng = random.Random(0)
+                for vertex in list(scene.g.discovered)[:board_elements]:
+                    scene.board.add(main.Element(rng.randint(0, 800), rng.randint(0, 600), 140, 45,
+                                                 vertex.item.title(), scene.font, scene.text_color,
+                                                 scene.item_color))
+                scenes.append(scene)
+
+            def step(scenario: str = scenario, redraw_all: bool = redraw_all) -> None:
+                scene = scenes[-1]
+                scene.redraw_all = scene.redraw_all or redraw_all
+                if scenario == 'drag':
+                    # wander back and forth so the element stays on the board
+                    scene.board.move(next(iter(scene.board)), 3 if len(updated) % 100 < 50 else -3,
+                                     2 if len(updated) % 40 < 20 else -2)
+                elif scenario == 'scroll':
+                    scene.discovered_list.scroll(1 if len(updated) % 200 < 100 else -1)
+
+            times = _scene_frame_times('play', frames, fill_board, step, updated)
+            print(f'{scenario:<9}  {"all" if redraw_all else "dirty":<6}  {perf.percentile(times, 0.5) * 1e3:>14.3f}  '
+                  f'{perf.percentile(times, 0.95) * 1e3:>14.3f}  {sum(updated) / len(updated) / (1200 * 700):>14.1%}')
+
+
+def benchmark_frame_pacing(seconds: float = 3.0) -> None:
+    """
+    Leave the menu and the play scene open without input for the given number of seconds each, running
+    the real game loop, and measure its frame rate and CPU use unthrottled as it was before frame pacing,
+    with only the frame cap, and with the frame cap and idle waiting.
+    """
+    _headless_pygame()
+    import pygame
+    import main
+
+    pygame.init()
+    screen = pygame.display.set_mode((1200, 700))
+    print('scene    loop              frames    fps    CPU')
+    for scene in ('menu', 'play'):
+        for name, max_fps, idle_timeout in (('unthrottled', 0, 0), ('60 fps cap', 60, 0),
+                                            ('cap + idle wait', 60, 250)):
+            manager = main.SceneManager(screen, main.GameState(False, [], []), scene, max_fps, idle_timeout)
+            pygame.event.clear()
+            pygame.time.set_timer(pygame.QUIT, int(seconds * 1000), 1)
+            manager.run()
+            stats = perf.FRAMES.summary()
+            print(f'{scene:<7}  {name:<15}  {stats["frames"]:>8}  {stats["fps"]:>5.0f}  {stats["cpu_percent"]:>4.0f}%')
+
+
+def benchmark_board(n_elements: int = 10_000, queries: int = 2_000) -> None:
+    """
+    Measure finding the element under the mouse, finding the elements touching a dropped one and moving an
+    element, with n_elements elements spread over a board ten screens in size, using the board's spatial
+    hash and scanning every element as play did before.
+    """
+    _headless_pygame()
+    import pygame
+    import board
+
+    class Box:
+        """A stand-in for a board element."""
+        def __init__(self, x: int, y: int) -> None:
+            self.rect = pygame.Rect(x, y, 140, 45)
+
+        def move_ip(self, dx: int, dy: int) -> None:
+            self.rect.move_ip(dx, dy)
+
+    rng = random.Random(0)
+    boxes = [Box(rng.randrange(3600), rng.randrange(2100)) for _ in range(n_elements)]
+    grid = board.Board()
+    for box in boxes:
+        grid.add(box)
+    points = [(rng.randrange(3600), rng.randrange(2100)) for _ in range(queries)]
+    dropped = [rng.choice(boxes) for _ in range(queries)]
+
+    def scan_hit() -> None:
+        for pos in points:
+            hit = None
+            for box in boxes:
+                if box.rect.collidepoint(pos):
+                    hit = box
+
+    def scan_collide() -> None:
+        for held in dropped:
+            [box for box in boxes if box is not held and box.rect.colliderect(held.rect)]
+
+    def grid_move() -> None:
+        for held in dropped:
+            grid.move(held, 7, -3)
+        for held in dropped:
+            grid.move(held, -7, 3)
+
+    rows = [('hit-test under the mouse', _time(scan_hit), _time(lambda: [grid.topmost_at(pos) for pos in points])),
+            ('collisions with a drop', _time(scan_collide),
+             _time(lambda: [grid.colliding(held.rect, held) for held in dropped])),
+            ('move', None, _time(grid_move) / 2)]
+    print(f'{f"{n_elements} elements":<26}{"scan (us/query)":>17}{"spatial hash (us/query)":>25}')
+    for name, scan, hashed in rows:
+        scanned = '-' if scan is None else f'{scan / queries * 1e6:.1f}'
+        print(f'{name:<26}{scanned:>17}{hashed / queries * 1e6:>25.2f}')
+
+
+def benchmark_camera(n_elements: int = 5_000, frames: int = 200) -> None:
+    """
+    Measure the play scene's frame time with n_elements elements spread over the whole board while the
+    camera pans every frame, at zoom 1 and zoomed out, drawing only the elements in view and drawing every
+    element on the board as play did before.
+    """
+    _headless_pygame()
+    import main
+    import rendercache
+
+    print('zoom  drawn      p50 (ms/frame)  p95 (ms/frame)  label resizes')
+    for zoom in (1.0, 0.5):
+        for culled in (True, False):
+            scenes = []
+
+            def fill_board(scene: object, zoom: float = zoom, culled: bool = culled) -> None:
+                rng = random.Random(0)
+                names = [vertex.item.title() for vertex in scene.g.get_vertices().values()]
+                world = scene.camera.world
+                for _ in range(n_elements):
+                    scene.board.add(main.Element(rng.randrange(world.width - 200), rng.randrange(world.height - 50),
+                                                 140, 45, rng.choice(names), scene.font, scene.text_color,
+                                                 scene.item_color))
+                scene.camera.zoom_at((0, 0), zoom)
+                if not culled:
+                    scene.board.ordered_within = lambda rect: list(scene.board.ordered())
+                scenes.append(scene)
+
+            def pan() -> None:
+                scenes[-1].camera.pan(-5, -3)
+
+            before = rendercache.SCALED_CACHE.misses
+            times = _scene_frame_times('play', frames, fill_board, pan)
+            print(f'{zoom:<4}  {"in view" if culled else "all":<9}  {perf.percentile(times, 0.5) * 1e3:>14.2f}  '
+                  f'{perf.percentile(times, 0.95) * 1e3:>14.2f}  {rendercache.SCALED_CACHE.misses - before:>13}')
+
+
+def benchmark_assets(frames: int = 100, blits: int = 200) -> None:
+    """
+    Measure what the asset manager saves: the menu's frame time with its images read from disk every
+    frame as before and read once, how long blitting the menu background takes as loaded and converted to
+    the display format, and how long entering each scene takes with nothing loaded and after preloading.
+    """
+    _headless_pygame()
+    import pygame
+    import assets
+
+    reloaded = _scene_frame_times('menu', frames, before_frame=assets.ASSETS.clear)
+    cached = _scene_frame_times('menu', frames)
+    print(f'menu frame, images read every frame: {perf.percentile(reloaded, 0.5) * 1e3:.2f} ms (p50)')
+    print(f'menu frame, images read once:        {perf.percentile(cached, 0.5) * 1e3:.2f} ms (p50)')
+
+    screen = pygame.display.get_surface()
+    loaded = pygame.image.load('background.png')
+    converted = assets.ASSETS.image('background.png')
+    for name, surface in (('as loaded', loaded), ('converted', converted)):
+        seconds = _time(lambda surface=surface: screen.blit(surface, (0, 0)), blits)
+        print(f'background blit, {name}: {seconds / blits * 1e3:.3f} ms')
+
+    import main
+    for scene in ('menu', 'options', 'play'):
+        assets.ASSETS.clear()
+        cold = _time(lambda scene=scene: main.SCENES[scene](screen, main.GameState(False, [], [])).enter())
+        assets.ASSETS.preload()
+        warm = _time(lambda scene=scene: main.SCENES[scene](screen, main.GameState(False, [], [])).enter())
+        print(f'enter {scene:<8} nothing loaded {cold * 1e3:>7.2f} ms, preloaded {warm * 1e3:>7.2f} ms')
+
+    assets.ASSETS.clear()
+    start = time.perf_counter()
+    thread = assets.ASSETS.preload_in_background()
+    menu_ready = _time(lambda: main.SCENES['menu'](screen, main.GameState(False, [], [])).enter())
+    thread.join()
+    print(f'background preload: menu entered after {menu_ready * 1e3:.2f} ms, everything read after '
+          f'{(time.perf_counter() - start) * 1e3:.2f} ms')
+    print(f'memory: {assets.ASSETS.memory_usage()}')
+
+
+def benchmark_buttons(frames: int = 300, checks: int = 20_000) -> None:
+    """
+    Measure the menu and options frame times while the mouse moves on and off a button, with the buttons
+    kept between frames and with them built again every frame as they were before, and the text lookups
+    each frame makes. Also measure one hover check and draw of a button.
+    """
+    _headless_pygame()
+    import pygame
+    import main
+    import rendercache
+    from button import ButtonStay
+
+    pygame.init()
+    screen = pygame.display.set_mode((1200, 700))
+    hovers = {'menu': (640, 250), 'options': (1100, 190)}
+    print('scene    buttons   p50 (ms/frame)  p95 (ms/frame)  text lookups/frame')
+    for scene, pos in hovers.items():
+        for name in ('kept', 'rebuilt'):
+            manager = main.SceneManager(screen, main.GameState(False, [], []), scene)
+            times = []
+            before = rendercache.TEXT_CACHE.stats()
+            for frame in range(frames):
+                event_pos = pos if frame % 2 else (5, 5)
+                events = [pygame.event.Event(pygame.MOUSEMOTION, pos=event_pos, rel=(0, 0), buttons=(0, 0, 0))]
+                start = time.perf_counter()
+                if name == 'rebuilt':
+                    manager.scene._build_buttons()
+                manager.run_frame(events)
+                times.append(time.perf_counter() - start)
+            after = rendercache.TEXT_CACHE.stats()
+            lookups = (after['hits'] + after['misses'] - before['hits'] - before['misses']) / frames
+            print(f'{scene:<8} {name:<8} {perf.percentile(times, 0.5) * 1e3:>15.3f}  '
+                  f'{perf.percentile(times, 0.95) * 1e3:>14.3f}  {lookups:>18.1f}')
+
+    button = ButtonStay(image=None, pos=(600, 350), text_input="item1", font=main.get_font(24),
+                        base_color="Black", hovering_color="White")
+    points = [(600, 350), (5, 5)]
+    seconds = _time(lambda: [button.changecolor(points[i % 2]) for i in range(checks)])
+    print(f'hover check: {seconds / checks * 1e6:.2f} us')
+    seconds = _time(lambda: button.update(screen), checks // 10)
+    print(f'toggle button draw: {seconds / (checks // 10) * 1e6:.2f} us')
+
+
+def benchmark_options_layer(frames: int = 300) -> None:
+    """
+    Measure the options frame time, with a combo text field selected, when the background and labels are
+    drawn from the static layer and when the layer is composed again before every frame, which draws the
+    same labels the options menu drew every frame before it had the layer.
+    """
+    _headless_pygame()
+    import rendercache
+    scenes = []
+
+    def select_field(scene: object) -> None:
+        scene.items[0] = 'Water and fire'
+        scene._select_item([True, False, False])
+        scenes.append(scene)
+
+    def lookups() -> int:
+        counters = rendercache.TEXT_CACHE.stats()
+        return counters['hits'] + counters['misses']
+
+    # entering the scene looks up text too, which is not part of any frame
+    before = lookups()
+    _scene_frame_times('options', 0, select_field)
+    entering = lookups() - before
+
+    print('options        p50 (ms/frame)  p95 (ms/frame)  text lookups/frame')
+    for name in ('static layer', 'composed'):
+        before = lookups()
+        times = _scene_frame_times('options', frames, select_field,
+                                   (lambda: scenes[-1]._compose_static_layer()) if name == 'composed' else lambda: None)
+        per_frame = (lookups() - before - entering) / frames
+        print(f'{name:<13}  {perf.percentile(times, 0.5) * 1e3:>14.3f}  {perf.percentile(times, 0.95) * 1e3:>14.3f}  '
+              f'{per_frame:>18.1f}')
+
+
+def _all_pairs_craftable(g: recipeloader.Graph) -> int:
+    """
+    Count the recipes that make an undiscovered element from discovered ones by trying every pair of
+    discovered elements, the only way to find them before Graph kept track of them.
+    """
+    discovered, recipes = list(g.discovered), g._recipes
+    count = 0
+    for i, vertex1 in enumerate(discovered):
+        for vertex2 in discovered[i:]:
+            result = recipes.get(recipeloader._pair_key(vertex1.id, vertex2.id))
+            if result is not None and result not in g.discovered:
+                count += 1
+    return count
+
+
+def benchmark_craftable(sizes: tuple[int, ...] = (100, 1_000, 3_000), synthetic_elements: int = 100_000,
+                        combines: int = 200) -> None:
+    """
+    Measure finding the craftable recipes of recipes.json, chemistry.json and a synthetic pack with sizes
+    elements discovered, or half of their elements for packs that are smaller: trying every pair of
+    discovered elements, building Graph's craftable recipes and discoverable elements from scratch, asking
+    for their counts once built, and the cost they add to each Graph.combine that keeps them up to date.
+    """
+    packs = [('recipes.json', recipeloader.load_graph('recipes.json', recipeloader.Graph, use_cache=False)),
+             ('chemistry.json', recipeloader.load_graph('chemistry.json', recipeloader.Graph, use_cache=False)),
+             (f'synthetic {synthetic_elements}', synthetic_graph(synthetic_elements))]
+    print('pack              discovered  craftable  all pairs (ms)  build (ms)  count (us)  remaining  '
+          'remaining build (ms)  combine (us)  indexed combine (us)')
+    for name, g in packs:
+        defaults = g.snapshot()
+        others = [item for item in g.get_vertices() if item not in defaults]
+        # small packs are measured half discovered instead of at the sizes they do not reach
+        for size in sorted({min(size, len(g.get_vertices()) // 2) for size in sizes}):
+            base = list(defaults) + others[:size - len(defaults)]
+            g.restore(base)
+            scan_time = _time(lambda: _all_pairs_craftable(g))
+            build_time = _time(g.craftable_count)
+            count_time = _time(g.craftable_count, 10_000) / 10_000
+            craftable = g.craftable_count()
+            assert craftable == _all_pairs_craftable(g)
+            remaining_time = _time(g.remaining_discoverable)
+            remaining = g.remaining_discoverable()
+
+            pairs = [(item1, item2) for item1, item2, _ in g.craftable()][:combines]
+            g.restore(base)
+            plain_time = _time(lambda: [g.combine(item1, item2) for item1, item2 in pairs])
+            g.restore(base)
+            g.craftable_count()
+            g.remaining_discoverable()
+            indexed_time = _time(lambda: [g.combine(item1, item2) for item1, item2 in pairs])
+            calls = max(1, len(pairs))
+            print(f'{name:<16}  {size:>10}  {craftable:>9}  {scan_time * 1e3:>14.2f}  {build_time * 1e3:>10.2f}  '
+                  f'{count_time * 1e6:>10.3f}  {remaining:>9}  {remaining_time * 1e3:>20.2f}  '
+                  f'{plain_time / calls * 1e6:>12.2f}  {indexed_time / calls * 1e6:>20.2f}')
+
+
+def _scan_recipes_for(g: recipeloader.Graph, item: str) -> list[tuple[str, str]]:
+    """
+    Find the pairs of elements that combine into item by looking at every recipe of g, the only way to
+    find them before Graph indexed recipes by their result.
+    """
+    by_id = list(g.get_vertices())
+    return [(by_id[key >> 32], by_id[key & 0xFFFFFFFF]) for key, result in g._recipes.items() if result.item == item]
+
+
+def benchmark_recipe_lookup(synthetic_sizes: tuple[int, ...] = (100_000, 500_000), calls: int = 2_000) -> None:
+    """
+    Measure finding the recipes of random elements with Graph.recipes_for against scanning every recipe,
+    for recipes.json and synthetic packs of synthetic_sizes elements with two recipes each, along with
+    the time to build each graph and the memory it retains, which include the index.
+    """
+    print('pack              recipes  build (s)  retained (MB)  recipes_for (us)  scan (ms)')
+    packs: list[tuple[str, Callable[[], recipeloader.Graph]]] = [
+        ('recipes.json', lambda: recipeloader.load_graph('recipes.json', recipeloader.Graph, use_cache=False))]
+    packs += [(f'synthetic {size}', lambda size=size: synthetic_graph(size)) for size in synthetic_sizes]
+    for name, build in packs:
+        build_time = _time(build)
+        retained, _ = _retained_memory(build)
+        g = build()
+        rng = random.Random(3)
+        items = list(g.get_vertices())
+        sample = [rng.choice(items) for _ in range(calls)]
+
+        def look_up() -> None:
+            # the results are dropped straight away, since keeping thousands of lists alive would set off full
+            # garbage collections of the whole graph and time those instead
+            for item in sample:
+                g.recipes_for(item)
+
+        lookup_time = _time(look_up)
+        scans = max(1, min(calls, 2_000_000 // len(g._recipes)))
+        scan_time = _time(lambda: [_scan_recipes_for(g, item) for item in sample[:scans]])
+        print(f'{name:<16}  {len(g._recipes):>7}  {build_time:>9.2f}  {retained / 2 ** 20:>13.1f}  '
+              f'{lookup_time / calls * 1e6:>16.2f}  {scan_time / scans * 1e3:>9.2f}')
+
+
+def benchmark_crafting(synthetic_sizes: tuple[int, ...] = (100_000, 500_000), queries: int = 2_000,
+                       combos: int = 200) -> None:
+    """
+    Measure Graph's crafting depths and crafting plans for recipes.json, chemistry.json and synthetic packs
+    of synthetic_sizes elements, starting from the $DEFAULT elements: finding the depths of every element
+    from scratch, which includes indexing the recipes each element is used in, then the costs the plans come
+    from, asking for the plans of random elements that can be made, and keeping the depths and costs up to
+    date as combos are added with Graph.new_combo, compared with finding both again from scratch.
+    """
+    print('pack              elements  recipes  max depth  depths (ms)  plan costs (ms)  plan (us)  plan steps  '
+          'new_combo (us)  rebuild (ms)')
+    packs = [('recipes.json', recipeloader.load_graph('recipes.json', recipeloader.Graph, use_cache=False)),
+             ('chemistry.json', recipeloader.load_graph('chemistry.json', recipeloader.Graph, use_cache=False))]
+    packs += [(f'synthetic {size}', synthetic_graph(size)) for size in synthetic_sizes]
+    for name, g in packs:
+        n_recipes = len(g._recipes)
+        depth_time = _time(g.crafting_depths)
+        depths = g.crafting_depths()
+        plan_time = _time(lambda: g.crafting_plan(''))
+        rng = random.Random(5)
+        reachable = list(depths)
+        sample = [rng.choice(reachable) for _ in range(queries)]
+        query_time = _time(lambda: [g.crafting_plan(item) for item in sample])
+        steps = sum(len(g.crafting_plan(item)) for item in sample) / queries
+
+        items = list(g.get_vertices())
+        new = []
+        while len(new) < combos:
+            item1, item2 = rng.choice(items), rng.choice(items)
+            if g.possible_new_combo(item1, item2) and (item1, item2) not in new and (item2, item1) not in new:
+                new.append((item1, item2))
+        # the new combos make elements that are deep, so that adding them makes some elements cheaper
+        deepest = sorted(depths, key=depths.get)[-combos:]
+        combo_time = _time(lambda: [g.new_combo(item1, item2, item3) for (item1, item2), item3 in zip(new, deepest)])
+
+        def rebuild() -> None:
+            g._depths = g._plans = None
+            g.crafting_depths()
+            g.crafting_plan('')
+
+        rebuild_time = _time(rebuild)
+        print(f'{name:<16}  {len(items):>8}  {n_recipes:>7}  {max(depths.values()):>9}  '
+              f'{depth_time * 1e3:>11.2f}  {plan_time * 1e3:>15.2f}  {query_time / queries * 1e6:>9.2f}  '
+              f'{steps:>10.1f}  {combo_time / combos * 1e6:>14.2f}  {rebuild_time * 1e3:>12.2f}')
+
+
+def benchmark_analyzer(synthetic_sizes: tuple[int, ...] = (100_000, 500_000),
+                       workers: tuple[int, ...] = (1, 2, 4, 8)) -> None:
+    """
+    Measure packanalyzer.analyze with each number of workers, for recipes.json and synthetic packs of
+    synthetic_sizes elements, after they have been compiled to their caches, along with the time to load each
+    cache into a Graph and find its crafting depths in this process. The speedup from more workers is limited
+    by the number of CPUs, which is printed first.
+    """
+    print(f'CPUs: {os.cpu_count()}')
+    print('pack              workers  start (ms)  count (ms)  index (ms)  depths (ms)  islands (ms)  total (ms)  '
+          'Graph depths (ms)')
+    with tempfile.TemporaryDirectory() as directory:
+        packs = [('recipes.json', shutil.copy('recipes.json', directory))]
+        for size in synthetic_sizes:
+            path = os.path.join(directory, f'synthetic {size}.json')
+            write_synthetic_pack(path, size, 2)
+            packs.append((f'synthetic {size}', path))
+        for name, path in packs:
+            recipeloader.compile_to_cache(path)
+            graph_time = _time(lambda: recipeloader.load_graph(path, recipeloader.Graph).crafting_depths())
+            for count in workers:
+                timings = packanalyzer.analyze(path, count).timings
+                steps = [timings[step] * 1e3 for step in ('start', 'count', 'index', 'depths', 'islands')]
+                print(f'{name:<16}  {count:>7}  {steps[0]:>10.1f}  {steps[1]:>10.1f}  {steps[2]:>10.1f}  '
+                      f'{steps[3]:>11.1f}  {steps[4]:>12.1f}  {sum(steps):>10.1f}  {graph_time * 1e3:>17.1f}')
+
+
+def benchmark_combine_many(synthetic_elements: int = 100_000, discovered: int = 10_000, calls: int = 20_000,
+                           batch_sizes: tuple[int, ...] = (1, 100, 10_000)) -> None:
+    """
+    Compare combining calls pairs of elements one at a time with Graph.combine against Graph.combine_many in
+    batches of batch_sizes pairs, for recipes.json and chemistry.json half discovered and a synthetic pack
+    with discovered elements discovered. Half of the pairs are recipes that can be made, and half are random
+    pairs of discovered elements, as a bot trying combinations would make. Each is timed three times from the
+    same discovered elements, and the fastest time is kept.
+    """
+    packs = [('recipes.json', recipeloader.load_graph('recipes.json', recipeloader.Graph)),
+             ('chemistry.json', recipeloader.load_graph('chemistry.json', recipeloader.Graph)),
+             (f'synthetic {synthetic_elements}', synthetic_graph(synthetic_elements))]
+    print('pack              method               batch  per pair (us)  pairs/s (M)  discovered')
+    for name, g in packs:
+        defaults = g.snapshot()
+        others = [item for item in g.get_vertices() if item not in defaults]
+        base = list(defaults) + others[:min(discovered, len(g.get_vertices()) // 2) - len(defaults)]
+        g.restore(base)
+        rng = random.Random(4)
+        craftable = [(item1, item2) for item1, item2, _ in g.craftable()]
+        pairs = [rng.choice(craftable) if i % 2 else (rng.choice(base), rng.choice(base)) for i in range(calls)]
+        id_pairs = [(g.id_of(item1), g.id_of(item2)) for item1, item2 in pairs]
+
+        def combine_each() -> None:
+            for item1, item2 in pairs:
+                g.combine(item1, item2)
+
+        def combine_batches(batches: list[list[tuple[int, int]]]) -> None:
+            # the results are dropped straight away, since keeping thousands of them alive would set off full
+            # garbage collections of the whole graph and time those instead
+            for batch in batches:
+                g.combine_many(batch)
+
+        runs = [('combine', 1, combine_each)]
+        for size in batch_sizes:
+            batches = [id_pairs[i:i + size] for i in range(0, calls, size)]
+            runs.append(('combine_many', size, lambda batches=batches: combine_batches(batches)))
+        for method, size, run in runs:
+            run_time = float('inf')
+            for _ in range(3):
+                g.restore(base)
+                run_time = min(run_time, _time(run))
+            print(f'{name:<16}  {method:<12}  {size:>12}  {run_time / calls * 1e6:>13.3f}  '
+                  f'{calls / run_time / 1e6:>11.2f}  {len(g.discovered) - len(base):>10}')
+
+
+BENCHMARKS = {
+    'discovered': benchmark_discovered,
+    'memory': benchmark_memory,
+    'loading': benchmark_loading,
+    'startup': benchmark_startup,
+    'mapped': benchmark_mapped,
+    'scene_soak': benchmark_scene_soak,
+    'text_cache': benchmark_text_cache,
+    'outline_cache': benchmark_outline_cache,
+    'sidebar': benchmark_sidebar,
+    'dirty_rects': benchmark_dirty_rects,
+    'frame_pacing': benchmark_frame_pacing,
+    'board': benchmark_board,
+    'camera': benchmark_camera,
+    'assets': benchmark_assets,
+    'buttons': benchmark_buttons,
+    'options_layer': benchmark_options_layer,
+    'craftable': benchmark_craftable,
+    'recipe_lookup': benchmark_recipe_lookup,
+    'crafting': benchmark_crafting,
+    'analyzer': benchmark_analyzer,
+    'combine_many': benchmark_combine_many,
+}
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        print(f'== {name} ==')
+        BENCHMARKS[name]()
@@ -0,0 +1,307 @@
+"""
+File Outline
+===============================
+This file is used within main.py to keep track of the elements on the board of the play screen. The board
+remembers the order elements are drawn in and indexes them in a uniform grid, so that finding the element
+under the mouse or the elements touching a dropped one only looks at the grid cells involved instead of
+every element on the board. The board can be larger than the window: a camera decides which part of it
+is shown and how far it is zoomed.
+
+Copyright and Usage Information
+===============================
+This file is provided solely for the private use of the teaching staff
+of CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited.
+
+This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjamin Gavriely
+"""
+from __future__ import annotations
+from typing import Any, Iterator, Optional
+import math
+import pygame
+
+
+class Board:
+    """
+    The elements on the board, in drawing order, with a spatial hash of their rectangles. Any object with a
+    pygame.Rect attribute called rect and a move_ip(dx, dy) method that moves it can be placed on the board,
+    and it must only be moved through Board.move while it is there.
+
+    Instance Attributes:
+    - cell_size: The width and height of each grid cell in pixels.
+    - _order: Every element on the board, mapped to its drawing position. Later elements are drawn on top
+      and the dictionary is kept in drawing order.
+    - _next: The drawing position given to the next element added.
+    - _cells: Each grid cell that some element overlaps, mapped to the elements overlapping it.
+    - _spans: Every element on the board, mapped to the range of cells it overlaps, as
+      (first column, first row, last column, last row).
+
+    Representation Invariants:
+    - self.cell_size > 0
+    - self._order.keys() == self._spans.keys()
+    - every value of self._order is less than self._next
+    - an element is in self._cells[(column, row)] if and only if (column, row) lies within its span
+    """
+    cell_size: int
+    _order: dict[Any, int]
+    _next: int
+    _cells: dict[tuple[int, int], set[Any]]
+    _spans: dict[Any, tuple[int, int, int, int]]
+
+    def __init__(self, cell_size: int = 128) -> None:
+        """
+        Initialize an empty board.
+
+        :param cell_size: The width and height of each grid cell in pixels. Cells about the size of an
+        element keep both the number of cells per element and the number of elements per cell small.
+        """
+        self.cell_size = cell_size
+        self._order = {}
+        self._next = 0
+        self._cells = {}
+        self._spans = {}
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self) -> Iterator[Any]:
+        """
+        Returns an iterator over the elements on the board, from the bottom to the top.
+        """
+        return iter(self._order)
+
+    def __contains__(self, element: Any) -> bool:
+        return element in self._order
+
+    def ordered(self) -> Iterator[tuple[int, Any]]:
+        """
+        Returns an iterator over the drawing position and element of everything on the board, from the
+        bottom to the top. An element keeps its drawing position for as long as it stays on the board.
+        """
+        return ((z, element) for element, z in self._order.items())
+
+    def _span(self, rect: pygame.Rect) -> tuple[int, int, int, int]:
+        """
+        Returns the range of cells overlapped by rect, as (first column, first row, last column, last row).
+        """
+        size = self.cell_size
+        return (rect.left // size, rect.top // size, (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def _index(self, element: Any, span: tuple[int, int, int, int]) -> None:
+        """
+        Adds element to every cell in span.
+        """
+        for column in range(span[0], span[2] + 1):
+            for row in range(span[1], span[3] + 1):
+                self._cells.setdefault((column, row), set()).add(element)
+
+    def _unindex(self, element: Any, span: tuple[int, int, int, int]) -> None:
+        """
+        Removes element from every cell in span, dropping cells that become empty.
+        """
+        for column in range(span[0], span[2] + 1):
+            for row in range(span[1], span[3] + 1):
+                cell = self._cells[(column, row)]
+                cell.discard(element)
+                if not cell:
+                    del self._cells[(column, row)]
+
+    def add(self, element: Any) -> None:
+        """
+        Places element on top of everything on the board.
+
+        Preconditions:
+        - element not in self
+        """
+        self._order[element] = self._next
+        self._next += 1
+        span = self._spans[element] = self._span(element.rect)
+        self._index(element, span)
+
+    def remove(self, element: Any) -> None:
+        """
+        Takes element off the board.
+
+        Preconditions:
+        - element in self
+        """
+        del self._order[element]
+        self._unindex(element, self._spans.pop(element))
+
+    def clear(self) -> None:
+        """
+        Takes every element off the board.
+        """
+        self._order.clear()
+        self._cells.clear()
+        self._spans.clear()
+
+    def move(self, element: Any, dx: int, dy: int) -> None:
+        """
+        Moves element by dx and dy, updating the cells it is indexed in if it crossed into different ones.
+
+        Preconditions:
+        - element in self
+        """
+        element.move_ip(dx, dy)
+        old_span, new_span = self._spans[element], self._span(element.rect)
+        if new_span != old_span:
+            self._unindex(element, old_span)
+            self._index(element, new_span)
+            self._spans[element] = new_span
+
+    def _candidates(self, rect: pygame.Rect) -> set[Any]:
+        """
+        Returns the elements indexed in the cells overlapped by rect. These include every element that
+        collides with rect, and possibly some that do not.
+        """
+        column0, row0, column1, row1 = self._span(rect)
+        if (column1 - column0 + 1) * (row1 - row0 + 1) > len(self._cells):
+            # a rectangle covering more cells than are in use is quicker to check against the used cells
+            return {element for (column, row), cell in self._cells.items()
+                    if column0 <= column <= column1 and row0 <= row <= row1 for element in cell}
+        found = set()
+        for column in range(column0, column1 + 1):
+            for row in range(row0, row1 + 1):
+                found.update(self._cells.get((column, row), ()))
+        return found
+
+    def topmost_at(self, pos: tuple[int, int]) -> Optional[Any]:
+        """
+        Returns the element drawn on top at pos, or None if there is no element there.
+        """
+        size = self.cell_size
+        cell = self._cells.get((pos[0] // size, pos[1] // size), ())
+        hits = [element for element in cell if element.rect.collidepoint(pos)]
+        return max(hits, key=self._order.__getitem__, default=None)
+
+    def ordered_within(self, rect: pygame.Rect) -> list[tuple[int, Any]]:
+        """
+        Returns the drawing position and element of everything on the board that collides with rect, from the
+        bottom to the top.
+        """
+        hits = [(self._order[element], element) for element in self._candidates(rect)
+                if element.rect.colliderect(rect)]
+        hits.sort(key=lambda hit: hit[0])
+        return hits
+
+    def colliding(self, rect: pygame.Rect, exclude: Any = None) -> list[Any]:
+        """
+        Returns the elements whose rectangles collide with rect, other than exclude, from the top down.
+        """
+        hits = [element for element in self._candidates(rect)
+                if element is not exclude and element.rect.colliderect(rect)]
+        hits.sort(key=self._order.__getitem__, reverse=True)
+        return hits
+
+
+class Camera:
+    """
+    The part of the board shown on the screen. Board positions are converted to screen positions by
+    moving them so that the camera's position on the board lands on the top left of the view, then scaling
+    them by the zoom.
+
+    Instance Attributes:
+    - view: The area of the screen the board is shown in.
+    - world: The area of the board that can be shown.
+    - x, y: The position on the board shown at the top left of the view.
+    - zoom: How many screen pixels a board pixel takes up.
+    - min_zoom, max_zoom: The limits of zoom. At min_zoom, the whole board fits in the view.
+
+    Representation Invariants:
+    - 0 < self.min_zoom <= self.zoom <= self.max_zoom
+    - the area of the board shown lies within self.world, unless the view is larger than the board at this zoom
+    """
+    view: pygame.Rect
+    world: pygame.Rect
+    x: float
+    y: float
+    zoom: float
+    min_zoom: float
+    max_zoom: float
+
+    def __init__(self, view: pygame.Rect, world: pygame.Rect, max_zoom: float = 2.0) -> None:
+        """
+        Initialize a camera at zoom 1 showing the top left of the board.
+
+        :param view: The area of the screen the board is shown in.
+        :param world: The area of the board that can be shown.
+        :param max_zoom: The most the board can be zoomed in.
+        """
+        self.view = view
+        self.world = world
+        self.x, self.y = world.x, world.y
+        self.zoom = 1.0
+        self.min_zoom = min(1.0, max(view.width / world.width, view.height / world.height))
+        self.max_zoom = max_zoom
+
+    def to_world(self, pos: tuple[float, float]) -> tuple[int, int]:
+        """
+        Returns the position on the board shown at the screen position pos.
+        """
+        return (math.floor((pos[0] - self.view.x) / self.zoom + self.x),
+                math.floor((pos[1] - self.view.y) / self.zoom + self.y))
+
+    def to_screen(self, rect: pygame.Rect) -> pygame.Rect:
+        """
+        Returns the area of the screen that shows the area rect of the board.
+        """
+        left = round((rect.left - self.x) * self.zoom) + self.view.x
+        top = round((rect.top - self.y) * self.zoom) + self.view.y
+        right = round((rect.right - self.x) * self.zoom) + self.view.x
+        bottom = round((rect.bottom - self.y) * self.zoom) + self.view.y
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def shown(self) -> pygame.Rect:
+        """
+        Returns the area of the board shown in the view, rounded out to whole pixels.
+        """
+        left, top = math.floor(self.x), math.floor(self.y)
+        return pygame.Rect(left, top, math.ceil(self.x + self.view.width / self.zoom) - left,
+                           math.ceil(self.y + self.view.height / self.zoom) - top)
+
+    def to_world_rect(self, rect: pygame.Rect) -> pygame.Rect:
+        """
+        Returns the area of the board shown in the area rect of the screen.
+        """
+        left, top = self.to_world(rect.topleft)
+        right, bottom = self.to_world(rect.bottomright)
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def pan(self, dx: float, dy: float) -> None:
+        """
+        Moves the board by dx and dy screen pixels, without showing anything outside the world.
+        """
+        self.x -= dx / self.zoom
+        self.y -= dy / self.zoom
+        self._keep_in_world()
+
+    def zoom_at(self, pos: tuple[int, int], factor: float) -> None:
+        """
+        Multiplies the zoom by factor, within its limits, keeping the board position under the screen
+        position pos where it is.
+        """
+        before_x = (pos[0] - self.view.x) / self.zoom + self.x
+        before_y = (pos[1] - self.view.y) / self.zoom + self.y
+        self.zoom = min(self.max_zoom, max(self.min_zoom, self.zoom * factor))
+        self.x = before_x - (pos[0] - self.view.x) / self.zoom
+        self.y = before_y - (pos[1] - self.view.y) / self.zoom
+        self._keep_in_world()
+
+    def _keep_in_world(self) -> None:
+        """
+        Moves the camera back inside the world if it shows anything outside it.
+        """
+        self.x = max(self.world.left, min(self.x, self.world.right - self.view.width / self.zoom))
+        self.y = max(self.world.top, min(self.y, self.world.bottom - self.view.height / self.zoom))
+
+
+if __name__ == "__main__":
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['math', 'pygame'],
+        'allowed-io': [],  # the names (strs) of functions that call print/open/input
+        'max-line-length': 120,
+        'no-member': False
+    })
@@ -14,12 +14,32 @@ This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjami
 """
 from typing import Any
 import pygame
+import rendercache
+
+
+# The size of the coloured background of every ButtonStay
+STAY_SIZE = (170, 60)
+
+# The coloured backgrounds of ButtonStay, by colour
+_STAY_BACKGROUNDS: dict[tuple[int, int, int], pygame.Surface] = {}
+
+
+def _stay_background(colour: tuple[int, int, int]) -> pygame.Surface:
+    """
+    Returns a surface of size STAY_SIZE filled with colour, creating it the first time it is asked for.
+    """
+    surface = _STAY_BACKGROUNDS.get(colour)
+    if surface is None:
+        surface = _STAY_BACKGROUNDS[colour] = pygame.Surface(STAY_SIZE)
+        surface.fill(colour)
+    return surface
 
 
 class Button:
     """
    A class to create interactive buttons for a Pygame window. Buttons can display text
-   and change text color on hover.
+   and change text color on hover. The text is rendered in both colours when the button is created,
+   so hovering only switches between the two surfaces.
 
    Instance Attributes:
     - image (pygame.Surface): The button's image. If None, the button displays text only.
@@ -29,8 +49,13 @@ class Button:
     - base_color (tuple[int, int, int]): The button's text color when not hovered over.
     - hovering_color (tuple[int, int, int]): The button's text color when hovered over.
     - text_input (str): The text displayed on the button.
+    - text (pygame.Surface): The button's text as currently drawn, in the base or hovering color.
+    - base_text (pygame.Surface): The button's text in the base color.
+    - hovering_text (pygame.Surface): The button's text in the hovering color.
+    - hovered (bool): Whether the mouse was over the button when it was last checked.
     - rect (pygame.Rect): The rectangular area of the button.
     - text_rect (pygame.Rect): The rectangular area for the button's text.
+    - text_only (bool): Whether the button has no image of its own, so that its base text is used as one.
 
    Representation Invariants:
    - self.x_pos and self.y_pos are integers representing the button's position on the screen.
@@ -45,8 +70,12 @@ class Button:
     hovering_color: str
     text_input: str
     text: pygame.Surface
+    base_text: pygame.Surface
+    hovering_text: pygame.Surface
+    hovered: bool
     rect: pygame.rect
     text_rect: pygame.rect
+    text_only: bool
 
     def __init__(self, image: Any, pos: tuple, text_input: str, font: pygame.font,
                  base_color: str, hovering_color: str) -> None:
@@ -66,10 +95,22 @@ class Button:
         self.y_pos = pos[1]
         self.font = font
         self.base_color, self.hovering_color = base_color, hovering_color
+        self.text_only = image is None
+        self.hovered = False
+        self.set_text(text_input)
+
+    def set_text(self, text_input: str) -> None:
+        """
+        Changes the text displayed on the button, rendering it in both colours.
+
+        :param text_input: The text to be displayed on the button.
+        """
         self.text_input = text_input
-        self.text = self.font.render(self.text_input, True, self.base_color)
-        if self.image is None:
-            self.image = self.text
+        self.base_text = rendercache.render_text(self.font, self.text_input, True, self.base_color)
+        self.hovering_text = rendercache.render_text(self.font, self.text_input, True, self.hovering_color)
+        self.text = self.hovering_text if self.hovered else self.base_text
+        if self.text_only:
+            self.image = self.base_text
         self.rect = self.image.get_rect(center=(self.x_pos, self.y_pos))
         self.text_rect = self.text.get_rect(center=(self.x_pos, self.y_pos))
 
@@ -92,10 +133,7 @@ class Button:
 
         :return: True if the button is clicked, False otherwise.
         """
-        if position[0] in range(self.rect.left, self.rect.right) and position[1] in range(self.rect.top,
-                                                                                          self.rect.bottom):
-            return True
-        return False
+        return bool(self.rect.collidepoint(position))
 
     def changecolor(self, position: tuple) -> None:
         """
@@ -103,23 +141,22 @@ class Button:
 
         :param position: A tuple containing the x and y coordinates of the mouse.
         """
-        if position[0] in range(self.rect.left, self.rect.right) and position[1] in range(self.rect.top,
-                                                                                          self.rect.bottom):
-            self.text = self.font.render(self.text_input, True, self.hovering_color)
-        else:
-            self.text = self.font.render(self.text_input, True, self.base_color)
+        self.hovered = bool(self.rect.collidepoint(position))
+        self.text = self.hovering_text if self.hovered else self.base_text
 
 
 class ButtonStay(Button):
     """
     Extends the Button class to create a toggle button that visually indicates its current state
-    (clicked or not clicked) through color changes.
+    (clicked or not clicked) through color changes. The coloured backgrounds are filled once and shared
+    by every toggle button.
 
     Representation Invariants:
     - clicked is a boolean indicating the toggle state of the button.
 
     Instance Attributes:
     - clicked (bool): Represents whether the button is in an active (clicked) state.
+    - background_rect (pygame.Rect): The area of the coloured background behind the button.
 
     Inherits from Button:
         - image (pygame.Surface): The button's image. If None, the button displays text only.
@@ -133,6 +170,7 @@ class ButtonStay(Button):
         - text_rect (pygame.Rect): The rectangular area for the button's text.
     """
     clicked: bool
+    background_rect: pygame.Rect
 
     def __init__(self, image: Any, pos: tuple, text_input: str, font: pygame.font.Font,
                  base_color: str, hovering_color: str, clicked: bool = False) -> None:
@@ -149,6 +187,7 @@ class ButtonStay(Button):
         """
         super().__init__(image, pos, text_input, font, base_color, hovering_color)
         self.clicked = clicked
+        self.background_rect = pygame.Rect(self.x_pos - STAY_SIZE[0] / 2, self.y_pos - STAY_SIZE[1] / 2, *STAY_SIZE)
 
     def update(self, screen: pygame.Surface) -> None:
         """
@@ -158,18 +197,8 @@ class ButtonStay(Button):
         Preconditions:
         - 'screen' must be a valid Pygame Surface object.
         """
-        if self.clicked:
-            current_color = (0, 255, 0)  # Green if clicked
-        else:
-            current_color = (255, 0, 0)  # Red otherwise
-
-        # Set a standard size for the background rectangle
-        standard_width = 170  # Example width
-        standard_height = 60  # Example height
-
-        background_rect = pygame.Rect(self.x_pos - standard_width / 2, self.y_pos - standard_height / 2, standard_width,
-                                      standard_height)
-        pygame.draw.rect(screen, current_color, background_rect)
+        # Green if clicked, red otherwise
+        screen.blit(_stay_background((0, 255, 0) if self.clicked else (255, 0, 0)), self.background_rect)
 
         if self.image is not None:
             screen.blit(self.image, self.rect)
@@ -179,7 +208,7 @@ class ButtonStay(Button):
 if __name__ == "__main__":
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['sys', 'pygame', 'recipeloader', 'random', 'button', ],
+        'extra-imports': ['sys', 'pygame', 'recipeloader', 'random', 'button', 'rendercache'],
         'allowed-io': [],  # the names (strs) of functions that call print/open/input
         'max-line-length': 120,
         'no-member': False,  # removed false positive errors
@@ -0,0 +1,432 @@
+"""
+File Outline
+===============================
+This file runs Python Alchemy without a window, so that its rendering can be measured on a machine with no
+display, such as a CI server. SDL's dummy video and audio drivers are used, and each scene is driven by a
+script of mouse and keyboard events for a given number of frames. For every scene, the time each frame
+took is summarised as percentiles, along with the number of surfaces created and the number of times text
+was rendered with a font while the frames ran. For example,
+
+    python headless.py --frames 600 menu play
+    python headless.py --json --max-p95 8
+
+The second command prints the results as JSON and exits with status 1 if the 95th percentile frame time
+of any scene is over 8 ms.
+
+A session recorded with replay.py can be played back instead of the scripts, with
+
+    python headless.py --replay session.jsonl
+
+which reports the frame times and the time taken to combine dropped elements, along with a hash of the
+final screen that is the same every time a session is played back on the same version of the game.
+
+Copyright and Usage Information
+===============================
+This file is provided solely for the private use of the teaching staff
+of CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited.
+
+This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjamin Gavriely
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Optional
+
+# the drivers must be chosen before pygame is initialised, and pygame's greeting would get in the way of --json
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+os.environ['SDL_AUDIODRIVER'] = 'dummy'
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+import pygame
+import main
+import perf
+import rendercache
+import replay
+
+SCREEN_SIZE = (1200, 700)
+
+
+class AllocationCounter:
+    """
+    Counts the surfaces created and the text rendered while it is installed. Surfaces are counted when
+    they are made with pygame.Surface, rendered with a font, loaded with pygame.image.load or resized with
+    pygame.transform, which is how the game makes all of its surfaces; surfaces converted to the display
+    format are counted if the surface converted was made with pygame.Surface.
+
+    Fonts are only counted if they are created while the counter is installed, so the font cache should be
+    emptied after installing it.
+
+    Instance Attributes:
+    - surfaces: The number of surfaces created.
+    - font_renders: The number of times text was rendered with a font.
+    - _originals: The pygame attributes replaced while installed, by module and name.
+    """
+    surfaces: int
+    font_renders: int
+    _originals: dict[tuple[Any, str], Any]
+
+    def __init__(self) -> None:
+        """
+        Initialize a counter that has counted nothing and is not installed.
+        """
+        self.surfaces = 0
+        self.font_renders = 0
+        self._originals = {}
+
+    def counts(self) -> dict[str, int]:
+        """
+        Returns the number of surfaces created and the number of font renders so far.
+        """
+        return {'surfaces': self.surfaces, 'font_renders': self.font_renders}
+
+    def install(self) -> None:
+        """
+        Replaces the pygame functions and classes that create surfaces with ones that count them.
+        """
+        counter = self
+
+        class CountingSurface(pygame.Surface):
+            """
+            A pygame.Surface that is counted when it is created or converted.
+            """
+            def __init__(self, *args: Any, **kwargs: Any) -> None:
+                super().__init__(*args, **kwargs)
+                counter.surfaces += 1
+
+            def convert(self, *args: Any) -> pygame.Surface:
+                counter.surfaces += 1
+                return super().convert(*args)
+
+            def convert_alpha(self, *args: Any) -> pygame.Surface:
+                counter.surfaces += 1
+                return super().convert_alpha(*args)
+
+        class CountingFont(pygame.font.Font):
+            """
+            A pygame.font.Font that counts the text it renders.
+            """
+            def render(self, *args: Any, **kwargs: Any) -> pygame.Surface:
+                counter.font_renders += 1
+                counter.surfaces += 1
+                return super().render(*args, **kwargs)
+
+        def counted(function: Callable[..., pygame.Surface]) -> Callable[..., pygame.Surface]:
+            def counting(*args: Any, **kwargs: Any) -> pygame.Surface:
+                counter.surfaces += 1
+                return function(*args, **kwargs)
+            return counting
+
+        replacements = [(pygame, 'Surface', CountingSurface), (pygame.font, 'Font', CountingFont)]
+        replacements += [(pygame.image, 'load', counted(pygame.image.load))]
+        replacements += [(pygame.transform, name, counted(getattr(pygame.transform, name)))
+                         for name in ('scale', 'smoothscale', 'rotate', 'rotozoom', 'flip')]
+        for module, name, replacement in replacements:
+            self._originals[(module, name)] = getattr(module, name)
+            setattr(module, name, replacement)
+
+    def uninstall(self) -> None:
+        """
+        Puts back the pygame functions and classes replaced by install.
+        """
+        for (module, name), original in self._originals.items():
+            setattr(module, name, original)
+        self._originals.clear()
+
+
+def _event(event_type: int, **attributes: Any) -> pygame.event.Event:
+    """
+    Returns an event of event_type with the given attributes.
+    """
+    return pygame.event.Event(event_type, **attributes)
+
+
+def _motion(pos: tuple[int, int], rel: tuple[int, int] = (0, 0),
+            buttons: tuple[int, int, int] = (0, 0, 0)) -> pygame.event.Event:
+    """
+    Returns an event of the mouse moving to pos.
+    """
+    return _event(pygame.MOUSEMOTION, pos=pos, rel=rel, buttons=buttons)
+
+
+def _click(pos: tuple[int, int], button: int = 1) -> list[pygame.event.Event]:
+    """
+    Returns the events of the mouse moving to pos and button being pressed and released there.
+    """
+    return [_motion(pos), _event(pygame.MOUSEBUTTONDOWN, pos=pos, button=button),
+            _event(pygame.MOUSEBUTTONUP, pos=pos, button=button)]
+
+
+def _key(key: int, unicode: str = '') -> pygame.event.Event:
+    """
+    Returns the event of key being pressed.
+    """
+    return _event(pygame.KEYDOWN, key=key, unicode=unicode, mod=0, scancode=0)
+
+
+def menu_script(scene: main.MenuScene, frame: int) -> list[pygame.event.Event]:
+    """
+    Returns the events for frame of the menu: the mouse moves on and off each button in turn, without
+    clicking any of them.
+    """
+    buttons = [scene.play_button, scene.options_button, scene.quit_button]
+    if frame % 10 == 0:
+        return [_motion(buttons[frame // 10 % 3].rect.center)]
+    if frame % 10 == 5:
+        return [_motion((40, 40))]
+    return []
+
+
+def options_script(scene: main.OptionsScene, frame: int) -> list[pygame.event.Event]:
+    """
+    Returns the events for frame of the options menu: the mouse moves over the buttons, the chemistry mode
+    is toggled, and text is typed into and erased from each combo text field in turn. The back, save, load
+    and add buttons are never clicked.
+    """
+    step = frame % 60
+    field = scene.item_buttons[frame // 60 % 3]
+    if step == 0:
+        return _click(field.rect.center)
+    if 1 <= step <= 20:
+        return [_key(pygame.K_a + step % 26, chr(ord('a') + step % 26))]
+    if 21 <= step <= 40:
+        return [_key(pygame.K_BACKSPACE)]
+    if step == 41:
+        return [_key(pygame.K_RETURN)]
+    if step == 45:
+        return _click(scene.chembutton.rect.center)
+    if step == 50:
+        return [_motion(scene.savebutton.rect.center)]
+    if step == 55:
+        return [_motion((40, 40))]
+    return []
+
+
+def play_script(scene: main.PlayScene, frame: int) -> list[pygame.event.Event]:
+    """
+    Returns the events for frame of the play screen: an element is spawned from the sidebar and dragged
+    across the board, the sidebar is scrolled and the board zoomed with the mouse wheel, the board is
+    panned, and a few frames pass with no input.
+    """
+    step = frame % 120
+    board_pos = (scene.camera.view.centerx // 2, scene.camera.view.centery)
+    if step == 0:
+        row = scene.discovered_list.rect
+        return _click((row.centerx, row.top + scene.discovered_list.row_height // 2))
+    if step == 1 and scene.board:
+        element = list(scene.board)[-1]
+        pos = scene.camera.to_screen(element.rect).center
+        return [_motion(pos), _event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1)]
+    if 2 <= step <= 31:
+        # drags to the right on even rounds and to the left on odd ones, so elements stay near the middle
+        direction = 1 if frame // 120 % 2 == 0 else -1
+        x, y = scene.pointer
+        return [_motion((x + 5 * direction, y + 2), (5 * direction, 2), (1, 0, 0))]
+    if step == 32:
+        return [_event(pygame.MOUSEBUTTONUP, pos=scene.pointer, button=1)]
+    if 40 <= step < 80:
+        # scrolls the sidebar down then up, then zooms the board in then out
+        over = scene.discovered_list.rect.center if step < 60 else board_pos
+        return [_motion(over), _event(pygame.MOUSEWHEEL, x=0, y=-1 if step % 20 < 10 else 1, flipped=False)]
+    if step == 80:
+        return [_motion(board_pos), _event(pygame.MOUSEBUTTONDOWN, pos=board_pos, button=3)]
+    if 81 <= step <= 100:
+        x, y = scene.pointer
+        dx = -4 if frame // 120 % 2 == 0 else 4
+        return [_motion((x + dx, y - 2), (dx, -2), (0, 0, 1))]
+    if step == 101:
+        return [_event(pygame.MOUSEBUTTONUP, pos=scene.pointer, button=3)]
+    return []
+
+
+# The script of events driving each scene, given the scene and the frame number
+SCRIPTS: dict[str, Callable[[Any, int], list[pygame.event.Event]]] = {
+    'menu': menu_script,
+    'options': options_script,
+    'play': play_script,
+}
+
+
+def run_scene(name: str, frames: int, counter: AllocationCounter, seed: int = 0) -> dict[str, Any]:
+    """
+    Enters the scene called name with a new game and no cached text, runs frames frames of its script and
+    returns the frame time percentiles in milliseconds, the surfaces created and the font renders, both
+    while entering the scene and while running the frames.
+
+    Preconditions:
+    - name in SCRIPTS
+    - counter is installed
+    """
+    random.seed(seed)
+    rendercache.clear()
+    screen = pygame.display.get_surface()
+    before_enter = counter.counts()
+    manager = main.SceneManager(screen, main.GameState(False, [], []), name, max_fps=0, idle_timeout=0)
+    before_frames = counter.counts()
+    times = []
+    for frame in range(frames):
+        events = SCRIPTS[name](manager.scene, frame)
+        start = time.perf_counter()
+        manager.run_frame(events)
+        times.append(time.perf_counter() - start)
+        if manager.scene_name != name:
+            raise RuntimeError(f'the {name} script left the scene on frame {frame}')
+    after_frames = counter.counts()
+    manager.switch('quit')
+
+    return {'scene': name, 'frames': frames,
+            'p50_ms': perf.percentile(times, 0.5) * 1e3,
+            'p95_ms': perf.percentile(times, 0.95) * 1e3,
+            'p99_ms': perf.percentile(times, 0.99) * 1e3,
+            'max_ms': max(times, default=0.0) * 1e3,
+            'enter': {key: before_frames[key] - before_enter[key] for key in before_frames},
+            'surfaces': after_frames['surfaces'] - before_frames['surfaces'],
+            'font_renders': after_frames['font_renders'] - before_frames['font_renders']}
+
+
+def run(scenes: list[str], frames: int, seed: int = 0) -> list[dict[str, Any]]:
+    """
+    Runs each scene in scenes headlessly as described in run_scene, and returns their results.
+    """
+    pygame.init()
+    pygame.display.set_mode(SCREEN_SIZE)
+    counter = AllocationCounter()
+    counter.install()
+    try:
+        return [run_scene(name, frames, counter, seed) for name in scenes]
+    finally:
+        counter.uninstall()
+        rendercache.clear()
+
+
+def replay_session(session: replay.Session, counter: Optional[AllocationCounter] = None) -> dict[str, Any]:
+    """
+    Plays session back with a new game, no loaded recipe packs and no cached text, as when it was recorded,
+    and returns the frame time and combine time percentiles in milliseconds, the number of combines tried,
+    a hash of the final screen, and the surfaces created and font renders if counter is given.
+
+    Preconditions:
+    - counter is None or counter is installed
+    """
+    pygame.init()
+    screen = pygame.display.set_mode(session.screen_size)
+    random.seed(session.seed)
+    main.GRAPHS.clear()
+    rendercache.clear()
+    perf.TIMINGS.clear()
+    before = counter.counts() if counter is not None else None
+
+    manager = main.SceneManager(screen, main.GameState(False, [], []), session.scene, max_fps=0, idle_timeout=0,
+                                pointer=session.pointer)
+    times = []
+    for events in session.frames:
+        start = time.perf_counter()
+        running = manager.run_frame(events)
+        times.append(time.perf_counter() - start)
+        if not running:
+            break
+    manager.switch('quit')
+
+    result = {'frames': len(times), 'p50_ms': perf.percentile(times, 0.5) * 1e3 if times else 0.0,
+              'p95_ms': perf.percentile(times, 0.95) * 1e3 if times else 0.0,
+              'p99_ms': perf.percentile(times, 0.99) * 1e3 if times else 0.0,
+              'max_ms': max(times, default=0.0) * 1e3, 'combines': 0,
+              'screen_md5': hashlib.md5(pygame.image.tobytes(screen, 'RGB')).hexdigest()}
+    if 'combine' in perf.TIMINGS.samples:
+        combines = perf.TIMINGS.summary('combine')
+        result['combines'] = combines['count']
+        result.update({f'combine_{key}_ms': combines[key] * 1e3 for key in ('p50', 'p95', 'p99', 'max')})
+    if counter is not None:
+        result.update({key: value - before[key] for key, value in counter.counts().items()})
+    return result
+
+
+def format_replay(path: str, result: dict[str, Any]) -> str:
+    """
+    Returns the result of replay_session for the recording at path as text.
+    """
+    lines = [f"replayed {result['frames']} frames of {path}",
+             f"frames (ms):   p50 {result['p50_ms']:.3f}  p95 {result['p95_ms']:.3f}  p99 {result['p99_ms']:.3f}  "
+             f"max {result['max_ms']:.3f}"]
+    if result['combines']:
+        lines.append(f"combines (ms): p50 {result['combine_p50_ms']:.3f}  p95 {result['combine_p95_ms']:.3f}  "
+                     f"p99 {result['combine_p99_ms']:.3f}  max {result['combine_max_ms']:.3f}  "
+                     f"({result['combines']} tried)")
+    if 'surfaces' in result:
+        lines.append(f"surfaces: {result['surfaces']}  font renders: {result['font_renders']}")
+    lines.append(f"final screen: {result['screen_md5']}")
+    return '\n'.join(lines)
+
+
+def format_results(results: list[dict[str, Any]]) -> str:
+    """
+    Returns the results of run as a table.
+    """
+    lines = ['scene    frames  p50 (ms)  p95 (ms)  p99 (ms)  max (ms)  surfaces  font renders  '
+             'surfaces/renders on enter']
+    for result in results:
+        enter = result['enter']
+        lines.append(f"{result['scene']:<8} {result['frames']:>6}  {result['p50_ms']:>8.3f}  "
+                     f"{result['p95_ms']:>8.3f}  {result['p99_ms']:>8.3f}  {result['max_ms']:>8.3f}  "
+                     f"{result['surfaces']:>8}  {result['font_renders']:>12}  "
+                     f"{enter['surfaces']:>9} / {enter['font_renders']}")
+    return '\n'.join(lines)
+
+
+def run_from_command_line(argv: Optional[list[str]] = None) -> int:
+    """
+    Runs the scenes named in argv, prints their results and returns the exit status: 1 if a budget given
+    with --max-p95 was exceeded, 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(description='Run Python Alchemy without a window and measure its frames.')
+    parser.add_argument('scenes', nargs='*', metavar='scene',
+                        help=f'the scenes to run, out of {", ".join(SCRIPTS)} (default: all of them)')
+    parser.add_argument('--frames', type=int, default=600, help='the number of frames to run each scene for')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the random number generator')
+    parser.add_argument('--replay', metavar='PATH', default=None,
+                        help='play back the session recorded at PATH instead of running the scripts')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    parser.add_argument('--max-p95', type=float, default=None,
+                        help='fail if any scene\'s 95th percentile frame time is over this many milliseconds')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenes if name not in SCRIPTS]
+    if unknown:
+        parser.error(f'unknown scenes: {", ".join(unknown)}')
+
+    if args.replay is not None:
+        counter = AllocationCounter()
+        counter.install()
+        try:
+            result = replay_session(replay.load_session(args.replay), counter)
+        finally:
+            counter.uninstall()
+        print(json.dumps(result, indent=2) if args.json else format_replay(args.replay, result))
+        results = [result]
+    else:
+        results = run(args.scenes or list(SCRIPTS), args.frames, args.seed)
+        print(json.dumps(results, indent=2) if args.json else format_results(results))
+    if args.max_p95 is not None:
+        over = [result.get('scene', args.replay) for result in results if result['p95_ms'] > args.max_p95]
+        if over:
+            print(f'p95 frame time over {args.max_p95} ms in: {", ".join(over)}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    # import python_ta
+    # python_ta.check_all(config={
+    #     'extra-imports': ['argparse', 'hashlib', 'json', 'os', 'random', 'sys', 'time', 'pygame', 'main',
+    #                       'perf', 'rendercache', 'replay'],
+    #     'allowed-io': ['run_from_command_line'],
+    #     'max-line-length': 120
+    # })
+    status = run_from_command_line()
+    pygame.quit()
+    sys.exit(status)
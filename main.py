@@ -17,12 +17,33 @@ expressly prohibited.
 This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjamin Gavriely
 """
 
+import os
 import random
 import sys
+import time
+from typing import Callable, Optional
 import pygame
+import perf
 import recipeloader
+import rendercache
+import replay
+from assets import ASSETS
+from board import Board, Camera
 from button import Button, ButtonStay
 
+# Every recipe pack is loaded once per run and reused by each game session
+GRAPHS = recipeloader.GraphRegistry()
+
+# The most frames drawn per second (0 for no cap), and how long in milliseconds a scene with nothing moving
+# waits for input before checking again (0 to never wait). Lowering them lets many games share one machine.
+MAX_FPS = int(os.environ.get('PYTHON_ALCHEMY_FPS', '60'))
+IDLE_TIMEOUT = int(os.environ.get('PYTHON_ALCHEMY_IDLE_MS', '250'))
+
+# Where to record the session for replaying it later, if anywhere, and the seed of the random number
+# generator, which is chosen at random if it is not given
+RECORD_PATH = os.environ.get('PYTHON_ALCHEMY_RECORD')
+SEED = os.environ.get('PYTHON_ALCHEMY_SEED')
+
 
 def main() -> None:
     """
@@ -30,7 +51,39 @@ def main() -> None:
     """
     pygame.init()
     pygame.display.set_caption("Menu")
-    main_menu(False, [], [])
+    screen = pygame.display.set_mode((1200, 700))
+    # reads the images and sounds of the other scenes from disk while the menu is shown
+    ASSETS.preload_in_background()
+
+    # the seed is known so that a recorded session can be replayed exactly
+    seed = random.randrange(2 ** 32) if SEED is None else int(SEED)
+    random.seed(seed)
+    pointer = pygame.mouse.get_pos()
+    recorder = None if RECORD_PATH is None else replay.SessionRecorder(RECORD_PATH, seed, 'menu',
+                                                                       screen.get_size(), pointer)
+    try:
+        SceneManager(screen, GameState(False, [], []), max_fps=MAX_FPS, idle_timeout=IDLE_TIMEOUT,
+                     pointer=pointer, recorder=recorder).run()
+    finally:
+        if recorder is not None:
+            recorder.close()
+    quit_game()
+
+
+def quit_game() -> None:
+    """
+    Closes the game, printing a summary of the collected timings first if PYTHON_ALCHEMY_PERF is set.
+    """
+    if perf.report_enabled():
+        print(perf.FRAMES.report())
+        print(perf.TIMINGS.report())
+        for path, seconds in GRAPHS.load_times.items():
+            print(f'loaded {path} in {seconds * 1000:.2f} ms')
+        for cache, counters in rendercache.stats().items():
+            print(f'{cache} cache: {counters}')
+        print(f'assets: {ASSETS.memory_usage()}')
+    pygame.quit()
+    sys.exit()
 
 
 class Element:
@@ -84,9 +137,12 @@ class Element:
         self.font = font
         self.text_surface = self.render_with_outline(text, font, text_color, pygame.Color('black'), 1)
         self.rectangle_color = rectangle_color
+        # widens the element to fit labels that are too long for it
+        if self.text_surface.get_width() + 10 >= width:
+            self.rect.w = self.text_surface.get_width() + 10
         self.text_rect = self.text_surface.get_rect(center=self.rect.center)
 
-    def draw(self, screen: pygame.Surface) -> None:
+    def draw(self, screen: pygame.Surface, camera: Optional[Camera] = None) -> None:
         """
         Draws the element onto the specified screen.
 
@@ -94,9 +150,25 @@ class Element:
         - screen must be a valid Pygame Surface object.
 
         :param screen: the Pygame screen
+        :param camera: The camera the element is seen through if it is on the board, which moves and scales
+        it. Zoomed labels are resized from the rendered label through a cache instead of being rendered again.
         """
-        pygame.draw.rect(screen, self.rectangle_color, self.rect, 2)
-        screen.blit(self.text_surface, self.text_rect)
+        rect, text_surface, text_rect, border = self.rect, self.text_surface, self.text_rect, 2
+        if camera is not None:
+            rect = camera.to_screen(self.rect)
+            border = max(1, round(2 * camera.zoom))
+            if camera.zoom != 1:
+                text_surface = rendercache.scaled(text_surface, (max(1, round(text_rect.width * camera.zoom)),
+                                                                 max(1, round(text_rect.height * camera.zoom))))
+            text_rect = text_surface.get_rect(center=rect.center)
+
+        # The border is drawn as four filled strips, because Pygame shifts the lines of a thick outline that is
+        # cut by the screen's clip area, which would leave stray lines when only part of the screen is redrawn
+        x, y, width, height = rect
+        for edge in ((x, y, width, border), (x, y + height - border, width, border), (x, y, border, height),
+                     (x + width - border, y, border, height)):
+            pygame.draw.rect(screen, self.rectangle_color, edge)
+        screen.blit(text_surface, text_rect)
 
     def is_clicked(self, mouse_pos: tuple) -> bool:
         """
@@ -139,530 +211,1070 @@ class Element:
         :param outline_color: Color of the outline.
         :param outline_width: Width of the outline.
 
-        :return: A Pygame Surface object with the rendered text.
+        :return: A Pygame Surface object with the rendered text. It is shared with other elements with the same
+        label, so it must not be drawn on.
+        """
+        # Composing the outline takes five blits onto a new surface, so composed labels are cached and shared
+        return rendercache.render_outlined(font, text, text_color, outline_color, outline_width)
+
+
+class _SidebarRow:
+    """
+    One row of a DiscoveredList, which is reused for whichever discovered element scrolls into its place.
+
+    Instance Attributes:
+    - index: The index in the discovered elements of the element shown, or -1 if the row is unused.
+    - item: The name of the element shown.
+    - element: The element shown, positioned as if the list were not scrolled.
+    - surface: The row as drawn, with its index circle, index and element.
+    """
+    index: int
+    item: str
+    element: Optional[Element]
+    surface: pygame.Surface
+
+    def __init__(self, width: int, height: int) -> None:
+        """
+        Initialize an unused row with a surface of the given size.
+        """
+        self.index = -1
+        self.item = ''
+        self.element = None
+        self.surface = pygame.Surface((width, height))
+
+
+class DiscoveredList:
+    """
+    The scrollable list of discovered elements in the sidebar. Only the rows in view exist, and each is drawn
+    onto its own surface once, when the element it shows changes, so a frame costs the same however many
+    elements have been discovered. Scrolling moves a target that the view glides towards over a few frames.
+
+    Instance Attributes:
+    - graph: The graph whose discovered elements are listed.
+    - rect: The area of the screen the rows are drawn in.
+    - font: The font of the element labels.
+    - text_color: The colour of the element labels.
+    - item_color: The colour of the element borders.
+    - background_color: The colour behind the rows.
+    - row_height: The height of each row in pixels.
+    - visible_rows: The number of rows that fit in rect.
+    - offset: The scroll position in pixels from the top of the list.
+    - target: The index of the element that scrolling is gliding towards the top of the view.
+    - _rows: The reusable rows, where the element at index i is shown by _rows[i % len(_rows)].
+
+    Representation Invariants:
+    - self.row_height > 0 and self.visible_rows > 0
+    - len(self._rows) == self.visible_rows + 1
+    - self.offset >= 0 and self.target >= 0
+    """
+    graph: recipeloader.Graph
+    rect: pygame.Rect
+    font: pygame.font.Font
+    text_color: pygame.Color
+    item_color: pygame.Color
+    background_color: pygame.Color
+    row_height: int
+    visible_rows: int
+    offset: float
+    target: int
+    _rows: list[_SidebarRow]
+
+    def __init__(self, graph: recipeloader.Graph, rect: pygame.Rect, font: pygame.font.Font,
+                 text_color: pygame.Color, item_color: pygame.Color, background_color: pygame.Color,
+                 row_height: int = 60) -> None:
+        """
+        Initialize the list scrolled to the top.
+
+        :param graph: The graph whose discovered elements are listed.
+        :param rect: The area of the screen the rows are drawn in.
+        :param font: The font of the element labels.
+        :param text_color: The colour of the element labels.
+        :param item_color: The colour of the element borders.
+        :param background_color: The colour behind the rows.
+        :param row_height: The height of each row in pixels.
+        """
+        self.graph = graph
+        self.rect = rect
+        self.font = font
+        self.text_color = text_color
+        self.item_color = item_color
+        self.background_color = background_color
+        self.row_height = row_height
+        self.visible_rows = rect.height // row_height
+        self.offset = 0.0
+        self.target = 0
+        # one more row than fits, for the partly visible rows at both ends while the list glides
+        self._rows = [_SidebarRow(rect.width, row_height) for _ in range(self.visible_rows + 1)]
+
+    @property
+    def first(self) -> int:
+        """
+        The index of the discovered element nearest the top of the view.
+        """
+        return round(self.offset / self.row_height)
+
+    def is_gliding(self) -> bool:
+        """
+        Returns whether the view has yet to reach the scroll target.
         """
-        base = font.render(text, True, text_color)
-        # The size of the outline surface should be larger than the base by twice the outline width on all sides
-        outline_size = (base.get_width() + 2 * outline_width, base.get_height() + 2 * outline_width)
-        outline = pygame.Surface(outline_size, pygame.SRCALPHA)
+        return self.offset != self.target * self.row_height
 
-        # Get the positions to blit the base text onto the outline surface, centered
-        base_pos = (outline_width, outline_width)
+    def can_scroll_up(self) -> bool:
+        """
+        Returns whether there are discovered elements above the view.
+        """
+        return self.offset > 0 or self.target > 0
+
+    def can_scroll_down(self) -> bool:
+        """
+        Returns whether there are discovered elements below the view.
+        """
+        return max(self.first, self.target) + self.visible_rows < len(self.graph.discovered)
 
-        # Render the outline by drawing the text in the outline color offset in all directions
-        offsets = [(-outline_width, -outline_width), (-outline_width, outline_width),
-                   (outline_width, -outline_width), (outline_width, outline_width)]
-        for dx, dy in offsets:
-            temp_surf = font.render(text, True, outline_color)
-            outline.blit(temp_surf, (base_pos[0] + dx, base_pos[1] + dy))
+    def scroll(self, rows: int) -> bool:
+        """
+        Scrolls the list by the given number of rows, down if rows is positive, without going past either
+        end. Returns whether the list will move.
+        """
+        last = max(0, len(self.graph.discovered) - self.visible_rows)
+        target = min(last, max(0, self.target + rows))
+        moved = target != self.target
+        self.target = target
+        return moved
 
-        # Blit the base text onto the outline surface
-        outline.blit(base, base_pos)
-        return outline
+    def update(self) -> None:
+        """
+        Moves the view a step closer to the scroll target.
+        """
+        # the discovered elements may have been reset since the list was scrolled
+        self.target = min(self.target, max(0, len(self.graph.discovered) - self.visible_rows))
+        goal = self.target * self.row_height
+        distance = goal - self.offset
+        if abs(distance) <= 1:
+            self.offset = goal
+        else:
+            # glide by a third of the remaining distance per frame, and at least a pixel
+            self.offset += distance / 3 if abs(distance) >= 3 else (1 if distance > 0 else -1)
+
+    def item_at(self, pos: tuple[int, int]) -> Optional[str]:
+        """
+        Returns the name of the discovered element whose label box contains pos, or None if there is none.
+        """
+        if not self.rect.collidepoint(pos):
+            return None
+        index = int((pos[1] - self.rect.y + self.offset) // self.row_height)
+        if index >= len(self.graph.discovered):
+            return None
+        row = self._bind(index)
+        shift = index * self.row_height - self.offset
+        return row.item if row.element.rect.move(0, shift).collidepoint(pos) else None
+
+    def _bind(self, index: int) -> _SidebarRow:
+        """
+        Returns the row showing the discovered element at index, drawing it again only if that row was
+        showing a different element.
+        """
+        row = self._rows[index % len(self._rows)]
+        item = self.graph.discovered[index].item
+        if row.index == index and row.item == item:
+            return row
+        row.index, row.item = index, item
+
+        # the element and the index circle are drawn where the first row of the unscrolled list would be
+        x, y = self.rect.x, self.rect.y
+        row.element = Element(x + 60, y, 140, 45, item.title(), self.font, self.text_color, self.item_color)
+
+        surface = row.surface
+        surface.fill(self.background_color)
+        pygame.draw.circle(surface, (150, 150, 150), (31, 24), 17)
+        index_text = rendercache.render_text(rendercache.get_font("Roboto-Regular.ttf", 22), str(index + 1),
+                                             True, pygame.Color(0))
+        surface.blit(index_text, (25 if index + 1 < 10 else 18, 10))
+        pygame.draw.rect(surface, self.item_color, row.element.rect.move(-x, -y), 2)
+        surface.blit(row.element.text_surface, row.element.text_rect.move(-x, -y))
+        return row
+
+    def visible(self) -> list[tuple[_SidebarRow, pygame.Rect, pygame.Rect]]:
+        """
+        Returns each row in view, with the area of the screen it covers and the part of its surface that
+        is drawn there. Rows partly scrolled out of view are cut off at the edges of rect.
+        """
+        start = int(self.offset // self.row_height)
+        stop = min(len(self.graph.discovered), start + len(self._rows))
+        rows = []
+        for index in range(start, stop):
+            row = self._bind(index)
+            placed = row.surface.get_rect(topleft=(self.rect.x, self.rect.y + round(index * self.row_height
+                                                                                     - self.offset)))
+            shown = placed.clip(self.rect)
+            if shown:
+                rows.append((row, shown, shown.move(-placed.x, -placed.y)))
+        return rows
+
+    def draw(self, screen: pygame.Surface) -> None:
+        """
+        Draws the rows in view onto screen.
+        """
+        for row, shown, area in self.visible():
+            screen.blit(row.surface, shown, area)
+
+
+def merge_rects(rects: list[pygame.Rect]) -> list[pygame.Rect]:
+    """
+    Returns rectangles covering the same area as rects, with any that overlap or touch merged into their
+    bounding rectangle, so that no part of the screen is redrawn twice in a frame.
+    """
+    merged = []
+    for rect in rects:
+        rect = rect.copy()
+        # keep absorbing merged rectangles until rect overlaps none of them
+        i = 0
+        while i < len(merged):
+            if rect.inflate(2, 2).colliderect(merged[i]):
+                rect.union_ip(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        if rect.width and rect.height:
+            merged.append(rect)
+    return merged
 
 
 def get_font(size: int) -> pygame.font.Font:
     """
-    Gets a font using the provided font.ttf file in the assets folder
+    Gets a font using the provided font.ttf file in the assets folder. Each size is only loaded from disk once.
     :param size: The size of the fonrt in pixels
     :return: pygame font object
     """
-    return pygame.font.Font("font.ttf", size)
+    return rendercache.get_font("font.ttf", size)
 
 
-def play(chemistry: bool, discovered: list[str], extra_items: list[tuple]) -> None:
+class GameState:
     """
-    Launches the main gameplay loop.
+    The progress that is carried from one scene to the next.
 
-    :param chemistry: If True, uses chemistry recipes; otherwise, uses default recipes.
-    :param discovered: A list of discovered items, used to maintain the user's progress.
+    Instance Attributes:
+    - chemistry: Whether the chemistry recipes are used instead of the default recipes.
+    - discovered: The discovered items, used to maintain the user's progress.
+    - extra_items: The combos added by the user, as (item1, item2, item3) tuples.
     """
-    screen_width, screen_height = 1200, 700
-    screen = pygame.display.set_mode((screen_width, screen_height))
-    if not chemistry:
-        with open('recipes.json') as file:
-            g = recipeloader.Graph(file)
-    else:
-        with open('chemistry.json') as file:
-            g = recipeloader.Graph(file)
-
-    # adds the combos made by the user
-    for combo in extra_items:
-        item1, item2, item3 = combo
-        g.new_combo(item1.lower(), item2.lower(), item3.lower())
-
-    # adds the saved discovered items
-    g.update(discovered)
-
-    pygame.display.set_caption("Python Alchemy")
-
-    # Colors and Font
-    background_color = pygame.Color('#f7f6f1')
-    text_color = pygame.Color("#bc259d")
-    font = pygame.font.Font("Roboto-Regular.ttf", 24)
-    item_color = pygame.Color(0)
-
-    # initializing the sidebar
-    sidebar_width = 250
-    sidebar = pygame.Rect(screen_width - sidebar_width, 0, sidebar_width, screen_height)
-
-    # initializing the trash bin
-    trash_bin_icon = pygame.image.load("trash.png")  # Load the trash bin icon
-    trash_bin_rect = trash_bin_icon.get_rect(
-        topleft=(10, screen_height - trash_bin_icon.get_height() - 10))  # Position it at the bottom left
-
-    # initilazing the logo
-    logo_icon = pygame.image.load("Logo.png")
-    logo_rect = logo_icon.get_rect(
-        topleft=(5, 2))
-
-    # initilzazing the arrows
-    up_icon = pygame.image.load("up.png")
-    up_rect = up_icon.get_rect(topleft=(screen_width - 134, 8))
-    down_icon = pygame.image.load("down.png")
-    down_rect = down_icon.get_rect(topleft=(screen_width - 134, screen_height - 67))
-
-    # initializing the sounds
-    combine_sound1 = pygame.mixer.Sound("combine1.wav")
-    combine_sound2 = pygame.mixer.Sound("combine2.wav")
-    combine_sound3 = pygame.mixer.Sound("combine3.wav")
-    combine_sounds = [combine_sound1, combine_sound2, combine_sound3]
-    click_sound = pygame.mixer.Sound("click.wav")
-
-    # initializing elementary elements
-    elements = []
-    k = 0
-    holding = False
-    letgo = 0
-    stock_index = 0
-
-    while True:
-        screen.fill(background_color)
-        # drawing sidebar
-        pygame.draw.rect(screen, pygame.Color("#efebe0"), sidebar)
-
-        # drawing logo
-        screen.blit(logo_icon, logo_rect)
-
-        # adding elements to sidebar and the little circles
-        j = 0
-        discovered = []
-        for i, value in enumerate(g.discovered[k:(k + 10)], start=k + 1):  # Enumerate with start=k
-            # Create text surface for index
-            font2 = pygame.font.Font("Roboto-Regular.ttf", 22)
-            index_text = font2.render(str(i), True, pygame.Color(0))
-
-            # Adjust position if the index is double-digit
-            index_x = screen_width - 225 if i < 10 else screen_width - 232
-            index_y = 50 + j
-            pygame.draw.circle(screen, (150, 150, 150, 50), (screen_width - 219, index_y + 14), 17)
-
-            # Position index text beside the element
-            index_rect = index_text.get_rect(topleft=(index_x, index_y))
-            screen.blit(index_text, index_rect)
-
-            # Create and draw element
-            element = Element(screen_width - 190, 40 + j, 140, 45, value.item.title(), font, text_color, item_color)
-            discovered.append(element)
-            if element.text_surface.get_width() + 10 >= 140:
-                element.rect.w = element.text_surface.get_width() + 10
-                element.text_rect = element.text_surface.get_rect(center=element.rect.center)
-            element.draw(screen)
-            j += 60
-        # prints all elements on the screen
-        for element in elements:
-            if element.text_surface.get_width() + 10 >= 140:
-                element.rect.w = element.text_surface.get_width() + 10
-                element.text_rect = element.text_surface.get_rect(center=element.rect.center)
-            element.draw(screen)
-
-        for event in pygame.event.get():
-
-            # adding scroll when down arrow is clicked
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_DOWN:
-                    if k + 10 < len(g.discovered):
-                        k = k + 1
-                        pygame.mixer.Sound.play(click_sound)
-                if event.key == pygame.K_UP:
-                    if k - 1 >= 0:
-                        k = k - 1
-                        pygame.mixer.Sound.play(click_sound)
-
-            # spawns the element in the middle of the screen or drags element
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                # spawns in middle
-                stock_index = None
-                for discover in discovered:
-                    if discover.is_clicked(event.pos):
-                        pygame.mixer.Sound.play(click_sound)
-                        elements.append(Element(400 + random.randint(-100, 100), 300 + random.randint(-100, 100),
-                                                140, 45, discover.text.title(), font, text_color, item_color))
-
-                # drags the item
-                for num, element in enumerate(elements):
-                    if element.is_clicked(event.pos):
-                        stock_index = num
-                        holding = True
-
-            if event.type == pygame.MOUSEBUTTONUP:
-                holding = False
-            if event.type == pygame.MOUSEMOTION:
-                if holding:
-                    if len(elements) > 0:
-                        elements[stock_index].move_ip(*event.rel)
-                        letgo = 1
-
-            # trash bin and arrow function and back to main menu
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                if trash_bin_rect.collidepoint(event.pos):  # Check if the trash bin is clicked
-                    pygame.mixer.Sound.play(click_sound)
-                    elements = []
-                    stock_index = None
-                if up_rect.collidepoint(event.pos):
-                    if k - 1 >= 0:
-                        pygame.mixer.Sound.play(click_sound)
-                        k = k - 1
-                if down_rect.collidepoint(event.pos):
-                    if k + 10 < len(g.discovered):
-                        pygame.mixer.Sound.play(click_sound)
-                        k = k + 1
-
-                if logo_rect.collidepoint(event.pos):
-                    if elements:
-                        for element in elements:
-                            if not logo_rect.colliderect(element.rect):
-                                pygame.mixer.Sound.play(click_sound)
-                                update_discovered = g.downdate()
-                                main_menu(chemistry, update_discovered, extra_items)
-                    else:
-                        pygame.mixer.Sound.play(click_sound)
-                        update_discovered = g.downdate()
-                        main_menu(chemistry, update_discovered, extra_items)
-
-            # Combine items if not holding
-            if not holding and letgo == 1:
-                for element in elements:
-                    if (stock_index and element != elements[stock_index]
-                            and pygame.Rect.colliderect(elements[stock_index].rect, element.rect)):
-                        valid_combo, item_created = g.combine(element.text.lower(), elements[stock_index].text.lower())
-                        if valid_combo:
-                            x, y = pygame.mouse.get_pos()
-                            elements.append(Element(x - 70, y - 25, 140, 45,
-                                                    item_created, font, text_color, item_color))
-                            elements.remove(elements[stock_index])
-                            elements.remove(element)
-                            letgo = 0
-                            pygame.mixer.Sound.play(combine_sounds[random.randint(0, 2)])
-                            break
-
-        # Draw the trash bin
-        screen.blit(trash_bin_icon, trash_bin_rect)
-
-        # Draws the little arrows when you can go up and down
-        if k - 1 >= 0:
-            screen.blit(up_icon, up_rect)
-        if k + 10 < len(g.discovered):
-            screen.blit(down_icon, down_rect)
-
-        # Draws the number of items currently found
-        font3 = pygame.font.Font("Roboto-Regular.ttf", 20)
-        discover_text = font3.render(f"Discovered: {len(g.discovered)} / {len(g.get_vertices())}", True, "Black")
-        discover_rect = discover_text.get_rect(topleft=(screen_width - 225, screen_height - 30))
-        screen.blit(discover_text, discover_rect)
+    chemistry: bool
+    discovered: list[str]
+    extra_items: list[tuple]
 
-        pygame.display.flip()
+    def __init__(self, chemistry: bool, discovered: list[str], extra_items: list[tuple]) -> None:
+        """
+        Initializes the state of a game.
+        """
+        self.chemistry = chemistry
+        self.discovered = discovered
+        self.extra_items = extra_items
 
 
-def options(chemistry: bool, discovered: list[str], extra_items: list) -> None:
+class Scene:
+    """
+    A screen of the game, run by a SceneManager. A scene loads what it needs in enter, reacts to events
+    in handle_event, draws a frame in draw and hands its progress back to the shared GameState in exit.
+    To move to another screen, a scene sets next_scene to that screen's name in SCENES, or to 'quit'.
+
+    Instance Attributes:
+    - screen: The Pygame screen the scene is drawn on.
+    - state: The progress shared between scenes.
+    - next_scene: The name of the scene to switch to after the current event, or None to stay.
+    - pointer: The last known position of the mouse on the screen, given by the SceneManager before enter
+      and kept up to date by the scene from its events if it needs it.
     """
-    Displays the options menu to toggle game settings.
+    screen: pygame.Surface
+    state: GameState
+    next_scene: Optional[str]
+    pointer: tuple[int, int]
+
+    def __init__(self, screen: pygame.Surface, state: GameState) -> None:
+        """
+        Initializes a scene. Resources are loaded in enter, not here.
+        """
+        self.screen = screen
+        self.state = state
+        self.next_scene = None
+        self.pointer = (0, 0)
 
-    :param chemistry: The current state of chemistry mode, used to toggle the setting.
-    :param discovered: A list of discovered items, used to maintain the user's progress.
+    def enter(self) -> None:
+        """
+        Loads the resources of the scene. Called once, before the first frame.
+        """
+
+    def handle_event(self, event: pygame.event.Event) -> None:
+        """
+        Reacts to a single Pygame event.
+        """
+
+    def is_animating(self) -> bool:
+        """
+        Returns whether the scene changes from one frame to the next without any input. When it does not,
+        the SceneManager waits for input instead of drawing frames that would look the same.
+        """
+        return False
+
+    def draw(self) -> Optional[list[pygame.Rect]]:
+        """
+        Draws the next frame of the scene onto self.screen.
+
+        :return: The areas of the screen that changed, or None if the whole screen should be updated.
+        """
+        return None
+
+    def exit(self) -> None:
+        """
+        Saves the scene's progress into self.state. Called once, after the last frame.
+        """
+
+
+class MenuScene(Scene):
     """
-    background = pygame.image.load("optionsbackground.png")
-    screen_width, screen_height = 1200, 700
-    screen = pygame.display.set_mode((screen_width, screen_height))
-    click_sound = pygame.mixer.Sound("click.wav")
-    chemupdate = chemistry
-    item1, item2, item3 = '', '', ''
-    item1on, item2on, item3on = False, False, False
-    while True:
-        options_mouse_pos = pygame.mouse.get_pos()
-
-        screen.blit(background, (0, 0))
-
-        options_text = get_font(45).render("Options", True, "White")
-        options_rect = options_text.get_rect(center=(screen_width // 2 + 15, 35))
-        screen.blit(options_text, options_rect)
+    The main menu, with buttons to play, open the options and quit.
+
+    Instance Attributes:
+    - background: The background image of the menu.
+    - click_sound: The sound played when a button is clicked.
+    - play_button, options_button, quit_button: The buttons of the menu.
+    """
+    background: pygame.Surface
+    click_sound: pygame.mixer.Sound
+    play_button: Button
+    options_button: Button
+    quit_button: Button
+
+    def enter(self) -> None:
+        """
+        Loads the menu's images and sounds.
+        """
+        self.background = ASSETS.image("background.png")
+        self.click_sound = ASSETS.sound("click.wav")
+        pygame.display.set_caption("Menu")
+        self._build_buttons()
+        self._hover(self.pointer)
+
+    def _build_buttons(self) -> None:
+        """
+        Creates the menu's buttons, which are kept until the menu is entered again.
+        """
+        self.play_button = Button(image=ASSETS.image("Play Rect.png"), pos=(640, 250),
+                                  text_input="PLAY", font=get_font(75), base_color="#d7fcd4", hovering_color="White")
+        self.options_button = Button(image=ASSETS.image("Options Rect.png"), pos=(640, 400),
+                                     text_input="OPTIONS", font=get_font(75), base_color="#d7fcd4",
+                                     hovering_color="White")
+        self.quit_button = Button(image=ASSETS.image("Quit Rect.png"), pos=(640, 550),
+                                  text_input="QUIT", font=get_font(75), base_color="#d7fcd4", hovering_color="White")
+
+    def _hover(self, pos: tuple[int, int]) -> None:
+        """
+        Highlights the button under the mouse at pos.
+        """
+        for button in [self.play_button, self.options_button, self.quit_button]:
+            button.changecolor(pos)
+
+    def handle_event(self, event: pygame.event.Event) -> None:
+        """
+        Highlights the button under the mouse, and moves to the chosen scene when a button is clicked.
+        """
+        if event.type == pygame.MOUSEMOTION:
+            self._hover(event.pos)
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            menu_mouse_pos = event.pos
+            if self.play_button.checkforinput(menu_mouse_pos):
+                pygame.mixer.Sound.play(self.click_sound)
+                self.next_scene = 'play'
+            if self.options_button.checkforinput(menu_mouse_pos):
+                pygame.mixer.Sound.play(self.click_sound)
+                self.next_scene = 'options'
+            if self.quit_button.checkforinput(menu_mouse_pos):
+                pygame.mixer.Sound.play(self.click_sound)
+                self.next_scene = 'quit'
+
+    def draw(self) -> None:
+        """
+        Draws the menu.
+        """
+        self.screen.blit(self.background, (0, 0))
+        menu_text = rendercache.render_text(get_font(74), "Python Alchemy", True, "#12CDEC")
+        menu_rect = menu_text.get_rect(center=(640, 100))
+        self.screen.blit(menu_text, menu_rect)
+
+        for button in [self.play_button, self.options_button, self.quit_button]:
+            button.update(self.screen)
+
+
+class OptionsScene(Scene):
+    """
+    The options menu, used to toggle chemistry mode, write and load the save file, and add new combos.
+
+    Instance Attributes:
+    - chemistry: The mode the progress in discovered belongs to.
+    - discovered: The discovered items, which are replaced when a save is loaded.
+    - chemupdate: The mode selected with the chemistry button.
+    - items: The text typed for the first item, the second item and the result of a new combo.
+    - item_on: Which of the three combo text fields is selected.
+    - background: The background image of the options menu.
+    - click_sound: The sound played when a button is clicked.
+    - options_back, savebutton, loadbutton, addbutton: The buttons of the options menu.
+    - item_buttons: The buttons that select each of the three combo text fields.
+    - chembutton: The button that toggles chemistry mode.
+    - static_layer: The background and labels of the options menu, which never change, composed when the
+      scene is entered and again only if the size of the screen changes.
+    """
+    chemistry: bool
+    discovered: list[str]
+    chemupdate: bool
+    items: list[str]
+    item_on: list[bool]
+    background: pygame.Surface
+    click_sound: pygame.mixer.Sound
+    options_back: Button
+    savebutton: Button
+    loadbutton: Button
+    addbutton: Button
+    item_buttons: list[ButtonStay]
+    chembutton: ButtonStay
+    static_layer: pygame.Surface
+
+    def enter(self) -> None:
+        """
+        Loads the options menu's images and sounds.
+        """
+        self.background = ASSETS.image("optionsbackground.png")
+        self.click_sound = ASSETS.sound("click.wav")
+        self.chemistry = self.state.chemistry
+        self.discovered = self.state.discovered
+        self.chemupdate = self.chemistry
+        self.items = ['', '', '']
+        self.item_on = [False, False, False]
+        self._build_buttons()
+        self._hover(self.pointer)
+        self._compose_static_layer()
+
+    def _compose_static_layer(self) -> None:
+        """
+        Draws the background and every label that never changes onto static_layer.
+        """
+        screen_width, _ = self.screen.get_size()
+        layer = self.static_layer = pygame.Surface(self.screen.get_size()).convert(self.screen)
+        layer.blit(self.background, (0, 0))
 
-        options_back = Button(image=None, pos=(screen_width - 100, screen_height - 40),
-                              text_input="BACK", font=get_font(40), base_color="White", hovering_color="Green")
-        options_back.changecolor(options_mouse_pos)
-        options_back.update(screen)
+        options_text = rendercache.render_text(get_font(45), "Options", True, "White")
+        options_rect = options_text.get_rect(center=(screen_width // 2 + 15, 35))
+        layer.blit(options_text, options_rect)
 
-        # Chemistry buttons
-        chemtext = get_font(40).render("Chemistry Mode:", True, "White")
+        # Chemistry label
+        chemtext = rendercache.render_text(get_font(40), "Chemistry Mode:", True, "White")
         chemrect = chemtext.get_rect(topleft=(15, 170))
-        screen.blit(chemtext, chemrect)
+        layer.blit(chemtext, chemrect)
 
         # Save/Load text
-        savetext = get_font(40).render("Write Save:", True, "White")
+        savetext = rendercache.render_text(get_font(40), "Write Save:", True, "White")
         saverect = savetext.get_rect(topleft=(15, 270))
-        loadtext = get_font(40).render("Load Save:", True, "White")
+        loadtext = rendercache.render_text(get_font(40), "Load Save:", True, "White")
         loadrect = savetext.get_rect(topleft=(15, 370))
-        screen.blit(savetext, saverect)
-        screen.blit(loadtext, loadrect)
-
-        # Save/Load buttons
-        saverect = pygame.Rect(screen_width - 195, 258, 185, 60)
-        pygame.draw.rect(screen, "Green", saverect)
-        savebutton = Button(image=None, pos=(screen_width - 100, 290),
-                            text_input="SAVE", font=get_font(40), base_color="Black", hovering_color="White")
-        savebutton.changecolor(options_mouse_pos)
-        savebutton.update(screen)
-
-        loadrect = pygame.Rect(screen_width - 195, 358, 185, 60)
-        pygame.draw.rect(screen, "Red", loadrect)
-        loadbutton = Button(image=None, pos=(screen_width - 100, 390),
-                            text_input="LOAD", font=get_font(40), base_color="Black", hovering_color="White")
-        loadbutton.changecolor(options_mouse_pos)
-        loadbutton.update(screen)
+        layer.blit(savetext, saverect)
+        layer.blit(loadtext, loadrect)
 
-        # New combo option
+        # Save/Load button backgrounds
+        pygame.draw.rect(layer, "Green", pygame.Rect(screen_width - 195, 258, 185, 60))
+        pygame.draw.rect(layer, "Red", pygame.Rect(screen_width - 195, 358, 185, 60))
 
-        combotext = get_font(40).render("Add a New Combo", True, "White")
+        # New combo option
+        combotext = rendercache.render_text(get_font(40), "Add a New Combo", True, "White")
         comborect = chemtext.get_rect(center=(screen_width // 2, 470))
-        screen.blit(combotext, comborect)
-
-        # The add combo button
-
-        addbutton = Button(image=None, pos=(screen_width // 2, 470),
-                           text_input="Add a New Combo", font=get_font(40), base_color="White", hovering_color="Purple")
-        addbutton.changecolor(options_mouse_pos)
-        addbutton.update(screen)
+        layer.blit(combotext, comborect)
 
-        plustext = get_font(40).render("+", True, "White")
+        plustext = rendercache.render_text(get_font(40), "+", True, "White")
         plusrect = plustext.get_rect(center=(screen_width // 2 - 150, 540))
+        layer.blit(plustext, plusrect)
 
-        screen.blit(plustext, plusrect)
-
-        equaltext = get_font(40).render("=", True, "White")
+        equaltext = rendercache.render_text(get_font(40), "=", True, "White")
         equalrect = equaltext.get_rect(center=(screen_width // 2 + 150, 540))
+        layer.blit(equaltext, equalrect)
 
-        screen.blit(equaltext, equalrect)
+    def _build_buttons(self) -> None:
+        """
+        Creates the options menu's buttons to match the current settings. The buttons are kept until the
+        options menu is entered again, and are changed when the settings are.
+        """
+        screen_width, screen_height = self.screen.get_size()
+        self.options_back = Button(image=None, pos=(screen_width - 100, screen_height - 40),
+                                   text_input="BACK", font=get_font(40), base_color="White", hovering_color="Green")
+        self.savebutton = Button(image=None, pos=(screen_width - 100, 290),
+                                 text_input="SAVE", font=get_font(40), base_color="Black", hovering_color="White")
+        self.loadbutton = Button(image=None, pos=(screen_width - 100, 390),
+                                 text_input="LOAD", font=get_font(40), base_color="Black", hovering_color="White")
+        self.addbutton = Button(image=None, pos=(screen_width // 2, 470), text_input="Add a New Combo",
+                                font=get_font(40), base_color="White", hovering_color="Purple")
+        self.item_buttons = [
+            ButtonStay(image=None, pos=(screen_width // 2 + offset, 540), text_input=f"item{i + 1}",
+                       font=get_font(24), base_color="Black", hovering_color="White", clicked=self.item_on[i])
+            for i, offset in enumerate((-300, 0, 300))]
+        self.chembutton = ButtonStay(image=None, pos=(screen_width - 100, 190),
+                                     text_input="ON" if self.chemupdate else "OFF", font=get_font(40),
+                                     base_color="Black", hovering_color="White", clicked=self.chemupdate)
+
+    def _buttons(self) -> list[Button]:
+        """
+        Returns every button of the options menu.
+        """
+        return [self.options_back, self.savebutton, self.loadbutton, self.addbutton, *self.item_buttons,
+                self.chembutton]
 
-        if not item1on:
-            item1_button = ButtonStay(image=None, pos=(screen_width // 2 - 300, 540), text_input="item1",
-                                      font=get_font(24), base_color="Black", hovering_color="White", clicked=False)
-        else:
-            item1_button = ButtonStay(image=None, pos=(screen_width // 2 - 300, 540), text_input="item1",
-                                      font=get_font(24),
-                                      base_color="Black", hovering_color="White", clicked=True)
-        item1_button.changecolor(options_mouse_pos)
-        item1_button.update(screen)
-
-        if not item2on:
-            item2_button = ButtonStay(image=None, pos=(screen_width // 2, 540), text_input="item2", font=get_font(24),
-                                      base_color="Black", hovering_color="White", clicked=False)
-        else:
-            item2_button = ButtonStay(image=None, pos=(screen_width // 2, 540), text_input="item2", font=get_font(24),
-                                      base_color="Black", hovering_color="White", clicked=True)
-        item2_button.changecolor(options_mouse_pos)
-        item2_button.update(screen)
-
-        if not item3on:
-            item3_button = ButtonStay(image=None, pos=(screen_width // 2 + 300, 540), text_input="item3",
-                                      font=get_font(24), base_color="Black", hovering_color="White", clicked=False)
-        else:
-            item3_button = ButtonStay(image=None, pos=(screen_width // 2 + 300, 540), text_input="item3",
-                                      font=get_font(24), base_color="Black", hovering_color="White", clicked=True)
+    def _hover(self, pos: tuple[int, int]) -> None:
+        """
+        Highlights the button under the mouse at pos.
+        """
+        for button in self._buttons():
+            button.changecolor(pos)
+
+    def _select_item(self, selected: list[bool]) -> None:
+        """
+        Selects the combo text fields that are True in selected and deselects the others.
+        """
+        self.item_on = selected
+        for item_button, item_on in zip(self.item_buttons, selected):
+            item_button.clicked = item_on
 
-        item3_button.changecolor(options_mouse_pos)
-        item3_button.update(screen)
+    def handle_event(self, event: pygame.event.Event) -> None:
+        """
+        Reacts to the mouse moving over and clicking on the buttons, and to text typed into the selected combo
+        text field.
+        """
+        if event.type == pygame.MOUSEMOTION:
+            self._hover(event.pos)
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            options_mouse_pos = event.pos
+            if self.options_back.checkforinput(options_mouse_pos):
+                pygame.mixer.Sound.play(self.click_sound)
+                self.next_scene = 'menu'
+            if self.chembutton.checkforinput(options_mouse_pos):
+                pygame.mixer.Sound.play(self.click_sound)
+                self.chemupdate = not self.chemupdate
+                self.chembutton.clicked = self.chemupdate
+                self.chembutton.set_text("ON" if self.chemupdate else "OFF")
+            if self.savebutton.checkforinput(options_mouse_pos):
+                pygame.mixer.Sound.play(self.click_sound)
+                write_save(self.discovered, self.chemistry)
+            if self.loadbutton.checkforinput(options_mouse_pos):
+                pygame.mixer.Sound.play(self.click_sound)
+                self.chemistry, self.discovered = load_save('save.csv')
+            if self.addbutton.checkforinput(options_mouse_pos):
+                pygame.mixer.Sound.play(self.click_sound)
+                self.state.extra_items.append(tuple(self.items))
+                self.items = ['', '', '']
+                self._select_item([False, False, False])
+
+            # If the input buttons are clicked, select that text field and deselect the others
+            for i, item_button in enumerate(self.item_buttons):
+                if item_button.checkforinput(options_mouse_pos):
+                    selected = [False, False, False]
+                    selected[i] = not self.item_on[i]
+                    self._select_item(selected)
+
+        # If any of the buttons are clicked get user text input
+        for i in range(3):
+            if self.item_on[i] and event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_BACKSPACE:
+                    self.items[i] = self.items[i][:-1]
+                elif event.key == pygame.K_RETURN:
+                    self.item_on[i] = False
+                    self.item_buttons[i].clicked = False
+                else:
+                    self.items[i] += event.unicode
+
+    def draw(self) -> None:
+        """
+        Draws the options menu and the text typed into the selected combo text field.
+        """
+        screen = self.screen
+        screen_width, _ = screen.get_size()
+        if self.static_layer.get_size() != screen.get_size():
+            self._compose_static_layer()
 
-        if chemupdate:
-            chembutton = ButtonStay(image=None, pos=(screen_width - 100, 190), text_input="ON", font=get_font(40),
-                                    base_color="Black", hovering_color="White", clicked=True)
-        else:
-            chembutton = ButtonStay(image=None, pos=(screen_width - 100, 190), text_input="OFF", font=get_font(40),
-                                    base_color="Black", hovering_color="White", clicked=False)
-        chembutton.changecolor(options_mouse_pos)
-        chembutton.update(screen)
+        screen.blit(self.static_layer, (0, 0))
+        for button in self._buttons():
+            button.update(screen)
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                if options_back.checkforinput(options_mouse_pos):
-                    pygame.mixer.Sound.play(click_sound)
-                    if chemupdate != chemistry:
-                        discovered = []
-                    main_menu(chemupdate, discovered, extra_items)
-                if chembutton.checkforinput(options_mouse_pos):
-                    pygame.mixer.Sound.play(click_sound)
-                    if chembutton.clicked:
-                        chembutton.clicked = False
-                        chemupdate = False
-                    else:
-                        chembutton.clicked = True
-                        chemupdate = True
-                if savebutton.checkforinput(options_mouse_pos):
-                    pygame.mixer.Sound.play(click_sound)
-                    write_save(discovered, chemistry)
-                if loadbutton.checkforinput(options_mouse_pos):
-                    pygame.mixer.Sound.play(click_sound)
-                    chemistry, discovered = load_save('save.csv')
-                if addbutton.checkforinput(options_mouse_pos):
-                    pygame.mixer.Sound.play(click_sound)
-                    extra_items.append((item1, item2, item3))
-                    item1, item2, item3 = "", "", ""
-                    item1on, item2on, item3on = False, False, False
-
-                # If the input buttons are clicked
-                if item1_button.checkforinput(options_mouse_pos):
-                    if item1on:
-                        item1_button.clicked = False
-                        item1on = False
-                    else:
-                        item1_button.clicked = True
-                        item1on = True
-                        item2on, item3on = False, False
-                        item2_button.clicked, item3_button.clicked = False, False
-
-                if item2_button.checkforinput(options_mouse_pos):
-                    if item2on:
-                        item2_button.clicked = False
-                        item2on = False
-                    else:
-                        item2_button.clicked = True
-                        item2on = True
-                        item1on, item3on = False, False
-                        item1_button.clicked, item3_button.clicked = False, False
-
-                if item3_button.checkforinput(options_mouse_pos):
-                    if item3on:
-                        item3_button.clicked = False
-                        item3on = False
-                    else:
-                        item3_button.clicked = True
-                        item3on = True
-                        item1on, item2on = False, False
-                        item1_button.clicked, item2_button.clicked = False, False
-
-            # If any of the buttons are clicked get user text input
-            if item1on:
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_BACKSPACE:
-                        item1 = item1[:-1]
-                    elif event.key == pygame.K_RETURN:
-                        item1on = False
-                        item1_button = False
-                    else:
-                        item1 += event.unicode
-            if item2on:
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_BACKSPACE:
-                        item2 = item2[:-1]
-                    elif event.key == pygame.K_RETURN:
-                        item2on = False
-                        item2_button = False
-                    else:
-                        item2 += event.unicode
-            if item3on:
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_BACKSPACE:
-                        item3 = item3[:-1]
-                    elif event.key == pygame.K_RETURN:
-                        item3on = False
-                        item3_button = False
-                    else:
-                        item3 += event.unicode
         # Draws the text input
-        if item1on:
-            item1surface = get_font(30).render(item1, True, pygame.Color('White'))
-            text_rect = item1surface.get_rect(center=(screen_width // 2, 600))
-            if len(item1) > 5:
-                underlinesurface = get_font(6).render(item1 * 5, True, pygame.Color('White'))
-            else:
-                underlinesurface = get_font(6).render("whiteline" * 3, True, pygame.Color('White'))
-            underline_rect = underlinesurface.get_rect(center=(screen_width // 2, 620))
-            pygame.draw.rect(screen, "White", underline_rect)
-            screen.blit(item1surface, text_rect)
-
-        if item2on:
-            item2surface = get_font(30).render(item2, True, pygame.Color('White'))
-            text_rect = item2surface.get_rect(center=(screen_width // 2, 600))
-            if len(item2) > 5:
-                underlinesurface = get_font(6).render(item2 * 5, True, pygame.Color('White'))
-            else:
-                underlinesurface = get_font(6).render("whiteline" * 3, True, pygame.Color('White'))
-            underline_rect = underlinesurface.get_rect(center=(screen_width // 2, 620))
-            pygame.draw.rect(screen, "White", underline_rect)
-            screen.blit(item2surface, text_rect)
-
-        if item3on:
-            item3surface = get_font(30).render(item3, True, pygame.Color('White'))
-            text_rect = item3surface.get_rect(center=(screen_width // 2, 600))
-            if len(item3) > 5:
-                underlinesurface = get_font(6).render(item3 * 5, True, pygame.Color('White'))
+        for item, item_on in zip(self.items, self.item_on):
+            if item_on:
+                itemsurface = rendercache.render_text(get_font(30), item, True, pygame.Color('White'))
+                text_rect = itemsurface.get_rect(center=(screen_width // 2, 600))
+                # the underline is as wide as the text would be in a tiny font
+                underline_size = get_font(6).size(item * 5 if len(item) > 5 else "whiteline" * 3)
+                underline_rect = pygame.Rect((0, 0), underline_size)
+                underline_rect.center = (screen_width // 2, 620)
+                pygame.draw.rect(screen, "White", underline_rect)
+                screen.blit(itemsurface, text_rect)
+
+    def exit(self) -> None:
+        """
+        Applies the selected mode. Switching mode starts over, since progress in one mode does not carry over.
+        """
+        if self.chemupdate != self.chemistry:
+            self.discovered = []
+        self.state.chemistry = self.chemupdate
+        self.state.discovered = self.discovered
+
+
+class PlayScene(Scene):
+    """
+    The main gameplay, where elements from the sidebar are dragged onto the board and combined.
+
+    Instance Attributes:
+    - g: The recipe graph of the current mode, shared through GRAPHS.
+    - background_color, text_color, item_color: The colours of the board and its elements.
+    - font: The font of the element labels.
+    - sidebar: The area of the screen with the discovered elements.
+    - discovered_list: The scrollable list of discovered elements in the sidebar.
+    - trash_bin_icon, logo_icon, up_icon, down_icon: The images drawn on the board.
+    - trash_bin_rect, logo_rect, up_rect, down_rect: Where the images are drawn.
+    - combine_sounds: The sounds played when two elements are combined.
+    - click_sound: The sound played when something is clicked.
+    - board: The elements on the board, in drawing order and indexed by where they are.
+    - camera: The part of the board shown on the screen, which can be panned and zoomed.
+    - static_layer: The parts of the board that never change, drawn once when the scene is entered.
+    - drawn: What each item drawn in the last frame looked like, mapped to the area it covered.
+    - redraw_all: Whether the next frame must redraw and update the whole screen.
+    - holding: Whether an element is being dragged.
+    - letgo: 1 if an element was dragged and may need to be combined, 0 otherwise.
+    - held: The element being dragged, or that was dragged last and may still need to be combined, if any.
+    - grab: Where on the dragged element it was picked up, relative to its top left.
+    - panning: Whether the board is being dragged with the right or middle mouse button.
+    """
+    g: recipeloader.Graph
+    background_color: pygame.Color
+    text_color: pygame.Color
+    item_color: pygame.Color
+    font: pygame.font.Font
+    sidebar: pygame.Rect
+    discovered_list: DiscoveredList
+    trash_bin_icon: pygame.Surface
+    trash_bin_rect: pygame.Rect
+    logo_icon: pygame.Surface
+    logo_rect: pygame.Rect
+    up_icon: pygame.Surface
+    up_rect: pygame.Rect
+    down_icon: pygame.Surface
+    down_rect: pygame.Rect
+    combine_sounds: list[pygame.mixer.Sound]
+    click_sound: pygame.mixer.Sound
+    board: Board
+    camera: Camera
+    static_layer: pygame.Surface
+    drawn: dict[tuple, pygame.Rect]
+    redraw_all: bool
+    holding: bool
+    letgo: int
+    held: Optional[Element]
+    grab: tuple[int, int]
+    panning: bool
+
+    def enter(self) -> None:
+        """
+        Restores the player's progress onto the graph of the current mode and loads the board's resources.
+        """
+        screen_width, screen_height = self.screen.get_size()
+        if not self.state.chemistry:
+            self.g = GRAPHS.get('recipes.json')
+        else:
+            self.g = GRAPHS.get('chemistry.json')
+
+        # adds the combos made by the user
+        for combo in self.state.extra_items:
+            item1, item2, item3 = combo
+            self.g.new_combo(item1.lower(), item2.lower(), item3.lower())
+
+        # restores the saved discovered items onto the shared graph
+        self.g.restore(self.state.discovered)
+
+        pygame.display.set_caption("Python Alchemy")
+
+        # Colors and Font
+        self.background_color = pygame.Color('#f7f6f1')
+        self.text_color = pygame.Color("#bc259d")
+        self.font = rendercache.get_font("Roboto-Regular.ttf", 24)
+        self.item_color = pygame.Color(0)
+
+        # initializing the sidebar
+        sidebar_width = 250
+        self.sidebar = pygame.Rect(screen_width - sidebar_width, 0, sidebar_width, screen_height)
+        self.discovered_list = DiscoveredList(self.g, pygame.Rect(self.sidebar.x, 40, sidebar_width, 600), self.font,
+                                              self.text_color, self.item_color, pygame.Color("#efebe0"))
+
+        # initializing the trash bin
+        self.trash_bin_icon = ASSETS.image("trash.png")  # Load the trash bin icon
+        self.trash_bin_rect = self.trash_bin_icon.get_rect(
+            topleft=(10, screen_height - self.trash_bin_icon.get_height() - 10))  # Position it at the bottom left
+
+        # initilazing the logo
+        self.logo_icon = ASSETS.image("Logo.png")
+        self.logo_rect = self.logo_icon.get_rect(topleft=(5, 2))
+
+        # initilzazing the arrows
+        self.up_icon = ASSETS.image("up.png")
+        self.up_rect = self.up_icon.get_rect(topleft=(screen_width - 134, 8))
+        self.down_icon = ASSETS.image("down.png")
+        self.down_rect = self.down_icon.get_rect(topleft=(screen_width - 134, screen_height - 67))
+
+        # initializing the sounds
+        self.combine_sounds = [ASSETS.sound("combine1.wav"), ASSETS.sound("combine2.wav"),
+                               ASSETS.sound("combine3.wav")]
+        self.click_sound = ASSETS.sound("click.wav")
+
+        # the background, sidebar and logo are drawn once, and each frame only redraws what changed on top
+        self.static_layer = pygame.Surface(self.screen.get_size()).convert(self.screen)
+        self.static_layer.fill(self.background_color)
+        pygame.draw.rect(self.static_layer, pygame.Color("#efebe0"), self.sidebar)
+        self.static_layer.blit(self.logo_icon, self.logo_rect)
+        self.drawn = {}
+        self.redraw_all = True
+
+        # initializing elementary elements on a board four times the size of the screen each way
+        self.board = Board()
+        self.camera = Camera(self.screen.get_rect(), pygame.Rect(0, 0, 4 * screen_width, 4 * screen_height))
+        self.holding = False
+        self.letgo = 0
+        self.held = None
+        self.grab = (0, 0)
+        self.panning = False
+
+    def handle_event(self, event: pygame.event.Event) -> None:
+        """
+        Handles scrolling the sidebar, spawning, dragging, combining and trashing elements, and going back
+        to the menu when the logo is clicked.
+        """
+        g, board, camera, discovered_list = self.g, self.board, self.camera, self.discovered_list
+        if hasattr(event, 'pos'):
+            self.pointer = event.pos
+
+        # the window's contents may have been lost, e.g. while it was covered or minimised
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+            self.redraw_all = True
+
+        # scrolls the sidebar by a row with the arrow keys or the mouse wheel, or by a page
+        page = discovered_list.visible_rows
+        scroll_keys = {pygame.K_DOWN: 1, pygame.K_UP: -1, pygame.K_PAGEDOWN: page, pygame.K_PAGEUP: -page,
+                       pygame.K_END: len(g.discovered), pygame.K_HOME: -len(g.discovered)}
+        if event.type == pygame.KEYDOWN and event.key in scroll_keys:
+            if discovered_list.scroll(scroll_keys[event.key]):
+                pygame.mixer.Sound.play(self.click_sound)
+        # the mouse wheel scrolls the sidebar when over it, and zooms the board about the mouse elsewhere
+        if event.type == pygame.MOUSEWHEEL:
+            if self.sidebar.collidepoint(self.pointer):
+                discovered_list.scroll(-event.y)
             else:
-                underlinesurface = get_font(6).render("whiteline" * 3, True, pygame.Color('White'))
-            underline_rect = underlinesurface.get_rect(center=(screen_width // 2, 620))
-            pygame.draw.rect(screen, "White", underline_rect)
-            screen.blit(item3surface, text_rect)
+                camera.zoom_at(self.pointer, 1.1 ** event.y)
+
+        # pans the board while it is dragged with the right or middle mouse button
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button in (2, 3):
+            self.panning = True
+        if event.type == pygame.MOUSEBUTTONUP and event.button in (2, 3):
+            self.panning = False
+        if event.type == pygame.MOUSEMOTION and self.panning:
+            camera.pan(*event.rel)
+
+        # spawns the element in the middle of the screen or drags element
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            # spawns in middle
+            item = discovered_list.item_at(event.pos)
+            if item is not None:
+                pygame.mixer.Sound.play(self.click_sound)
+                x, y = camera.to_world((400 + random.randint(-100, 100), 300 + random.randint(-100, 100)))
+                board.add(Element(x, y, 140, 45, item.title(), self.font, self.text_color, self.item_color))
+
+            # drags the item drawn on top under the mouse
+            x, y = camera.to_world(event.pos)
+            self.held = board.topmost_at((x, y))
+            if self.held is not None:
+                self.holding = True
+                self.grab = (x - self.held.rect.x, y - self.held.rect.y)
+
+        if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self.holding = False
+        if event.type == pygame.MOUSEMOTION:
+            if self.holding and self.held is not None:
+                # keeps the point the element was picked up at under the mouse, whatever the zoom
+                x, y = camera.to_world(event.pos)
+                board.move(self.held, x - self.grab[0] - self.held.rect.x, y - self.grab[1] - self.held.rect.y)
+                self.letgo = 1
+
+        # trash bin and arrow function and back to main menu
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            if self.trash_bin_rect.collidepoint(event.pos):  # Check if the trash bin is clicked
+                pygame.mixer.Sound.play(self.click_sound)
+                board.clear()
+                self.held = None
+            if self.up_rect.collidepoint(event.pos):
+                if discovered_list.scroll(-1):
+                    pygame.mixer.Sound.play(self.click_sound)
+            if self.down_rect.collidepoint(event.pos):
+                if discovered_list.scroll(1):
+                    pygame.mixer.Sound.play(self.click_sound)
+
+            if self.logo_rect.collidepoint(event.pos):
+                if not board or len(board.colliding(camera.to_world_rect(self.logo_rect))) < len(board):
+                    pygame.mixer.Sound.play(self.click_sound)
+                    self.next_scene = 'menu'
+
+        # Combine items if not holding
+        if not self.holding and self.letgo == 1 and self.held is not None:
+            with perf.TIMINGS.timed('combine'):
+                self._combine_dropped()
+
+    def _combine_dropped(self) -> None:
+        """
+        Combines the element that was just dropped with the topmost element it touches that it makes
+        something with, replacing both with the result where the mouse is.
+        """
+        board, camera = self.board, self.camera
+        # tries the elements touching the dropped one from the top down
+        for element in board.colliding(self.held.rect, exclude=self.held):
+            valid_combo, item_created = self.g.combine(element.text.lower(), self.held.text.lower())
+            if valid_combo:
+                x, y = camera.to_world(self.pointer)
+                board.add(Element(x - 70, y - 25, 140, 45,
+                                  item_created, self.font, self.text_color, self.item_color))
+                board.remove(self.held)
+                board.remove(element)
+                self.held = None
+                self.letgo = 0
+                pygame.mixer.Sound.play(self.combine_sounds[random.randint(0, 2)])
+                break
+
+    def is_animating(self) -> bool:
+        """
+        Returns whether the sidebar is still gliding to where it was scrolled to.
+        """
+        return self.discovered_list.is_gliding()
 
-        pygame.display.update()
+    def _display_list(self) -> list[tuple[tuple, pygame.Rect, Callable[[], object]]]:
+        """
+        Returns everything drawn over the static layer, in drawing order. Each item is given as a key that
+        changes whenever the item would look different or cover a different area, the area it covers and a
+        function that draws it.
+        """
+        screen, g, discovered_list = self.screen, self.g, self.discovered_list
+        screen_width, screen_height = screen.get_size()
+        items = []
+
+        # the discovered elements in view
+        for row, shown, area in discovered_list.visible():
+            items.append((('row', row.index, row.item, tuple(shown), tuple(area)), shown,
+                          lambda row=row, shown=shown, area=area: screen.blit(row.surface, shown, area)))
+
+        # the elements on the part of the board in view
+        camera = self.camera
+        for z, element in self.board.ordered_within(camera.shown()):
+            shown = camera.to_screen(element.rect.union(element.text_rect)).inflate(2, 2)
+            items.append((('element', z, element.text, tuple(shown), camera.zoom), shown,
+                          lambda element=element: element.draw(screen, camera)))
+
+        # the trash bin, and the little arrows when you can go up and down
+        items.append((('trash',), self.trash_bin_rect,
+                      lambda: screen.blit(self.trash_bin_icon, self.trash_bin_rect)))
+        if discovered_list.can_scroll_up():
+            items.append((('up',), self.up_rect, lambda: screen.blit(self.up_icon, self.up_rect)))
+        if discovered_list.can_scroll_down():
+            items.append((('down',), self.down_rect, lambda: screen.blit(self.down_icon, self.down_rect)))
+
+        # the number of items currently found
+        counter = f"Discovered: {len(g.discovered)} / {len(g.get_vertices())}"
+        discover_text = rendercache.render_text(rendercache.get_font("Roboto-Regular.ttf", 20), counter, True,
+                                                "Black")
+        discover_rect = discover_text.get_rect(topleft=(screen_width - 225, screen_height - 30))
+        items.append((('counter', counter), discover_rect, lambda: screen.blit(discover_text, discover_rect)))
+        return items
 
+    def draw(self) -> Optional[list[pygame.Rect]]:
+        """
+        Draws the board, the sidebar of discovered elements and the discovered counter. Only the areas
+        covered by items that appeared, disappeared, moved or changed since the last frame are redrawn.
 
-def main_menu(chemistry: bool, discovered: list[str], extra: list[tuple]) -> None:
-    """
-    Displays the main menu and handles user interaction with the menu options.
+        :return: The areas of the screen that changed, or None if all of it was redrawn.
+        """
+        screen = self.screen
+        # glides the sidebar towards where it was scrolled to
+        self.discovered_list.update()
+        items = self._display_list()
+        drawn = {key: rect for key, rect, _ in items}
+
+        if self.redraw_all:
+            self.redraw_all = False
+            self.drawn = drawn
+            screen.blit(self.static_layer, (0, 0))
+            for _, _, draw in items:
+                draw()
+            return None
+
+        changed = [rect for key, rect in self.drawn.items() if key not in drawn]
+        changed.extend(rect for key, rect in drawn.items() if key not in self.drawn)
+        self.drawn = drawn
+        dirty = merge_rects(changed)
+        for area in dirty:
+            # restores the static layer under the area, then draws whatever overlaps it in the usual order
+            screen.set_clip(area)
+            screen.blit(self.static_layer, area, area)
+            for _, rect, draw in items:
+                if rect.colliderect(area):
+                    draw()
+        screen.set_clip(None)
+        return dirty
+
+    def exit(self) -> None:
+        """
+        Hands the player's progress back to the shared state.
+        """
+        self.state.discovered = list(self.g.snapshot())
 
-    :param chemistry: The current state of chemistry mode, affecting how the game is initialized.
-    :param discovered: A list of discovered items, used to maintain the user's progress.
-    """
-    screen_width, screen_height = 1200, 700
-    screen = pygame.display.set_mode((screen_width, screen_height))
-    background = pygame.image.load("background.png")
-    click_sound = pygame.mixer.Sound("click.wav")
-    pygame.display.set_caption("Menu")
-    while True:
-        screen.blit(background, (0, 0))
-        menu_mouse_pos = pygame.mouse.get_pos()
-        menu_text = get_font(74).render("Python Alchemy", True, "#12CDEC")
-        menu_rect = menu_text.get_rect(center=(640, 100))
 
-        play_button = Button(image=pygame.image.load("Play Rect.png"), pos=(640, 250),
-                             text_input="PLAY", font=get_font(75), base_color="#d7fcd4", hovering_color="White")
-        options_button = Button(image=pygame.image.load("Options Rect.png"), pos=(640, 400),
-                                text_input="OPTIONS", font=get_font(75), base_color="#d7fcd4", hovering_color="White")
-        quit_button = Button(image=pygame.image.load("Quit Rect.png"), pos=(640, 550),
-                             text_input="QUIT", font=get_font(75), base_color="#d7fcd4", hovering_color="White")
-        screen.blit(menu_text, menu_rect)
+# The scenes of the game, by the names used for Scene.next_scene
+SCENES = {'menu': MenuScene, 'options': OptionsScene, 'play': PlayScene}
 
-        for button in [play_button, options_button, quit_button]:
-            button.changecolor(menu_mouse_pos)
-            button.update(screen)
 
-        for event in pygame.event.get():
+class SceneManager:
+    """
+    Runs the game's single main loop and switches between scenes. Only one scene exists at a time: when a
+    scene asks to move on, it is exited and dropped before the next one is entered, so moving between the
+    menu and the game any number of times neither grows the call stack nor keeps old scenes alive.
+
+    Instance Attributes:
+    - screen: The Pygame screen the scenes are drawn on.
+    - state: The progress shared between scenes.
+    - scene: The scene currently running, or None once the game has been quit.
+    - scene_name: The name of the current scene in SCENES.
+    - last_update: The areas of the display updated in the last frame, or None if all of it was.
+    - max_fps: The most frames run per second, or 0 for no limit.
+    - idle_timeout: How long in milliseconds to wait for input while the scene is not animating before
+      checking again, or 0 to run frames continuously.
+    - clock: The clock that keeps frames to max_fps.
+    - pointer: The last known position of the mouse on the screen, given to each scene entered.
+    - recorder: The recorder every frame's events are written to, or None if the session is not recorded.
+    """
+    screen: pygame.Surface
+    state: GameState
+    scene: Optional[Scene]
+    scene_name: str
+    last_update: Optional[list[pygame.Rect]]
+    max_fps: int
+    idle_timeout: int
+    clock: pygame.time.Clock
+    pointer: tuple[int, int]
+    recorder: Optional[replay.SessionRecorder]
+
+    def __init__(self, screen: pygame.Surface, state: GameState, first_scene: str = 'menu', max_fps: int = 60,
+                 idle_timeout: int = 250, pointer: Optional[tuple[int, int]] = None,
+                 recorder: Optional[replay.SessionRecorder] = None) -> None:
+        """
+        Initializes the manager and enters the first scene.
+
+        :param screen: The Pygame screen the scenes are drawn on.
+        :param state: The progress shared between scenes.
+        :param first_scene: The name of the scene to start in.
+        :param max_fps: The most frames run per second, or 0 for no limit.
+        :param idle_timeout: How long in milliseconds to wait for input while nothing is animating, or 0 to
+        run frames continuously.
+        :param pointer: The position of the mouse, or None to ask Pygame where it is.
+        :param recorder: The recorder to write every frame's events to, if the session is recorded.
+        """
+        self.screen = screen
+        self.state = state
+        self.scene = None
+        self.scene_name = ''
+        self.last_update = None
+        self.max_fps = max_fps
+        self.idle_timeout = idle_timeout
+        self.clock = pygame.time.Clock()
+        self.pointer = pygame.mouse.get_pos() if pointer is None else pointer
+        self.recorder = recorder
+        self.switch(first_scene)
+
+    def switch(self, name: str) -> None:
+        """
+        Exits the current scene and enters the scene called name, or stops running if name is 'quit'.
+        """
+        if self.scene is not None:
+            self.scene.exit()
+            self.scene = None
+        self.scene_name = name
+        if name == 'quit':
+            return
+        with perf.TIMINGS.timed(f'enter {name}'):
+            self.scene = SCENES[name](self.screen, self.state)
+            self.scene.pointer = self.pointer
+            self.scene.enter()
+
+    def run_frame(self, events: list[pygame.event.Event]) -> bool:
+        """
+        Runs one frame of the current scene: passes it events, switching scene as soon as it asks to
+        (the remaining events go to the new scene), then draws it and updates the parts of the display
+        that it changed. If the session is recorded, the events are recorded first.
+
+        :return: False if the game has been quit, True otherwise.
+        """
+        if self.recorder is not None:
+            self.recorder.record(events)
+        start = time.perf_counter()
+        running = self._run_frame(events)
+        seconds = time.perf_counter() - start
+        perf.TIMINGS.record('frame', seconds)
+        perf.FRAMES.record_frame(seconds)
+        return running
+
+    def _run_frame(self, events: list[pygame.event.Event]) -> bool:
+        """
+        Runs one frame as described in run_frame, without timing it.
+        """
+        for event in events:
+            if hasattr(event, 'pos'):
+                self.pointer = event.pos
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if play_button.checkforinput(menu_mouse_pos):
-                    pygame.mixer.Sound.play(click_sound)
-                    play(chemistry, discovered, extra)
-                if options_button.checkforinput(menu_mouse_pos):
-                    pygame.mixer.Sound.play(click_sound)
-                    options(chemistry, discovered, extra)
-                if quit_button.checkforinput(menu_mouse_pos):
-                    pygame.mixer.Sound.play(click_sound)
-                    pygame.quit()
-                    sys.exit()
-        pygame.display.update()
+                self.switch('quit')
+            if self.scene is None:
+                return False
+            self.scene.handle_event(event)
+            if self.scene.next_scene is not None:
+                self.switch(self.scene.next_scene)
+        if self.scene is None:
+            return False
+        self.last_update = self.scene.draw()
+        if self.last_update is None:
+            pygame.display.flip()
+        elif self.last_update:
+            pygame.display.update(self.last_update)
+        return True
+
+    def next_events(self) -> Optional[list[pygame.event.Event]]:
+        """
+        Returns the events for the next frame. If there are none yet and the scene is not animating, this
+        blocks until one arrives or idle_timeout runs out, and returns None if it runs out, since a frame
+        without input would look the same as the last one.
+        """
+        if self.idle_timeout and not pygame.event.peek() and not self.scene.is_animating():
+            event = pygame.event.wait(self.idle_timeout)
+            if event.type == pygame.NOEVENT:
+                perf.FRAMES.idle_waits += 1
+                return None
+            return [event] + pygame.event.get()
+        return pygame.event.get()
+
+    def run(self) -> None:
+        """
+        Runs frames until the game is quit, at most max_fps a second, waiting for input whenever the scene
+        is not animating.
+        """
+        perf.FRAMES.reset()
+        # the first frame is drawn straight away; later ones wait for input while nothing is animating
+        events = pygame.event.get()
+        while True:
+            if events is not None:
+                if not self.run_frame(events):
+                    return
+                self.clock.tick(self.max_fps)
+            events = self.next_events()
 
 
 def write_save(discovered: list[str], chemistry: bool) -> None:
@@ -694,7 +1306,8 @@ def load_save(filedirectory: str) -> tuple[bool, list[str]]:
 if __name__ == "__main__":
     # import python_ta
     # python_ta.check_all(config={
-    #     'extra-imports': ['sys', 'pygame', 'recipeloader', 'random', 'button', 'json'],
+    #     'extra-imports': ['sys', 'pygame', 'recipeloader', 'random', 'assets', 'board', 'button', 'json', 'perf',
+    #                       'rendercache', 'replay', 'typing', 'os', 'time'],
     #     'allowed-io': [],  # the names (strs) of functions that call print/open/input
     #     'max-line-length': 120,  # necessary for implementation
     #     'max-nested-blocks': 7,  # necessary for implementation
@@ -0,0 +1,383 @@
+"""
+File Outline
+===============================
+This file analyses recipe packs for their authors. For every element of a pack it finds its crafting depth
+(see Graph.crafting_depth), the number of recipes that make it, the number of recipes it is used in, whether
+it can be made from the $DEFAULT elements at all, and whether it is a dead end: an element that can be made
+but is not used in any recipe. The elements that cannot be made are grouped into islands, the groups of them
+that are joined to each other by recipes, since an island usually needs one missing recipe to be reachable.
+
+The pack is compiled to its binary cache (see recipeloader.compile_to_cache), and the recipes are split into
+one range per worker process. Every worker maps the cache file once, when it starts, so the graph is shared
+through the page cache instead of being sent to the workers, and each task only names a range of recipes.
+The workers then index the recipes by input, each filling in the part of the index for its range, in an
+array shared with every worker. The depths are found a level at a time, from the elements reached by the
+level before (the frontier), which is split between the workers: each looks up the recipes that use its
+part of the frontier and finds the elements they make from the elements reached so far, which are kept in
+another shared array. So every recipe is looked at once for each of its inputs, however deep the pack is.
+For example,
+
+    python packanalyzer.py recipes.json --workers 4 --report recipes-report.csv
+
+prints a summary of the pack and writes the statistics of every element to recipes-report.csv. The same
+analyzer is run by
+
+    python -m recipeloader analyze recipes.json --workers 4 --report recipes-report.csv
+
+Copyright and Usage Information
+===============================
+This file is provided solely for the private use of the teaching staff
+of CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited.
+
+This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjamin Gavriely
+"""
+from __future__ import annotations
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+from operator import add
+from multiprocessing.sharedctypes import RawArray
+from typing import Any, Callable, Optional
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import time
+import recipeloader
+
+# The depth of an element that has not been reached
+UNREACHED = -1
+
+# What each worker process opened when it started: the mapped pack, and views of the shared depths and of
+# the shared index of the recipes by input (see _index_uses)
+_WORKER: dict[str, Any] = {}
+
+
+def _start_worker(cache_path: str, depths: Any, offsets: Any, slots: Any, barrier: Any = None) -> None:
+    """
+    Maps the compiled pack at cache_path and keeps it, with views of the shared depths and index and the
+    barrier _ready waits on, for the tasks this process runs. Called once in every worker process when it
+    starts.
+    """
+    # analyze has already opened the file with the check, so each worker does not check it again
+    _WORKER['graph'] = recipeloader.MappedGraph(cache_path, check=False)
+    for name, shared in (('depths', depths), ('offsets', offsets), ('slots', slots)):
+        _WORKER[name] = memoryview(shared).cast('B').cast('i')
+    _WORKER['barrier'] = barrier
+
+
+def _stop_worker() -> None:
+    """
+    Releases what _start_worker opened.
+    """
+    _WORKER.pop('barrier')
+    for name in ('depths', 'offsets', 'slots'):
+        _WORKER.pop(name).release()
+    _WORKER.pop('graph').close()
+
+
+def _ready(_: int) -> None:
+    """
+    Waits until every worker has started and is running _ready too, so that one call of _ready per worker
+    only finishes once all of them have started.
+    """
+    if _WORKER['barrier'] is not None:
+        _WORKER['barrier'].wait(timeout=60)
+
+
+def _count_recipes(start: int, stop: int) -> tuple[array, array]:
+    """
+    Returns the number of recipes from start to stop that make each element, and the number of them each
+    element is used in, indexed by element ID.
+    """
+    graph = _WORKER['graph']
+    n = graph.n_elements()
+    made, used = array('i', bytes(4 * n)), array('i', bytes(4 * n))
+    for key, result in zip(graph.recipe_keys()[start:stop], graph.recipe_results()[start:stop]):
+        made[result] += 1
+        id1, id2 = key >> 32, key & 0xFFFFFFFF
+        used[id1] += 1
+        if id2 != id1:
+            used[id2] += 1
+    return made, used
+
+
+def _index_uses(start: int, stop: int, ends: array) -> None:
+    """
+    Fills in the shared index of the recipes by input for the recipes from start to stop, given the slot
+    where the first of them that uses each element goes, indexed by element ID. The positions of the recipes
+    that use the element id_ are kept in slots[offsets[id_]:offsets[id_ + 1]].
+    """
+    graph, slots = _WORKER['graph'], _WORKER['slots']
+    for position, key in enumerate(graph.recipe_keys()[start:stop], start):
+        id1, id2 = key >> 32, key & 0xFFFFFFFF
+        slots[ends[id1]] = position
+        ends[id1] += 1
+        if id2 != id1:
+            slots[ends[id2]] = position
+            ends[id2] += 1
+
+
+def _next_level(frontier: array) -> list[int]:
+    """
+    Returns the IDs of the elements not reached yet that a recipe makes from elements that have been reached,
+    one of which is in frontier, a part of the elements reached by the level before.
+    """
+    graph, depths, offsets, slots = _WORKER['graph'], _WORKER['depths'], _WORKER['offsets'], _WORKER['slots']
+    keys, results = graph.recipe_keys(), graph.recipe_results()
+    found = set()
+    for id_ in frontier:
+        for slot in slots[offsets[id_]:offsets[id_ + 1]]:
+            result = results[slot]
+            if depths[result] == UNREACHED:
+                key = keys[slot]
+                if depths[key >> 32] != UNREACHED and depths[key & 0xFFFFFFFF] != UNREACHED:
+                    found.add(result)
+    return list(found)
+
+
+def _island_links(start: int, stop: int) -> list[tuple[int, int]]:
+    """
+    Returns a pair (result, input) for every recipe from start to stop that makes an element that was not
+    reached, and each of its inputs that was not reached either, which joins the two into one island.
+    """
+    graph, depths = _WORKER['graph'], _WORKER['depths']
+    links = []
+    for key, result in zip(graph.recipe_keys()[start:stop], graph.recipe_results()[start:stop]):
+        if depths[result] == UNREACHED:
+            for input_id in (key >> 32, key & 0xFFFFFFFF):
+                if depths[input_id] == UNREACHED:
+                    links.append((result, input_id))
+    return links
+
+
+def _find_islands(depths: Any, links: list[tuple[int, int]]) -> list[list[int]]:
+    """
+    Returns the IDs of the elements that were not reached, grouped into the islands joined by links, largest
+    island first.
+    """
+    parents = {id_: id_ for id_, depth in enumerate(depths) if depth == UNREACHED}
+
+    def root(id_: int) -> int:
+        """Returns the element that stands for the island of id_, shortening the path to it on the way."""
+        while parents[id_] != id_:
+            parents[id_] = parents[parents[id_]]
+            id_ = parents[id_]
+        return id_
+
+    for id1, id2 in links:
+        root1, root2 = root(id1), root(id2)
+        if root1 != root2:
+            parents[max(root1, root2)] = min(root1, root2)
+    islands = {}
+    for id_ in parents:
+        islands.setdefault(root(id_), []).append(id_)
+    return sorted(islands.values(), key=lambda island: (-len(island), island[0]))
+
+
+class PackReport:
+    """
+    The statistics of every element of a recipe pack, as found by analyze.
+
+    Instance Attributes:
+    - path: The path of the pack.
+    - workers: The number of processes the statistics were found with.
+    - names: The element names, indexed by element ID.
+    - defaults: The IDs of the $DEFAULT elements.
+    - n_recipes: The number of recipes in the pack.
+    - depths: The crafting depth of each element, or UNREACHED if it cannot be made, indexed by element ID.
+    - made: The number of recipes that make each element, indexed by element ID.
+    - used: The number of recipes each element is used in, indexed by element ID.
+    - islands: The IDs of the elements that cannot be made, grouped into islands, largest island first.
+    - timings: A dictionary mapping each step of the analysis to the number of seconds it took.
+
+    Representation Invariants:
+    - len(self.names) == len(self.depths) == len(self.made) == len(self.used)
+    - sum(len(island) for island in self.islands) == self.depths.count(UNREACHED)
+    """
+    path: str
+    workers: int
+    names: list[str]
+    defaults: list[int]
+    n_recipes: int
+    depths: array
+    made: list[int]
+    used: list[int]
+    islands: list[list[int]]
+    timings: dict[str, float]
+
+    def __init__(self, path: str, workers: int) -> None:
+        """
+        Initialize an empty report for the pack at path, found with the given number of processes.
+        """
+        self.path = path
+        self.workers = workers
+        self.names, self.defaults, self.n_recipes = [], [], 0
+        self.depths, self.made, self.used = array('i'), [], []
+        self.islands = []
+        self.timings = {}
+
+    def dead_ends(self) -> list[int]:
+        """
+        Returns the IDs of the elements that can be made but are not used in any recipe.
+        """
+        return [id_ for id_, (depth, used) in enumerate(zip(self.depths, self.used)) if depth != UNREACHED and not used]
+
+    def summary(self) -> str:
+        """
+        Returns a summary of the report, for printing.
+        """
+        reached = [depth for depth in self.depths if depth != UNREACHED]
+        levels = [0] * (max(reached, default=0) + 1)
+        for depth in reached:
+            levels[depth] += 1
+        lines = [f'{self.path}: {len(self.names)} elements, {self.n_recipes} recipes, {len(self.defaults)} $DEFAULT',
+                 f'reachable: {len(reached)}, unreachable: {len(self.names) - len(reached)} '
+                 f'in {len(self.islands)} islands',
+                 f'dead ends: {len(self.dead_ends())}',
+                 f'maximum depth: {len(levels) - 1}',
+                 'elements at each depth: ' + ', '.join(f'{depth}: {count}' for depth, count in enumerate(levels))]
+        for number, island in enumerate(self.islands[:5], 1):
+            shown = ', '.join(self.names[id_] for id_ in island[:5])
+            lines.append(f'island {number}: {len(island)} elements ({shown}{", ..." if len(island) > 5 else ""})')
+        lines.append(f'with {self.workers} workers: '
+                     + ', '.join(f'{step} {seconds * 1e3:.1f} ms' for step, seconds in self.timings.items()))
+        return '\n'.join(lines)
+
+    def write_csv(self, report_path: str) -> None:
+        """
+        Writes the statistics of every element to report_path as CSV, one row per element in ID order.
+        The island column numbers the islands from 1, largest first, and is empty for reachable elements.
+        """
+        island_of = {}
+        for number, island in enumerate(self.islands, 1):
+            for id_ in island:
+                island_of[id_] = number
+        with open(report_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['element', 'depth', 'recipes', 'uses', 'reachable', 'dead end', 'island'])
+            for id_, name in enumerate(self.names):
+                reachable = self.depths[id_] != UNREACHED
+                writer.writerow([name, self.depths[id_] if reachable else '', self.made[id_], self.used[id_],
+                                 int(reachable), int(reachable and not self.used[id_]), island_of.get(id_, '')])
+
+
+def analyze(path: str, workers: int = 1) -> PackReport:
+    """
+    Returns the statistics of every element of the recipe pack at path, found with the given number of
+    worker processes. With one worker, the work is done in this process instead.
+
+    :param path: The path of a JSON file in the format of recipes.json.
+    :param workers: The number of worker processes.
+    """
+    report = PackReport(path, workers)
+    start = time.perf_counter()
+    with recipeloader.load_graph(path, recipeloader.MappedGraph) as graph:
+        n = graph.n_elements()
+        report.names = [graph.name(id_) for id_ in range(n)]
+        report.defaults = list(graph.defaults())
+        report.n_recipes = len(graph.recipe_keys())
+    cache_path = recipeloader.cache_path_for(path)
+    # every recipe is in the index once for each of its two inputs, or once if they are the same element
+    depths, offsets, slots = RawArray('i', n), RawArray('i', n + 1), RawArray('i', 2 * report.n_recipes)
+    shared = memoryview(depths).cast('B').cast('i')
+    shared[:] = array('i', [UNREACHED]) * n
+    for id_ in report.defaults:
+        shared[id_] = 0
+    step = max(1, -(-report.n_recipes // workers))
+    ranges = [(begin, min(begin + step, report.n_recipes)) for begin in range(0, report.n_recipes, step)] or [(0, 0)]
+    starts, stops = [begin for begin, _ in ranges], [end for _, end in ranges]
+    report.timings['compile'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(workers, initializer=_start_worker,
+                                       initargs=(cache_path, depths, offsets, slots, multiprocessing.Barrier(workers)))
+    else:
+        _start_worker(cache_path, depths, offsets, slots)
+
+    def run(task: Callable[..., Any], *columns: list) -> list[Any]:
+        """Returns the result of task for each position of columns, called with the values at that position."""
+        if executor is None:
+            return [task(*args) for args in zip(*columns)]
+        return list(executor.map(task, *columns))
+
+    try:
+        if executor is not None:
+            list(executor.map(_ready, range(workers)))
+        report.timings['start'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        counts = run(_count_recipes, starts, stops)
+        report.made = [sum(column) for column in zip(*(made for made, _ in counts))]
+        report.used = [sum(column) for column in zip(*(used for _, used in counts))]
+        report.timings['count'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with memoryview(offsets).cast('B').cast('i') as shared_offsets:
+            shared_offsets[:] = array('i', accumulate(report.used, initial=0))
+            # the recipes of each range that use an element go after those of the ranges before it
+            ends = [array('i', shared_offsets[:n])]
+            for _, used in counts[:-1]:
+                ends.append(array('i', map(add, ends[-1], used)))
+        run(_index_uses, starts, stops, ends)
+        report.timings['index'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        level, frontier = 0, array('i', report.defaults)
+        while frontier:
+            level += 1
+            parts = [frontier[i::workers] for i in range(workers)]
+            frontier = array('i', set().union(*run(_next_level, parts)))
+            for id_ in frontier:
+                shared[id_] = level
+        report.depths = array('i', shared)
+        report.timings['depths'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        links = [link for part in run(_island_links, starts, stops) for link in part]
+        report.islands = _find_islands(report.depths, links)
+        report.timings['islands'] = time.perf_counter() - start
+    finally:
+        if executor is None:
+            _stop_worker()
+        else:
+            executor.shutdown()
+        shared.release()
+    return report
+
+
+def run_from_command_line(argv: Optional[list[str]] = None) -> int:
+    """
+    Analyses the pack named in argv, prints a summary, writes the report and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description='Find the statistics of every element of a recipe pack.')
+    parser.add_argument('pack', help='the path of the recipe pack, in the format of recipes.json')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='the number of worker processes (default: one for each CPU)')
+    parser.add_argument('--report', metavar='PATH', default=None,
+                        help='where to write the statistics of every element as CSV (default: next to the pack)')
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    report_path = args.report or os.path.splitext(args.pack)[0] + '-report.csv'
+    report = analyze(args.pack, args.workers)
+    report.write_csv(report_path)
+    print(report.summary())
+    print(f'report written to {report_path}')
+    return 0
+
+
+if __name__ == "__main__":
+    # import python_ta
+    # python_ta.check_all(config={
+    #     'extra-imports': ['array', 'concurrent.futures', 'itertools', 'operator', 'multiprocessing.sharedctypes',
+    #                       'argparse', 'csv', 'multiprocessing', 'os', 'sys', 'time', 'recipeloader'],
+    #     'allowed-io': ['PackReport.write_csv', 'run_from_command_line'],
+    #     'max-line-length': 120
+    # })
+    sys.exit(run_from_command_line())
@@ -0,0 +1,202 @@
+"""
+File Outline
+===============================
+This file provides lightweight timing instrumentation for Python Alchemy. Named timings are collected
+into a Timings object, and the frames of the game loop with their CPU cost are counted in a FrameStats
+object. A summary of both can be printed when the game exits by setting the PYTHON_ALCHEMY_PERF
+environment variable.
+
+Copyright and Usage Information
+===============================
+This file is provided solely for the private use of the teaching staff
+of CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited.
+
+This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjamin Gavriely
+"""
+from __future__ import annotations
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+import os
+import time
+
+
+def percentile(samples: Iterable[float], fraction: float) -> float:
+    """
+    Returns the value below which the given fraction of samples fall, using the nearest-rank method.
+
+    Preconditions:
+    - samples is non-empty and 0 <= fraction <= 1
+    """
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class Timings:
+    """
+    A collection of named duration samples, in seconds. Only the most recent max_samples samples of each
+    timing are kept, so recording a timing every frame does not grow memory over a long session.
+
+    Instance Attributes:
+    - max_samples: The number of recent samples kept for each timing.
+    - samples: A dictionary mapping each timing name to its most recent durations, in order.
+    - counts: A dictionary mapping each timing name to the total number of samples ever recorded for it.
+
+    Representation Invariants:
+    - max_samples > 0
+    - every deque in samples is non-empty.
+    - samples.keys() == counts.keys()
+    """
+    max_samples: int
+    samples: dict[str, deque[float]]
+    counts: dict[str, int]
+
+    def __init__(self, max_samples: int = 10_000) -> None:
+        """
+        Initialize an empty collection of timings.
+        """
+        self.max_samples = max_samples
+        self.samples = {}
+        self.counts = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        """
+        Adds a sample of the given duration to the timing called name.
+        """
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.max_samples)
+            self.counts[name] = 0
+        self.samples[name].append(seconds)
+        self.counts[name] += 1
+
+    def clear(self) -> None:
+        """
+        Forgets every sample of every timing.
+        """
+        self.samples.clear()
+        self.counts.clear()
+
+    @contextmanager
+    def timed(self, name: str) -> Iterator[None]:
+        """
+        A context manager that records how long its body takes under the timing called name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self, name: str) -> dict[str, float]:
+        """
+        Returns the total number of samples of the timing called name, and the mean, p50, p95, p99 and
+        maximum of its recent durations, in seconds.
+
+        Preconditions:
+        - name in self.samples
+        """
+        samples = self.samples[name]
+        return {'count': self.counts[name], 'mean': sum(samples) / len(samples), 'p50': percentile(samples, 0.5),
+                'p95': percentile(samples, 0.95), 'p99': percentile(samples, 0.99), 'max': max(samples)}
+
+    def report(self) -> str:
+        """
+        Returns a table summarising every timing, with durations in milliseconds.
+        """
+        lines = [f'{"timing":<28}{"count":>8}{"mean":>10}{"p50":>10}{"p95":>10}{"p99":>10}{"max":>10}']
+        for name in self.samples:
+            stats = self.summary(name)
+            lines.append(f'{name:<28}{stats["count"]:>8}' + ''.join(
+                f'{stats[key] * 1000:>10.2f}' for key in ('mean', 'p50', 'p95', 'p99', 'max')))
+        return '\n'.join(lines)
+
+
+class FrameStats:
+    """
+    Counts the frames run by the game loop and the wall-clock and CPU time they take, so that the cost of
+    keeping the game open can be read off as a frame rate and a share of one CPU core.
+
+    Instance Attributes:
+    - frames: The number of frames run.
+    - idle_waits: The number of times the loop waited for input and none came.
+    - busy_seconds: The wall-clock time spent running frames, excluding waiting and frame pacing.
+    - started: The wall-clock time, from time.perf_counter, when counting started.
+    - started_cpu: The CPU time of the process, from time.process_time, when counting started.
+
+    Representation Invariants:
+    - self.frames >= 0 and self.idle_waits >= 0 and self.busy_seconds >= 0
+    """
+    frames: int
+    idle_waits: int
+    busy_seconds: float
+    started: float
+    started_cpu: float
+
+    def __init__(self) -> None:
+        """
+        Initialize the counters, starting the clocks now.
+        """
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Sets every counter back to zero and restarts the clocks.
+        """
+        self.frames = 0
+        self.idle_waits = 0
+        self.busy_seconds = 0.0
+        self.started = time.perf_counter()
+        self.started_cpu = time.process_time()
+
+    def record_frame(self, seconds: float) -> None:
+        """
+        Counts a frame that took the given number of seconds to run.
+        """
+        self.frames += 1
+        self.busy_seconds += seconds
+
+    def summary(self) -> dict[str, float]:
+        """
+        Returns the time elapsed, the number of frames and idle waits, the frame rate, the CPU time used and
+        the shares of the elapsed time spent on the CPU and running frames.
+        """
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        cpu = time.process_time() - self.started_cpu
+        return {'seconds': elapsed, 'frames': self.frames, 'idle_waits': self.idle_waits,
+                'fps': self.frames / elapsed, 'cpu_seconds': cpu, 'cpu_percent': 100 * cpu / elapsed,
+                'busy_percent': 100 * self.busy_seconds / elapsed}
+
+    def report(self) -> str:
+        """
+        Returns a one-line summary of the counters.
+        """
+        stats = self.summary()
+        return (f'{stats["frames"]} frames in {stats["seconds"]:.1f} s ({stats["fps"]:.1f} fps), '
+                f'{stats["idle_waits"]} idle waits, CPU {stats["cpu_percent"]:.1f}%, '
+                f'busy {stats["busy_percent"]:.1f}%')
+
+
+# The timings collected by the game
+TIMINGS = Timings()
+
+# The frames run by the game loop
+FRAMES = FrameStats()
+
+
+def report_enabled() -> bool:
+    """
+    Returns whether a summary of TIMINGS should be printed when the game exits.
+    """
+    return bool(os.environ.get('PYTHON_ALCHEMY_PERF'))
+
+
+if __name__ == "__main__":
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['collections', 'contextlib', 'os', 'time'],
+        'allowed-io': [],  # the names (strs) of functions that call print/open/input
+        'max-line-length': 120
+    })
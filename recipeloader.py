@@ -17,8 +17,19 @@ This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjami
 """
 
 from __future__ import annotations
-from typing import Optional
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Any, Iterable, Iterator, Optional, Union
+import hashlib
+import heapq
 import json
+import mmap
+import operator
+import os
+import struct
+import sys
+import time
 
 
 def split_text(text: str) -> list[tuple]:
@@ -43,62 +54,416 @@ def split_text(text: str) -> list[tuple]:
     return returnval
 
 
+def iter_json_array(file: Any, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Yields the values of the top-level JSON array in file one at a time, reading the file in chunks of
+    chunk_size characters, so the whole array is never held in memory at once.
+
+    Preconditions:
+    - file is a text file containing a single JSON array.
+    - chunk_size > 0
+
+    :param file: The open file to read from.
+    :param chunk_size: The number of characters read from file at a time.
+    :raises json.JSONDecodeError: if the file is not a valid JSON array, including when anything other than
+    whitespace follows it.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    expecting = '['
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\n\r':
+            position += 1
+        if position == len(buffer):
+            if eof:
+                raise json.JSONDecodeError('Unterminated array', buffer, position)
+            chunk = file.read(chunk_size)
+            buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+            continue
+
+        char = buffer[position]
+        if expecting == '[':
+            if char != '[':
+                raise json.JSONDecodeError('Expecting "["', buffer, position)
+            position, expecting = position + 1, 'value or ]'
+        elif char == ']' and expecting != 'value':
+            # like json.load, nothing but whitespace may follow the array
+            rest = buffer[position + 1:]
+            while rest.strip(' \t\n\r') == '':
+                rest = file.read(chunk_size)
+                if not rest:
+                    return
+            offset = len(rest) - len(rest.lstrip(' \t\n\r'))
+            raise json.JSONDecodeError('Extra data', rest, offset)
+        elif char == ',' and expecting == ', or ]':
+            position, expecting = position + 1, 'value'
+        elif expecting == ', or ]':
+            raise json.JSONDecodeError('Expecting "," or "]"', buffer, position)
+        else:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = len(buffer)
+            after = end
+            while after < len(buffer) and buffer[after] in ' \t\n\r':
+                after += 1
+            if not eof and (after == len(buffer) or buffer[after] not in ',]'):
+                # the value may continue past the end of the buffer (e.g. a number), so read more and retry
+                chunk = file.read(max(chunk_size, len(buffer) - position))
+                buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+                continue
+            position, expecting = end, ', or ]'
+            yield value
+
+
+def parse_rows(data: Iterable[dict[str, str]]) -> Iterator[tuple[str, list[tuple]]]:
+    """
+    Yields the element name and its list of recipes for every row of a recipe pack, in file order.
+    An element with an empty list of recipes is a $DEFAULT element.
+
+    Preconditions:
+    - every row of data has a "NAME" key, as in recipes.json.
+
+    :param data: The rows of a recipe pack, as loaded from a file in the format of recipes.json.
+    """
+    item_created, recipes = '', []
+    for row in data:
+        for key in row:
+            if key == 'NAME':
+                item_created = row[key].lower()
+            else:  # key == 'RECIPES'
+                recipes = split_text(row[key].lower())
+        yield item_created, recipes
+
+
+def _pair_key(id1: int, id2: int) -> int:
+    """
+    Returns a single integer identifying the unordered pair of element IDs id1 and id2, so that
+    _pair_key(a, b) == _pair_key(b, a).
+
+    Preconditions:
+    - 0 <= id1 < 2 ** 31 and 0 <= id2 < 2 ** 31
+    """
+    if id1 > id2:
+        id1, id2 = id2, id1
+    return (id1 << 32) | id2
+
+
 class _Vertex:
     """
     A class representing a vertex in a graph, used to model an element.
 
     Instance Attributes:
     - item: The name of the element.
-    - neighbours: A dictionary mapping combinations to the resulting element.
+    - id: The integer ID of the element, used to key its recipes in Graph._recipes.
 
     Representation Invariants:
     - item must be a non-empty string.
-    - neighbours must be a dictionary with string keys and _Vertex values.
+    - id >= 0
     """
+    __slots__ = ('item', 'id')
 
     item: str
-    neighbours: dict[str, _Vertex]
+    id: int
 
-    def __init__(self, item: str) -> None:
+    def __init__(self, item: str, id_: int) -> None:
         """
-        Initialize a new vertex with the given item. Neighbours are initialized as empty.
+        Initialize a new vertex with the given item and ID.
 
         :param item: The name of the element.
+        :param id_: The integer ID of the element.
         """
         self.item = item
-        self.neighbours = {}
+        self.id = id_
+
+
+class _DiscoveredSet:
+    """
+    An insertion-ordered set of discovered vertices. It behaves like the read-only list that Graph.discovered
+    used to be (indexing, slicing, len, iteration in discovery order), but membership tests by vertex or by
+    item name are O(1). Any vertex type with an item attribute may be stored.
+
+    Instance Attributes:
+    - _order: The discovered vertices, in the order they were discovered.
+    - _index: A dictionary mapping each discovered item name to its position in _order.
+
+    Representation Invariants:
+    - len(_order) == len(_index)
+    - all(_order[_index[item]].item == item for item in _index)
+    """
+    _order: list[Any]
+    _index: dict[str, int]
+
+    def __init__(self, vertices: Iterable[Any] = ()) -> None:
+        """
+        Initialize the set with the given vertices, skipping any repeated items.
+
+        :param vertices: The vertices to add, in discovery order.
+        """
+        self._order = []
+        self._index = {}
+        for vertex in vertices:
+            self.append(vertex)
+
+    def append(self, vertex: Any) -> bool:
+        """
+        Add vertex to the end of the set if its item has not been discovered yet.
+
+        :param vertex: The vertex to add.
+        :return: True if the vertex was added, False if it was already present.
+        """
+        if vertex.item in self._index:
+            return False
+        self._index[vertex.item] = len(self._order)
+        self._order.append(vertex)
+        return True
+
+    def has_item(self, item: str) -> bool:
+        """
+        Return whether the element named item has been discovered.
+
+        :param item: The name of the element.
+        """
+        return item in self._index
+
+    def get(self, item: str) -> Optional[Any]:
+        """
+        Return the discovered vertex of the element named item, or None if it has not been discovered.
+
+        :param item: The name of the element.
+        """
+        if item not in self._index:
+            return None
+        return self._order[self._index[item]]
+
+    def items(self) -> list[str]:
+        """
+        Return the names of the discovered elements, in discovery order.
+        """
+        return list(self._index)
+
+    def __contains__(self, vertex: object) -> bool:
+        if getattr(vertex, 'item', None) not in self._index:
+            return False
+        return self._order[self._index[vertex.item]] is vertex
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._order)
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        return self._order[index]
+
+
+class _CraftingCosts:
+    """
+    The cheapest way to make each element from a set of source elements, found with Knuth's generalization
+    of Dijkstra's algorithm to AND/OR graphs. A source costs 0. Any other element costs the least, over its
+    recipes, of 1 more than the total of the costs of the two inputs (if additive), or 1 more than the larger
+    of them (if not). Elements are settled in order of cost from a heap, and the recipes an element is used in
+    are tried when it is settled, since an element never costs less than the inputs of its cheapest recipe.
+
+    Costs can only go down as sources and recipes are added, so those are handled by lowering the costs of
+    the elements they make cheaper and of no others. Any other change needs the costs found from scratch.
+
+    Instance Attributes:
+    - additive: Whether an element costs the total of its inputs' costs rather than the larger of them, plus 1.
+    - costs: A dictionary mapping the ID of each element that can be made from the sources to its cost.
+    - via: A dictionary mapping the ID of each element that costs more than 0 to the pair key of a recipe
+      that makes it for that cost.
+
+    Representation Invariants:
+    - all(cost >= 0 for cost in self.costs.values())
+    - all(id_ in self.costs and self.costs[id_] > 0 for id_ in self.via)
+    - the inputs of the recipe self.via[id_] cost less than id_, so following via never goes round in a cycle
+    """
+    additive: bool
+    costs: dict[int, int]
+    via: dict[int, int]
+
+    def __init__(self, additive: bool) -> None:
+        """
+        Initialize costs with no sources.
+
+        :param additive: Whether an element costs the total of its inputs' costs rather than the larger of
+        them, plus 1.
+        """
+        self.additive = additive
+        self.costs = {}
+        self.via = {}
+
+    def add_sources(self, ids: Iterable[int], uses: dict[int, list[int]], recipes: dict[int, _Vertex]) -> None:
+        """
+        Makes the elements with the given IDs sources, lowering the costs of the elements that are cheaper
+        to make now.
+
+        :param ids: The IDs of the new sources.
+        :param uses: A dictionary mapping the ID of each element to the pair keys of the recipes it is used in.
+        :param recipes: A dictionary mapping the pair key of each recipe to the _Vertex it makes.
+        """
+        heap, fresh = [], not self.costs
+        for id_ in ids:
+            if self.costs.get(id_) != 0:
+                self.costs[id_] = 0
+                self.via.pop(id_, None)
+                heap.append((0, id_))
+        self._settle(heap, uses, recipes, fresh)
+
+    def add_recipe(self, key: int, uses: dict[int, list[int]], recipes: dict[int, _Vertex]) -> None:
+        """
+        Lowers the costs of the elements that are cheaper to make now that there is a recipe with pair key key.
+
+        :param key: The pair key of the recipe, which must be in recipes and uses.
+        :param uses: A dictionary mapping the ID of each element to the pair keys of the recipes it is used in.
+        :param recipes: A dictionary mapping the pair key of each recipe to the _Vertex it makes.
+        """
+        cost1, cost2 = self.costs.get(key >> 32), self.costs.get(key & 0xFFFFFFFF)
+        if cost1 is None or cost2 is None:
+            return
+        cost = cost1 + cost2 + 1 if self.additive else max(cost1, cost2) + 1
+        result = recipes[key].id
+        if cost < self.costs.get(result, cost + 1):
+            self.costs[result] = cost
+            self.via[result] = key
+            self._settle([(cost, result)], uses, recipes, False)
+
+    def _settle(self, heap: list[tuple[int, int]], uses: dict[int, list[int]], recipes: dict[int, _Vertex],
+                fresh: bool) -> None:
+        """
+        Settles the elements in heap, which have just had their costs lowered, in order of cost, lowering the
+        costs of the elements made from them in turn.
+
+        If fresh, every element with a cost is in heap, so an element that costs more than the one being
+        settled has not been settled yet, and the recipes it is used in are left until it is, as in Knuth's
+        algorithm. Otherwise the elements not in heap keep their costs, and every recipe is tried straight away.
+        """
+        heapq.heapify(heap)
+        costs, via, additive = self.costs, self.via, self.additive
+        while heap:
+            cost, id_ = heapq.heappop(heap)
+            if cost != costs[id_]:
+                # the element was lowered again after this entry was pushed, and has been settled since
+                continue
+            for key in uses.get(id_, ()):
+                other = costs.get(key >> 32 if key & 0xFFFFFFFF == id_ else key & 0xFFFFFFFF)
+                if other is None or (fresh and other > cost):
+                    continue
+                new = cost + other + 1 if additive else max(cost, other) + 1
+                result = recipes[key].id
+                if new < costs.get(result, new + 1):
+                    costs[result] = new
+                    via[result] = key
+                    heapq.heappush(heap, (new, result))
 
 
 class Graph:
     """
     A graph class representing the relationships between elements through vertices and edges.
 
+    Every recipe is stored once, in _recipes, under the unordered pair key of its two inputs (see _pair_key).
+
     Instance Attributes:
     - _vertices: A dictionary mapping element names to _Vertex instances.
-    - discovered: A list of _Vertex instances that have been discovered.
+    - _recipes: A dictionary mapping the pair key of two elements to the _Vertex they combine into.
+    - discovered: The _Vertex instances that have been discovered, in the order they were discovered.
+    - conflicts: The recipes that were replaced because a later recipe used the same pair of elements,
+      as tuples (item1, item2, replaced item, new item).
+    - _defaults: The $DEFAULT vertices, which are discovered at the start of every game.
+    - _by_id: The vertices, indexed by ID.
+    - _made_by: A dictionary mapping the ID of each element that has a recipe to the pair keys of its
+      recipes.
+    - _uses: A dictionary mapping the ID of each element used in a recipe to the pair keys of the recipes it
+      is used in, or None until it is first needed.
+    - _craftable: A dictionary mapping the ID of each undiscovered element to the pair keys of its recipes
+      whose inputs are both discovered, or None until it is first needed.
+    - _craftable_count: The number of pair keys in _craftable.
+    - _discoverable: The IDs of the elements that are discovered or can be discovered by combining
+      discovered elements any number of times, or None until it is first needed.
+    - _discovered_ids: A bytearray that is 1 at the ID of each discovered element and 0 elsewhere, possibly
+      shorter than the number of elements, or None until it is first needed.
+    - _depths: The crafting depths of the elements, as the non-additive costs of making them from the
+      $DEFAULT elements, or None until they are first needed.
+    - _plans: The additive costs of making the elements from the discovered elements, which give the
+      crafting plans, or None until they are first needed.
+
+    The craftable recipes, the discoverable elements, the crafting depths and the crafting plans are found
+    once, when they are first asked for, and are then kept up to date as elements are discovered and recipes
+    are added.
 
     Representation Invariants:
     - _vertices must be a dictionary with string keys and _Vertex values.
-    - discovered must be a list of _Vertex instances, and each instance must also exist in _vertices.
+    - the IDs of the vertices in _vertices are 0, 1, ..., len(_vertices) - 1.
+    - every vertex in discovered must also exist in _vertices.
+    - all(self._by_id[vertex.id] is vertex for vertex in self._vertices.values())
+    - all(key in self._made_by[result.id] for key, result in self._recipes.items())
+    - sum(len(keys) for keys in self._made_by.values()) == len(self._recipes)
+    - self._craftable is None or self._uses is not None
+    - self._discoverable is None or self._uses is not None
+    - self._discovered_ids is None or all(self._discovered_ids[vertex.id] for vertex in self.discovered)
+    - self._depths is None or self._uses is not None
+    - self._plans is None or self._uses is not None
     """
     _vertices: dict[str, _Vertex]
-    discovered: list[_Vertex]
+    _recipes: dict[int, _Vertex]
+    _defaults: list[_Vertex]
+    _by_id: list[_Vertex]
+    _made_by: dict[int, list[int]]
+    _uses: Optional[dict[int, list[int]]]
+    _craftable: Optional[dict[int, set[int]]]
+    _craftable_count: int
+    _discoverable: Optional[set[int]]
+    _discovered_ids: Optional[bytearray]
+    _depths: Optional[_CraftingCosts]
+    _plans: Optional[_CraftingCosts]
+    discovered: _DiscoveredSet
+    conflicts: list[tuple[str, str, str, str]]
 
-    def __init__(self, file: json) -> None:
+    def __init__(self, file: Optional[json] = None) -> None:
         """
         A graph class representing the relationships between elements through vertices and edges.
+        If file is given, the recipe pack in it is loaded.
 
         Instance Attributes:
         - _vertices: A dictionary mapping element names to _Vertex instances.
-        - discovered: A list of _Vertex instances that have been discovered.
+        - _recipes: A dictionary mapping the pair key of two elements to the _Vertex they combine into.
+        - discovered: The _Vertex instances that have been discovered, in the order they were discovered.
+        - conflicts: The recipes that were replaced because a later recipe used the same pair of elements,
+          as tuples (item1, item2, replaced item, new item).
+        - _defaults: The $DEFAULT vertices, which are discovered at the start of every game.
 
         Representation Invariants:
         - _vertices must be a dictionary with string keys and _Vertex values.
-        - discovered must be a list of _Vertex instances, and each instance must also exist in _vertices.
+        - the IDs of the vertices in _vertices are 0, 1, ..., len(_vertices) - 1.
+        - every vertex in discovered must also exist in _vertices.
         """
         self._vertices = {}
-        self.discovered = []
-        self.load_vertices(file)
+        self._recipes = {}
+        self._defaults = []
+        self._by_id = []
+        self._made_by = {}
+        self._uses = None
+        self._depths = None
+        self._forget_progress_indexes()
+        self.discovered = _DiscoveredSet()
+        self.conflicts = []
+        if file is not None:
+            self.load_vertices(file)
+
+    def _forget_progress_indexes(self) -> None:
+        """
+        Forgets the craftable recipes, the discoverable elements, the discovered IDs and the crafting plans, so
+        that they are found again from scratch when next asked for. Called when the discovered elements are
+        replaced by fewer of them.
+        """
+        self._craftable = None
+        self._craftable_count = 0
+        self._discoverable = None
+        self._discovered_ids = None
+        self._plans = None
 
     def update(self, items: list[str]) -> None:
         """
@@ -114,8 +479,38 @@ class Graph:
             if item not in self._vertices:
                 raise ValueError
             vertices.append(self._vertices[item])
-        if all(vertex.item in items for vertex in self.discovered):
-            self.discovered = vertices
+        item_set = set(items)
+        if all(vertex.item in item_set for vertex in self.discovered):
+            new = [vertex for vertex in vertices if not self.discovered.has_item(vertex.item)]
+            self.discovered = _DiscoveredSet(vertices)
+            for vertex in new:
+                self._on_discovered(vertex)
+
+    def reset(self) -> None:
+        """
+        Forgets every discovery, leaving only the $DEFAULT elements discovered.
+        """
+        self.discovered = _DiscoveredSet(self._defaults)
+        self._forget_progress_indexes()
+
+    def snapshot(self) -> tuple[str, ...]:
+        """
+        Returns the player's progress: the names of the discovered elements, in discovery order.
+        The snapshot is immutable, so it stays valid however the graph changes afterwards.
+        """
+        return tuple(self.discovered.items())
+
+    def restore(self, items: Iterable[str]) -> None:
+        """
+        Replaces the player's progress with items, as returned by snapshot or read from a save, so that a
+        graph can be reused for a new session instead of being loaded again. As with update, items that do
+        not include every $DEFAULT element leave only the $DEFAULT elements discovered.
+
+        Preconditions:
+        - all the items are the items of existing vertices in self
+        """
+        self.reset()
+        self.update(list(items))
 
     def downdate(self) -> list[str]:
         """
@@ -126,7 +521,7 @@ class Graph:
         """
         items = []
         for vertex in self.discovered:
-            if vertex not in self._vertices.values():
+            if self._vertices.get(vertex.item) is not vertex:
                 raise ValueError
             else:
                 items.append(vertex.item)
@@ -139,6 +534,19 @@ class Graph:
         """
         return self._vertices
 
+    def id_of(self, item: str) -> int:
+        """
+        Returns the ID of the element named item, or -1 if there is no such element.
+        """
+        vertex = self._vertices.get(item)
+        return -1 if vertex is None else vertex.id
+
+    def name(self, id_: int) -> str:
+        """
+        Returns the name of the element with the given ID.
+        """
+        return self._by_id[id_].item
+
     def load_vertices(self, file: json) -> None:
         """
         Loads all vertices from the file and updates the graph structure accordingly.
@@ -147,24 +555,46 @@ class Graph:
         - file must be a valid JSON file in the specified format for elements and recipes.
         Example format can be found in recipes.json
 
+        The file is parsed one row at a time (see iter_json_array), so each element is added to the graph
+        as soon as its row has been read.
+
         :param file: A JSON file to load vertices from.
         """
-        data = json.load(file)
-        item_created, recipes = '', []
-        for row in data:
-            for key in row:
-                if key == 'NAME':
-                    item_created = row[key].lower()
-                else:  # key == 'RECIPES'
-                    recipes = split_text(row[key].lower())
+        self._load_rows(parse_rows(iter_json_array(file)))
 
+    def _load_rows(self, rows: Iterable[tuple[str, list[tuple]]]) -> None:
+        """
+        Adds the elements and recipes of rows, as yielded by parse_rows, to the graph.
+        """
+        for item_created, recipes in rows:
             if not recipes:
                 self.add_vertex(item_created)
-                self.discovered.append(self._vertices[item_created])
+                if self.discovered.append(self._vertices[item_created]):
+                    self._defaults.append(self._vertices[item_created])
+                    self._depths = None
+                    self._on_discovered(self._vertices[item_created])
             for combo in recipes:
                 item1, item2 = combo
                 self.add_edge(item_created, item1, item2)
 
+    def _load_table(self, table: _PackTable) -> None:
+        """
+        Loads the elements and recipes of a compiled pack (see load_graph) into an empty graph.
+        """
+        by_id = self._by_id = [_Vertex(item, id_) for id_, item in enumerate(table.names)]
+        self._vertices = {vertex.item: vertex for vertex in by_id}
+        self._recipes = dict(zip(table.keys, (by_id[result] for result in table.results)))
+        self._made_by = {}
+        for key, result in self._recipes.items():
+            self._made_by.setdefault(result.id, []).append(key)
+        self._defaults = [by_id[id_] for id_ in table.defaults]
+        self._uses = None
+        self._depths = None
+        self._forget_progress_indexes()
+        self.discovered = _DiscoveredSet(self._defaults)
+        self.conflicts = [tuple(by_id[id_].item for id_ in table.conflicts[i:i + 4])
+                          for i in range(0, len(table.conflicts), 4)]
+
     def add_vertex(self, item: str) -> None:
         """
         Add a vertex with the given item name to the graph if it doesn't already exist.
@@ -175,11 +605,14 @@ class Graph:
         :param item: The name of the element to add as a vertex.
         """
         if item not in self._vertices:
-            self._vertices[item] = _Vertex(item)
+            vertex = self._vertices[item] = _Vertex(item, len(self._vertices))
+            self._by_id.append(vertex)
 
     def add_edge(self, item_created: str, item1: str, item2: str) -> None:
         """
         Add an edge between two vertices, representing a combination that creates a new element.
+        If the pair already combines into a different element, the new recipe replaces it and the
+        replaced recipe is recorded in self.conflicts.
 
         Preconditions:
         - item_created, item1, and item2 must be non-empty strings.
@@ -196,10 +629,252 @@ class Graph:
         if item2 not in self._vertices:
             self.add_vertex(item2)
 
-        # Add the neighbours
         v0, v1, v2 = self._vertices[item_created], self._vertices[item1], self._vertices[item2]
-        v1.neighbours.update({item2: v0})
-        v2.neighbours.update({item1: v0})
+        key = _pair_key(v1.id, v2.id)
+        replaced = self._recipes.get(key)
+        if replaced is not None and replaced is not v0:
+            self.conflicts.append((item1, item2, replaced.item, item_created))
+        self._recipes[key] = v0
+        if replaced is not v0:
+            if replaced is not None:
+                self._made_by[replaced.id].remove(key)
+                if not self._made_by[replaced.id]:
+                    del self._made_by[replaced.id]
+            self._made_by.setdefault(v0.id, []).append(key)
+            if self._uses is not None:
+                self._index_recipe(key, replaced)
+
+    def recipes_for(self, item: str) -> list[tuple[str, str]]:
+        """
+        Returns the pairs of elements that combine into item, or an empty list if item has no recipes or is not
+        an element of the graph. Each pair starts with the element that was added to the graph first. The pairs
+        are in no particular order: a graph loaded from the binary cache has its recipes sorted by pair key
+        rather than in the order of the pack. Only the recipes of item are looked at.
+
+        :param item: The name of the element.
+        """
+        vertex = self._vertices.get(item)
+        if vertex is None:
+            return []
+        by_id = self._by_id
+        return [(by_id[key >> 32].item, by_id[key & 0xFFFFFFFF].item) for key in self._made_by.get(vertex.id, ())]
+
+    def _index_recipe(self, key: int, replaced: Optional[_Vertex]) -> None:
+        """
+        Updates the indexes built so far for the recipe with pair key key, which was just added, replacing
+        the recipe for replaced if it is not None.
+
+        Preconditions:
+        - self._uses is not None
+        """
+        id1, id2 = key >> 32, key & 0xFFFFFFFF
+        if replaced is None:
+            self._uses.setdefault(id1, []).append(key)
+            if id2 != id1:
+                self._uses.setdefault(id2, []).append(key)
+        elif self._craftable is not None and key in self._craftable.get(replaced.id, ()):
+            self._craftable[replaced.id].discard(key)
+            self._craftable_count -= 1
+            if not self._craftable[replaced.id]:
+                del self._craftable[replaced.id]
+
+        if self._craftable is not None:
+            self._add_if_craftable(key)
+        if self._discoverable is not None:
+            if replaced is not None:
+                # losing a recipe may make elements undiscoverable, so they are found again when next asked for
+                self._discoverable = None
+            elif id1 in self._discoverable and id2 in self._discoverable:
+                self._spread_discoverable([self._recipes[key].id])
+        for costs in (self._depths, self._plans):
+            if costs is not None and replaced is None:
+                costs.add_recipe(key, self._uses, self._recipes)
+        if replaced is not None:
+            # losing a recipe may make elements cost more, which is only found by starting again
+            self._depths = self._plans = None
+
+    def _uses_index(self) -> dict[int, list[int]]:
+        """
+        Returns _uses, building it from every recipe if it has not been built yet.
+        """
+        if self._uses is None:
+            uses = {}
+            for key in self._recipes:
+                id1, id2 = key >> 32, key & 0xFFFFFFFF
+                uses.setdefault(id1, []).append(key)
+                if id2 != id1:
+                    uses.setdefault(id2, []).append(key)
+            self._uses = uses
+        return self._uses
+
+    def _add_if_craftable(self, key: int) -> None:
+        """
+        Adds the recipe with pair key key to _craftable if both of its inputs are discovered and its result
+        is not, and it is not there already.
+
+        Preconditions:
+        - self._craftable is not None
+        """
+        by_id, discovered = self._by_id, self.discovered
+        result = self._recipes[key]
+        if (discovered.has_item(by_id[key >> 32].item) and discovered.has_item(by_id[key & 0xFFFFFFFF].item)
+                and not discovered.has_item(result.item)):
+            keys = self._craftable.setdefault(result.id, set())
+            if key not in keys:
+                keys.add(key)
+                self._craftable_count += 1
+
+    def _spread_discoverable(self, ids: Iterable[int]) -> None:
+        """
+        Adds the elements with the given IDs to _discoverable, along with every element that can then be
+        made from the discoverable elements.
+
+        Preconditions:
+        - self._discoverable is not None
+        """
+        reachable, uses, recipes = self._discoverable, self._uses_index(), self._recipes
+        stack = [id_ for id_ in ids if id_ not in reachable]
+        reachable.update(stack)
+        while stack:
+            for key in uses.get(stack.pop(), ()):
+                # a recipe can be made once the second of its inputs becomes discoverable
+                if key >> 32 in reachable and key & 0xFFFFFFFF in reachable:
+                    result = recipes[key].id
+                    if result not in reachable:
+                        reachable.add(result)
+                        stack.append(result)
+
+    def _on_discovered(self, vertex: _Vertex) -> None:
+        """
+        Updates the indexes built so far now that vertex has been discovered.
+        """
+        if self._craftable is not None:
+            craftable, by_id, recipes, has_item = self._craftable, self._by_id, self._recipes, self.discovered.has_item
+            self._craftable_count -= len(craftable.pop(vertex.id, ()))
+            # the recipes vertex is used in become craftable if the other input is discovered too
+            for key in self._uses.get(vertex.id, ()):
+                other = by_id[key >> 32 if key & 0xFFFFFFFF == vertex.id else key & 0xFFFFFFFF]
+                result = recipes[key]
+                if has_item(other.item) and not has_item(result.item):
+                    keys = craftable.setdefault(result.id, set())
+                    if key not in keys:
+                        keys.add(key)
+                        self._craftable_count += 1
+        if self._discoverable is not None:
+            self._spread_discoverable([vertex.id])
+        if self._plans is not None:
+            self._plans.add_sources([vertex.id], self._uses, self._recipes)
+        if self._discovered_ids is not None:
+            if vertex.id >= len(self._discovered_ids):
+                self._discovered_ids.extend(bytes(vertex.id + 1 - len(self._discovered_ids)))
+            self._discovered_ids[vertex.id] = 1
+
+    def craftable_count(self) -> int:
+        """
+        Returns the number of recipes that can be made from discovered elements and make an undiscovered
+        element. These are found from scratch the first time they are asked for, and kept up to date after
+        that as elements are discovered and recipes added.
+        """
+        if self._craftable is None:
+            self._craftable = {}
+            self._craftable_count = 0
+            uses = self._uses_index()
+            for vertex in self.discovered:
+                for key in uses.get(vertex.id, ()):
+                    self._add_if_craftable(key)
+        return self._craftable_count
+
+    def craftable(self) -> Iterator[tuple[str, str, str]]:
+        """
+        Yields every recipe that can be made from discovered elements and makes an undiscovered element, as
+        (item1, item2, item created), grouped by the element created. The graph must not be changed while
+        the recipes are being yielded.
+        """
+        self.craftable_count()
+        by_id = self._by_id
+        for result_id, keys in self._craftable.items():
+            for key in keys:
+                yield by_id[key >> 32].item, by_id[key & 0xFFFFFFFF].item, by_id[result_id].item
+
+    def remaining_discoverable(self) -> int:
+        """
+        Returns the number of undiscovered elements that can still be discovered by combining discovered
+        elements any number of times. These are found from scratch the first time they are asked for, and
+        kept up to date after that as elements are discovered and recipes added.
+        """
+        if self._discoverable is None:
+            self._discoverable = set()
+            self._spread_discoverable([vertex.id for vertex in self.discovered])
+        return len(self._discoverable) - len(self.discovered)
+
+    def _depth_costs(self) -> _CraftingCosts:
+        """
+        Returns _depths, finding them from scratch if they have not been found yet.
+        """
+        if self._depths is None:
+            self._depths = _CraftingCosts(additive=False)
+            self._depths.add_sources([vertex.id for vertex in self._defaults], self._uses_index(), self._recipes)
+        return self._depths
+
+    def crafting_depth(self, item: str) -> Optional[int]:
+        """
+        Returns the crafting depth of item: 0 for a $DEFAULT element, and otherwise 1 more than the deeper of
+        the two inputs of its shallowest recipe. This is the fewest rounds of combining, starting from the
+        $DEFAULT elements, that item can be made in. Returns None if item cannot be made from the $DEFAULT
+        elements or is not an element of the graph.
+
+        :param item: The name of the element.
+        """
+        vertex = self._vertices.get(item)
+        return None if vertex is None else self._depth_costs().costs.get(vertex.id)
+
+    def crafting_depths(self) -> dict[str, int]:
+        """
+        Returns a dictionary mapping the name of every element that can be made from the $DEFAULT elements to
+        its crafting depth (see crafting_depth). The depths are found from scratch the first time they are
+        asked for, and kept up to date after that as recipes are added.
+        """
+        by_id = self._by_id
+        return {by_id[id_].item: depth for id_, depth in self._depth_costs().costs.items()}
+
+    def crafting_plan(self, item: str) -> Optional[list[tuple[str, str, str]]]:
+        """
+        Returns the combinations that make item from the discovered elements, as (item1, item2, item created)
+        in an order they can be made in, or None if item cannot be made from them or is not an element of the
+        graph. The plan is empty if item is discovered.
+
+        The plan has the fewest steps of any plan that makes each element it needs in a separate branch, with
+        shared elements made again in each branch that needs them. Each element is only made once in the plan
+        returned, so it can have fewer steps than that, but finding the plan with the fewest steps when
+        elements are shared is NP-hard. The costs the plans come from are found from scratch the first time a
+        plan is asked for, and kept up to date after that as elements are discovered and recipes are added.
+
+        :param item: The name of the element.
+        """
+        vertex = self._vertices.get(item)
+        if self._plans is None:
+            self._plans = _CraftingCosts(additive=True)
+            self._plans.add_sources([found.id for found in self.discovered], self._uses_index(), self._recipes)
+        if vertex is None or vertex.id not in self._plans.costs:
+            return None
+        by_id, via = self._by_id, self._plans.via
+        plan, planned, stack = [], set(), [vertex.id]
+        while stack:
+            id_ = stack[-1]
+            if id_ in planned or id_ not in via:
+                stack.pop()
+                continue
+            key = via[id_]
+            # the inputs are planned before the element they make
+            inputs = [input_id for input_id in {key >> 32, key & 0xFFFFFFFF} if input_id in via
+                      and input_id not in planned]
+            if inputs:
+                stack.extend(inputs)
+            else:
+                stack.pop()
+                planned.add(id_)
+                plan.append((by_id[key >> 32].item, by_id[key & 0xFFFFFFFF].item, by_id[id_].item))
+        return plan
 
     def combine(self, item1: str, item2: str) -> tuple[bool, Optional[str]]:
         """
@@ -213,29 +888,78 @@ class Graph:
         :param item2: The name of the second item to combine.
         :return: A tuple containing a boolean indicating success, and optionally the name of the discovered item.
         """
-        discovered_items = {vertex.item for vertex in self.discovered}
-        if item1 not in discovered_items or item2 not in discovered_items:
+        if not self.discovered.has_item(item1) or not self.discovered.has_item(item2):
             # print('You may not craft with items you have not yet discovered.')
             return False, None
-        if item2 not in self._vertices[item1].neighbours:
+        crafted_item = self._recipes.get(_pair_key(self._vertices[item1].id, self._vertices[item2].id))
+        if crafted_item is None:
             # print('This is not a valid crafting recipe.')
             return False, None
         else:
-            crafted_item = self._vertices[item1].neighbours[item2]
             if crafted_item in self.discovered:
                 # print(f"You have already discovered {crafted_item.item}.")
                 return True, crafted_item.item.title()
             self.discovered.append(crafted_item)
+            self._on_discovered(crafted_item)
             # print(f'You have discovered {crafted_item.item}! Good job')
             return True, crafted_item.item.title()
 
+    def combine_many(self, pairs: Iterable[tuple[int, int]]) -> tuple[array, bytearray]:
+        """
+        Combines every pair of element IDs in pairs (see id_of), as combine does for a pair of names, and
+        returns the ID of the element each pair created, or -1 if it created none, along with a mask that is 1
+        for the pairs that discovered an element and 0 for the rest.
+
+        The discoveries are applied atomically: every pair is combined with the elements discovered before the
+        batch, so an element discovered by one pair cannot be used by a later pair of the same batch, and the
+        new elements are added to discovered, in the order of the pairs that discovered them, once every pair
+        has been resolved. Only the first pair that creates an element discovers it.
+
+        :param pairs: The pairs of element IDs to combine.
+        :return: The IDs of the elements created, as an array('i'), and the mask of discoveries, in the order
+        of pairs.
+        :raises ValueError: if an ID is not the ID of an element, in which case nothing is discovered.
+        """
+        n = len(self._by_id)
+        if self._discovered_ids is None:
+            self._discovered_ids = bytearray(n)
+            for vertex in self.discovered:
+                self._discovered_ids[vertex.id] = 1
+        elif len(self._discovered_ids) < n:
+            self._discovered_ids.extend(bytes(n - len(self._discovered_ids)))
+        # the discovered IDs are not changed until every pair has been resolved
+        recipes, discovered = self._recipes, self._discovered_ids
+        results, new = array('i'), bytearray()
+        found = {}
+        for id1, id2 in pairs:
+            if id1 > id2:
+                id1, id2 = id2, id1
+            if id1 < 0 or id2 >= n:
+                raise ValueError(f'no element has ID {id1 if id1 < 0 else id2}')
+            crafted = recipes.get((id1 << 32) | id2)
+            if crafted is None or not discovered[id1] or not discovered[id2]:
+                results.append(-1)
+                new.append(0)
+            else:
+                crafted_id = crafted.id
+                results.append(crafted_id)
+                if discovered[crafted_id] or crafted_id in found:
+                    new.append(0)
+                else:
+                    found[crafted_id] = crafted
+                    new.append(1)
+        for crafted in found.values():
+            self.discovered.append(crafted)
+            self._on_discovered(crafted)
+        return results, new
+
     def possible_new_combo(self, item1: str, item2: str) -> bool:
         """
         This method returns wheither you can create a new element with element 1 and element 2:
         """
         if (item1 not in self._vertices) or (item2 not in self._vertices):
             return False
-        elif item1 in self._vertices[item2].neighbours:
+        elif _pair_key(self._vertices[item1].id, self._vertices[item2].id) in self._recipes:
             return False
         return True
 
@@ -247,11 +971,1152 @@ class Graph:
             self.add_edge(item3, item1, item2)
 
 
-if __name__ == "__main__":
+def _recipes_by_result(results: Any) -> array:
+    """
+    Returns the positions of results, a sequence of result IDs, sorted by the result ID at each position, so
+    that the recipes that make an element can be found by binary search (see _keys_making).
+    """
+    return array('i', sorted(range(len(results)), key=results.__getitem__))
+
+
+def _keys_making(id_: int, keys: Any, results: Any, by_result: array) -> list[int]:
+    """
+    Returns the pair keys of the recipes that make the element id_, in the order of keys, given the sorted
+    pair keys of a table, the result ID of each of them and their positions sorted by result ID.
+    """
+    index = bisect_left(by_result, id_, key=results.__getitem__)
+    found = []
+    while index < len(by_result) and results[by_result[index]] == id_:
+        found.append(keys[by_result[index]])
+        index += 1
+    return found
+
+
+def _combine_ids(graph: Union[CompactGraph, MappedGraph], n: int,
+                 pairs: Iterable[tuple[int, int]]) -> tuple[array, bytearray]:
+    """
+    Combines every pair of element IDs in pairs, like Graph.combine_many, in a CompactGraph or MappedGraph
+    with n elements.
+    """
+    discovered = bytearray(n)
+    for vertex in graph.discovered:
+        discovered[vertex.id] = 1
+    # the discovered IDs are not changed until every pair has been resolved
+    results, new = array('i'), bytearray()
+    found = {}
+    for id1, id2 in pairs:
+        if id1 > id2:
+            id1, id2 = id2, id1
+        if id1 < 0 or id2 >= n:
+            raise ValueError(f'no element has ID {id1 if id1 < 0 else id2}')
+        crafted = graph._lookup(id1, id2) if discovered[id1] and discovered[id2] else -1
+        results.append(crafted)
+        if crafted == -1 or discovered[crafted] or crafted in found:
+            new.append(0)
+        else:
+            found[crafted] = None
+            new.append(1)
+    for crafted in found:
+        graph.discovered.append(graph.vertex(crafted))
+    return results, new
+
+
+class _CompactVertex:
+    """
+    A lightweight handle for an element of a CompactGraph. Handles are only created for elements that
+    are discovered or looked up, never for every element of the pack.
+
+    Instance Attributes:
+    - item: The name of the element.
+    - id: The integer ID of the element in its CompactGraph.
+    """
+    __slots__ = ('item', 'id')
+
+    item: str
+    id: int
+
+    def __init__(self, item: str, id_: int) -> None:
+        """
+        Initialize a handle for the element with the given name and ID.
+        """
+        self.item = item
+        self.id = id_
+
+
+class _CompactVertices(Mapping):
+    """
+    A read-only mapping from element names to _CompactVertex handles, returned by CompactGraph.get_vertices.
+    Handles are created on demand.
+
+    Instance Attributes:
+    - _graph: The graph whose elements this mapping views.
+    """
+    _graph: CompactGraph
+
+    def __init__(self, graph: CompactGraph) -> None:
+        """
+        Initialize a view of the elements of graph.
+        """
+        self._graph = graph
+
+    def __getitem__(self, item: str) -> _CompactVertex:
+        return self._graph.vertex(self._graph.ids[item])
+
+    def __len__(self) -> int:
+        return len(self._graph.names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._graph.names)
+
+    def __contains__(self, item: object) -> bool:
+        return item in self._graph.ids
+
+
+class CompactGraph:
+    """
+    A memory-compact alternative to Graph with the same API for loading a pack and playing a game: update,
+    reset, snapshot, restore, downdate, get_vertices, id_of, name, load_vertices, add_vertex, add_edge,
+    recipes_for, combine, combine_many, possible_new_combo and new_combo. Element names are interned to
+    integer IDs, and each recipe is stored once as an unordered pair key in a sorted array with a parallel
+    array of result IDs, so a recipe costs 12 bytes instead of two dictionary entries.
+
+    Graph's analyses of the player's progress (craftable_count, craftable, remaining_discoverable,
+    crafting_depth, crafting_depths and crafting_plan) are not provided, since the indexes they keep would
+    take back most of the memory saved.
+
+    Recipes added with add_edge are buffered and merged into the sorted arrays the next time a lookup
+    is made, so loading a whole pack only sorts once.
+
+    Instance Attributes:
+    - names: The element names, indexed by element ID.
+    - ids: A dictionary mapping element names to their IDs.
+    - discovered: The _CompactVertex handles of the discovered elements, in the order they were discovered.
+    - _defaults: The handles of the $DEFAULT elements, which are discovered at the start of every game.
+    - _keys: The sorted pair keys (see _pair_key) of every recipe.
+    - _results: The ID of the element created by the recipe with the same index in _keys.
+    - _by_result: The positions of _keys sorted by result ID (see _recipes_by_result), or None until
+      recipes_for is first called after the arrays change.
+    - _pending_keys: Pair keys of recipes added since the arrays were last sorted.
+    - _pending_results: Result IDs of the recipes in _pending_keys.
+    - conflicts: The recipes that were replaced because a later recipe used the same pair of elements,
+      as tuples (item1, item2, replaced item, new item), like Graph.conflicts.
+    - _handles: The _CompactVertex handles created so far, by element ID.
+
+    Representation Invariants:
+    - len(names) == len(ids) and all(ids[names[i]] == i for i in range(len(names)))
+    - _keys is sorted with no repeated keys, and len(_keys) == len(_results)
+    - len(_pending_keys) == len(_pending_results)
+    """
+    names: list[str]
+    ids: dict[str, int]
+    discovered: _DiscoveredSet
+    _defaults: list[_CompactVertex]
+    _keys: array
+    _results: array
+    _by_result: Optional[array]
+    _pending_keys: array
+    _pending_results: array
+    conflicts: list[tuple[str, str, str, str]]
+    _handles: dict[int, _CompactVertex]
+
+    def __init__(self, file: Optional[json] = None) -> None:
+        """
+        Initialize the graph and load the recipe pack in file, if given.
+
+        :param file: A JSON file in the format of recipes.json.
+        """
+        self.names = []
+        self.ids = {}
+        self.discovered = _DiscoveredSet()
+        self._defaults = []
+        self._keys, self._results = array('q'), array('i')
+        self._by_result = None
+        self._pending_keys, self._pending_results = array('q'), array('i')
+        self.conflicts = []
+        self._handles = {}
+        if file is not None:
+            self.load_vertices(file)
+
+    def vertex(self, id_: int) -> _CompactVertex:
+        """
+        Returns the handle of the element with the given ID, creating it if needed.
+        """
+        if id_ not in self._handles:
+            self._handles[id_] = _CompactVertex(self.names[id_], id_)
+        return self._handles[id_]
+
+    def update(self, items: list[str]) -> None:
+        """
+        Updates the discovered elements in self to be in accordance to items, exactly like Graph.update.
+
+        Preconditions:
+        - all the items are the names of existing elements in self
+        :param items: The list of items that is used to update self.discovered
+        """
+        vertices = []
+        for item in items:
+            if item not in self.ids:
+                raise ValueError
+            vertices.append(self.vertex(self.ids[item]))
+        item_set = set(items)
+        if all(vertex.item in item_set for vertex in self.discovered):
+            self.discovered = _DiscoveredSet(vertices)
+
+    def reset(self) -> None:
+        """
+        Forgets every discovery, leaving only the $DEFAULT elements discovered.
+        """
+        self.discovered = _DiscoveredSet(self._defaults)
+
+    def snapshot(self) -> tuple[str, ...]:
+        """
+        Returns the player's progress: the names of the discovered elements, in discovery order, like
+        Graph.snapshot.
+        """
+        return tuple(self.discovered.items())
+
+    def restore(self, items: Iterable[str]) -> None:
+        """
+        Replaces the player's progress with items, as returned by snapshot or read from a save, like
+        Graph.restore.
+
+        Preconditions:
+        - all the items are the names of existing elements in self
+        """
+        self.reset()
+        self.update(list(items))
+
+    def downdate(self) -> list[str]:
+        """
+        Return a list of the items given by the currently discovered elements.
+        """
+        return self.discovered.items()
+
+    def get_vertices(self) -> Mapping[str, _CompactVertex]:
+        """
+        Gets a read-only view of the elements of the graph, by name.
+        """
+        return _CompactVertices(self)
+
+    def id_of(self, item: str) -> int:
+        """
+        Returns the ID of the element named item, or -1 if there is no such element.
+        """
+        return self.ids.get(item, -1)
+
+    def name(self, id_: int) -> str:
+        """
+        Returns the name of the element with the given ID.
+        """
+        return self.names[id_]
+
+    def load_vertices(self, file: json) -> None:
+        """
+        Loads all elements and recipes from the file one row at a time, like Graph.load_vertices.
+
+        :param file: A JSON file to load vertices from.
+        """
+        self._load_rows(parse_rows(iter_json_array(file)))
+
+    def _load_rows(self, rows: Iterable[tuple[str, list[tuple]]]) -> None:
+        """
+        Adds the elements and recipes of rows, as yielded by parse_rows, to the graph.
+        """
+        for item_created, recipes in rows:
+            if not recipes:
+                self.add_vertex(item_created)
+                if self.discovered.append(self.vertex(self.ids[item_created])):
+                    self._defaults.append(self.vertex(self.ids[item_created]))
+            for item1, item2 in recipes:
+                self.add_edge(item_created, item1, item2)
+        self._merge_pending()
+
+    def _load_table(self, table: _PackTable) -> None:
+        """
+        Loads the elements and recipes of a compiled pack (see load_graph) into an empty graph.
+        """
+        self.names = table.names
+        self.ids = {item: id_ for id_, item in enumerate(table.names)}
+        self._keys, self._results = table.keys, table.results
+        self._by_result = None
+        self._defaults = [self.vertex(id_) for id_ in table.defaults]
+        self.discovered = _DiscoveredSet(self._defaults)
+        self.conflicts = [tuple(self.names[id_] for id_ in table.conflicts[i:i + 4])
+                          for i in range(0, len(table.conflicts), 4)]
+
+    def add_vertex(self, item: str) -> int:
+        """
+        Add an element with the given name if it doesn't already exist.
+
+        :param item: The name of the element.
+        :return: The ID of the element.
+        """
+        if item not in self.ids:
+            self.ids[item] = len(self.names)
+            self.names.append(item)
+        return self.ids[item]
+
+    def add_edge(self, item_created: str, item1: str, item2: str) -> None:
+        """
+        Add a recipe combining item1 and item2 into item_created, adding any missing elements.
+        A later recipe for the same pair replaces an earlier one.
+
+        :param item_created: The name of the element created by combining item1 and item2.
+        :param item1: The name of the first element in the combination.
+        :param item2: The name of the second element in the combination.
+        """
+        result = self.add_vertex(item_created)
+        self._pending_keys.append(_pair_key(self.add_vertex(item1), self.add_vertex(item2)))
+        self._pending_results.append(result)
+
+    def _merge_pending(self) -> None:
+        """
+        Merge the buffered recipes into the sorted arrays. When a pair appears more than once, the most
+        recently added recipe wins.
+        """
+        if not self._pending_keys:
+            return
+        self._by_result = None
+        if len(self._pending_keys) <= 64:
+            # a few user-added recipes are cheaper to insert in place than to re-sort the whole table
+            for key, result in zip(self._pending_keys, self._pending_results):
+                index = bisect_left(self._keys, key)
+                if index < len(self._keys) and self._keys[index] == key:
+                    self._record_conflict(key, self._results[index], result)
+                    self._results[index] = result
+                else:
+                    self._keys.insert(index, key)
+                    self._results.insert(index, result)
+            self._pending_keys, self._pending_results = array('q'), array('i')
+            return
+        keys = self._keys + self._pending_keys
+        results = self._results + self._pending_results
+        self._pending_keys, self._pending_results = array('q'), array('i')
+
+        # sorted is stable, so the last recipe for a pair is the last one of its run
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._keys, self._results = array('q'), array('i')
+        for position, index in enumerate(order):
+            if position + 1 < len(order) and keys[order[position + 1]] == keys[index]:
+                self._record_conflict(keys[index], results[index], results[order[position + 1]])
+                continue
+            self._keys.append(keys[index])
+            self._results.append(results[index])
+
+    def _record_conflict(self, key: int, replaced: int, result: int) -> None:
+        """
+        Record in self.conflicts that the recipe with the given pair key changed from replaced to result,
+        unless both recipes create the same element.
+        """
+        if replaced != result:
+            item1, item2 = self.names[key >> 32], self.names[key & 0xFFFFFFFF]
+            self.conflicts.append((item1, item2, self.names[replaced], self.names[result]))
+
+    def _lookup(self, id1: int, id2: int) -> int:
+        """
+        Returns the ID of the element created by combining the elements id1 and id2, or -1 if there is
+        no such recipe.
+        """
+        self._merge_pending()
+        key = _pair_key(id1, id2)
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            return self._results[index]
+        return -1
+
+    def combine(self, item1: str, item2: str) -> tuple[bool, Optional[str]]:
+        """
+        Attempts to combine two discovered items, like Graph.combine.
+
+        :param item1: The name of the first item to combine.
+        :param item2: The name of the second item to combine.
+        :return: A tuple containing a boolean indicating success, and optionally the name of the discovered item.
+        """
+        if not self.discovered.has_item(item1) or not self.discovered.has_item(item2):
+            return False, None
+        result = self._lookup(self.ids[item1], self.ids[item2])
+        if result == -1:
+            return False, None
+        self.discovered.append(self.vertex(result))
+        return True, self.names[result].title()
+
+    def combine_many(self, pairs: Iterable[tuple[int, int]]) -> tuple[array, bytearray]:
+        """
+        Combines every pair of element IDs in pairs (see id_of) and returns the ID of the element each pair
+        created, or -1, and the mask of the pairs that discovered an element, exactly like Graph.combine_many.
+
+        :raises ValueError: if an ID is not the ID of an element, in which case nothing is discovered.
+        """
+        return _combine_ids(self, len(self.names), pairs)
+
+    def recipes_for(self, item: str) -> list[tuple[str, str]]:
+        """
+        Returns the pairs of elements that combine into item, like Graph.recipes_for. The first call after
+        recipes are added sorts the recipes by result (see _recipes_by_result), and later calls binary search
+        them.
+
+        :param item: The name of the element.
+        """
+        if item not in self.ids:
+            return []
+        self._merge_pending()
+        if self._by_result is None:
+            self._by_result = _recipes_by_result(self._results)
+        names = self.names
+        return [(names[key >> 32], names[key & 0xFFFFFFFF])
+                for key in _keys_making(self.ids[item], self._keys, self._results, self._by_result)]
+
+    def possible_new_combo(self, item1: str, item2: str) -> bool:
+        """
+        Returns whether item1 and item2 both exist and do not combine into anything yet.
+        """
+        if item1 not in self.ids or item2 not in self.ids:
+            return False
+        return self._lookup(self.ids[item1], self.ids[item2]) == -1
+
+    def new_combo(self, item1: str, item2: str, item3: str) -> None:
+        """
+        Adds the recipe item1 + item2 = item3 if possible_new_combo(item1, item2).
+        """
+        if self.possible_new_combo(item1, item2):
+            self.add_edge(item3, item1, item2)
+
+
+class _PackTable:
+    """
+    The compiled form of a recipe pack: everything needed to build a Graph or CompactGraph without
+    parsing JSON. This is what gets written to and read from the binary recipe cache.
+
+    Instance Attributes:
+    - names: The element names, indexed by element ID.
+    - defaults: The IDs of the $DEFAULT elements, in file order.
+    - keys: The sorted pair keys (see _pair_key) of every recipe.
+    - results: The ID of the element created by the recipe with the same index in keys.
+    - conflicts: The IDs (item1, item2, replaced item, new item) of each recipe conflict, flattened.
+
+    Representation Invariants:
+    - len(keys) == len(results)
+    - len(conflicts) % 4 == 0
+    """
+    names: list[str]
+    defaults: array
+    keys: array
+    results: array
+    conflicts: array
+
+    def __init__(self, names: list[str], defaults: array, keys: array, results: array, conflicts: array) -> None:
+        """
+        Initialize a table from its parts.
+        """
+        self.names = names
+        self.defaults = defaults
+        self.keys = keys
+        self.results = results
+        self.conflicts = conflicts
+
+
+_CACHE_MAGIC = b'RPAC'
+_CACHE_VERSION = 2
+# magic, version, source mtime (ns), source size, source sha256, then the lengths of the sections below
+_CACHE_HEADER = struct.Struct('<4sIqq32sIIII')
+
+
+def _source_stamp(path: str) -> tuple[int, int]:
+    """
+    Returns the modification time in nanoseconds and the size of the file at path.
+    """
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _source_hash(path: str) -> bytes:
+    """
+    Returns the SHA-256 digest of the contents of the file at path.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def _aligned(n: int) -> int:
+    """
+    Returns n rounded up to the next multiple of 8, so every section of the cache file is 8-byte aligned.
+    """
+    return (n + 7) & ~7
+
+
+def _cache_sections(header: tuple) -> dict[str, tuple[str, int, int]]:
+    """
+    Returns the typecode, byte offset and length of every array section of a cache file with the given
+    unpacked header, by section name. The UTF-8 name blob starts at the offset of the 'blob' entry.
+    """
+    n_names, n_defaults, n_recipes, n_conflicts = header[5:]
+    sections = {}
+    position = _aligned(_CACHE_HEADER.size)
+    for name, typecode, length in (('offsets', 'I', n_names + 1), ('defaults', 'i', n_defaults),
+                                   ('conflicts', 'i', n_conflicts), ('keys', 'q', n_recipes),
+                                   ('results', 'i', n_recipes), ('name_index', 'i', n_names),
+                                   ('blob', 'B', 0)):
+        sections[name] = (typecode, position, length)
+        position += _aligned(length * array(typecode).itemsize)
+    return sections
+
+
+def compile_pack(path: str) -> _PackTable:
+    """
+    Parses the recipe pack at path and returns its compiled table.
+
+    :param path: The path of a JSON file in the format of recipes.json.
+    """
+    with open(path) as file:
+        graph = CompactGraph(file)
+    graph._merge_pending()
+    conflicts = array('i')
+    for conflict in graph.conflicts:
+        conflicts.extend(graph.ids[item] for item in conflict)
+    return _PackTable(graph.names, array('i', (vertex.id for vertex in graph.discovered)),
+                      graph._keys, graph._results, conflicts)
+
+
+def write_cache(table: _PackTable, cache_path: str, source_path: str) -> None:
+    """
+    Writes table to cache_path, stamped with the modification time, size and hash of source_path.
+    The file is written to a temporary name first and then moved into place, so a reader (or a process
+    that has the old file mapped) never sees a partially written cache. The temporary file is removed if
+    the write fails.
+
+    The layout is the header, then the name offsets (uint32, len(names) + 1 of them), the defaults (int32),
+    the conflicts (int32), the pair keys (int64), the result IDs (int32), the element IDs sorted by name
+    (int32) and the UTF-8 names, each section padded to a multiple of 8 bytes and stored little-endian.
+    """
+    encoded = [name.encode('utf-8') for name in table.names]
+    offsets = array('I', [0])
+    for name in encoded:
+        offsets.append(offsets[-1] + len(name))
+    name_index = array('i', sorted(range(len(encoded)), key=encoded.__getitem__))
+    mtime, size = _source_stamp(source_path)
+    header = _CACHE_HEADER.pack(_CACHE_MAGIC, _CACHE_VERSION, mtime, size, _source_hash(source_path),
+                                len(table.names), len(table.defaults), len(table.keys), len(table.conflicts))
+
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    temp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        with open(temp_path, 'wb') as file:
+            file.write(header + bytes(_aligned(len(header)) - len(header)))
+            for section in (offsets, table.defaults, table.conflicts, table.keys, table.results, name_index):
+                if sys.byteorder == 'big':
+                    section = array(section.typecode, section)
+                    section.byteswap()
+                data = section.tobytes()
+                file.write(data + bytes(_aligned(len(data)) - len(data)))
+            file.write(b''.join(encoded))
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        # e.g. a full disk, so that a failed write does not leave its temporary file behind
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _read_header(cache_path: str) -> Optional[tuple]:
+    """
+    Returns the unpacked header of the cache file at cache_path, or None if it is missing, was not
+    written by this version of the code, or is too short to hold the sections its header describes.
+    """
+    try:
+        with open(cache_path, 'rb') as file:
+            data = file.read(_CACHE_HEADER.size)
+            file_size = os.fstat(file.fileno()).st_size
+    except OSError:
+        return None
+    if len(data) < _CACHE_HEADER.size:
+        return None
+    header = _CACHE_HEADER.unpack(data)
+    if header[0] != _CACHE_MAGIC or header[1] != _CACHE_VERSION:
+        return None
+    if file_size < _cache_sections(header)['blob'][1]:
+        # a truncated file, e.g. from a disk that filled up
+        return None
+    return header
+
+
+def _restamp(cache_path: str, stamp: tuple[int, int]) -> None:
+    """
+    Replaces the source modification time and size in the header of the cache file at cache_path with
+    stamp, so that a source that was touched without being changed is not hashed again on every load.
+    Nothing happens if the file cannot be written.
+    """
+    try:
+        with open(cache_path, 'r+b') as file:
+            file.seek(8)
+            file.write(struct.pack('<qq', *stamp))
+    except OSError:
+        pass
+
+
+def cache_is_current(cache_path: str, source_path: str) -> bool:
+    """
+    Returns whether the cache at cache_path is an up-to-date compilation of source_path.
+
+    The cache is up to date if it was written by this version of the code and either the modification time
+    and size of source_path match the ones it was stamped with, or the contents of source_path still have
+    the same hash (e.g. the file was touched or copied without being changed).
+
+    When only the hash matches, the cache is stamped with the new modification time and size, so that the
+    source is not hashed again the next time.
+    """
+    header = _read_header(cache_path)
+    if header is None:
+        return False
+    stamp = _source_stamp(source_path)
+    if header[2:4] == stamp:
+        return True
+    if header[4] != _source_hash(source_path):
+        return False
+    _restamp(cache_path, stamp)
+    return True
+
+
+def _check_sections(offsets: Any, blob: Any, defaults: Any, conflicts: Any, keys: Any, results: Any,
+                    name_index: Any) -> list[str]:
+    """
+    Checks that the sections of a cache file, as arrays or typed memoryviews, describe a valid table, and
+    returns the element names.
+
+    :raises ValueError: if the name offsets do not match blob, a name is not UTF-8, an element ID is out of
+        range, the pair keys are not sorted, or the name index does not list every element once, in order
+        of name.
+    """
+    n_names = len(offsets) - 1
+    if offsets[n_names] != len(blob) or not all(map(operator.le, offsets, offsets[1:])):
+        raise ValueError('the name offsets do not match the names')
+    text = str(blob, 'utf-8')
+    if len(text) == len(blob):
+        # every name is ASCII, so the byte offsets are also offsets into text
+        names = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+    else:
+        names = [str(blob[start:end], 'utf-8') for start, end in zip(offsets, offsets[1:])]
+    for name, section in (('defaults', defaults), ('conflicts', conflicts), ('results', results),
+                          ('name index', name_index)):
+        if section and not 0 <= min(section) <= max(section) < n_names:
+            raise ValueError(f'an element ID in the {name} is out of range')
+    if keys and (keys[0] < 0 or not all(map(operator.lt, keys, keys[1:]))):
+        raise ValueError('the pair keys are not sorted')
+    # the keys are sorted, so the last one has the largest first ID, and the second IDs are the low halves
+    halves = array('I', keys.tobytes())
+    if keys and (keys[-1] >> 32 >= n_names or max(halves[sys.byteorder == 'big'::2]) >= n_names):
+        raise ValueError('an element ID in the keys is out of range')
+    # strictly increasing names also means that no element is listed twice, so every element is listed once
+    by_name = [names[id_] for id_ in name_index]
+    if len(by_name) != n_names or not all(map(operator.lt, by_name, by_name[1:])):
+        raise ValueError('the name index does not list every element once, in order of name')
+    return names
+
+
+def read_cache(cache_path: str, source_path: str) -> Optional[_PackTable]:
+    """
+    Returns the table stored in cache_path, or None if there is no cache, it is out of date
+    (see cache_is_current), or it is truncated or corrupt (see _check_sections).
+    """
+    if not cache_is_current(cache_path, source_path):
+        return None
+    with open(cache_path, 'rb') as file:
+        data = file.read()
+    if len(data) < _CACHE_HEADER.size:
+        return None
+    sections = _cache_sections(_CACHE_HEADER.unpack_from(data))
+    arrays = {}
+    for name in ('offsets', 'defaults', 'conflicts', 'keys', 'results', 'name_index'):
+        typecode, position, length = sections[name]
+        section = array(typecode)
+        end = position + length * section.itemsize
+        if end > len(data):
+            return None
+        section.frombytes(data[position:end])
+        if sys.byteorder == 'big':
+            section.byteswap()
+        arrays[name] = section
+    try:
+        names = _check_sections(arrays['offsets'], data[sections['blob'][1]:], arrays['defaults'],
+                                arrays['conflicts'], arrays['keys'], arrays['results'], arrays['name_index'])
+    except ValueError:
+        # a corrupt cache is treated like a stale one, so the pack is compiled again
+        return None
+    return _PackTable(names, arrays['defaults'], arrays['keys'], arrays['results'], arrays['conflicts'])
+
+
+def cache_path_for(source_path: str) -> str:
+    """
+    Returns the path of the binary cache for the recipe pack at source_path, which is kept in a
+    .recipecache directory next to it.
+    """
+    directory, name = os.path.split(os.path.abspath(source_path))
+    return os.path.join(directory, '.recipecache', name + '.bin')
+
+
+class _MappedVertices(Mapping):
+    """
+    A read-only mapping from element names to _CompactVertex handles, returned by MappedGraph.get_vertices.
+
+    Instance Attributes:
+    - _graph: The graph whose elements this mapping views.
+    """
+    _graph: MappedGraph
+
+    def __init__(self, graph: MappedGraph) -> None:
+        """
+        Initialize a view of the elements of graph.
+        """
+        self._graph = graph
+
+    def __getitem__(self, item: str) -> _CompactVertex:
+        id_ = self._graph.id_of(item)
+        if id_ == -1:
+            raise KeyError(item)
+        return self._graph.vertex(id_)
+
+    def __len__(self) -> int:
+        return self._graph.n_elements()
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._graph.name(id_) for id_ in range(self._graph.n_elements()))
+
+    def __contains__(self, item: object) -> bool:
+        return isinstance(item, str) and self._graph.id_of(item) != -1
+
+
+class MappedGraph:
+    """
+    A read-only recipe database that answers queries directly from a memory-mapped cache file (see
+    write_cache), without deserializing it. Recipe lookups binary search the sorted pair keys and name
+    lookups binary search the name index, all over the mapped buffer, so the database holds no table in
+    memory and every process that opens the same file shares one page-cached copy. Opening it checks the
+    file once (see _check_sections) unless told that it has been checked already.
+
+    Only the player's progress is kept in memory: the discovered handles and any recipes added with
+    new_combo, which are layered over the mapped table and never written back to it.
+
+    It has the same API as CompactGraph, except load_vertices, add_vertex and add_edge, since the table is
+    read-only. Like CompactGraph, it does not provide Graph's analyses of the player's progress.
+
+    The graph holds the cache file open until it is closed, so it should be used as a context manager:
+
+        with load_graph(path, MappedGraph) as graph:
+            ...
+
+    Instance Attributes:
+    - discovered: The _CompactVertex handles of the discovered elements, in the order they were discovered.
+    - conflicts: The recipe conflicts recorded when the pack was compiled, like Graph.conflicts.
+    - _file: The open cache file.
+    - _map: The read-only memory map of the cache file.
+    - _offsets, _defaults, _keys, _results, _name_index: Typed memoryviews of the sections of the map.
+    - _blob: A memoryview of the UTF-8 names in the map.
+    - _extra_names: Names of elements added with new_combo, whose IDs follow the IDs in the map.
+    - _extra_ids: A dictionary mapping each name in _extra_names to its ID.
+    - _extra_recipes: A dictionary mapping pair keys to result IDs for recipes added with new_combo.
+    - _handles: The _CompactVertex handles created so far, by element ID.
+    - _by_result: The positions of _keys sorted by result ID (see _recipes_by_result), or None until
+      recipes_for is first called.
+
+    Representation Invariants:
+    - the mapped file was written by write_cache on a little-endian machine.
+    - no key of _extra_recipes is in _keys.
+    """
+    discovered: _DiscoveredSet
+    conflicts: list[tuple[str, str, str, str]]
+    _file: Any
+    _map: mmap.mmap
+    _offsets: memoryview
+    _defaults: memoryview
+    _keys: memoryview
+    _results: memoryview
+    _name_index: memoryview
+    _blob: memoryview
+    _extra_names: list[str]
+    _extra_ids: dict[str, int]
+    _extra_recipes: dict[int, int]
+    _handles: dict[int, _CompactVertex]
+    _by_result: Optional[array]
+
+    def __init__(self, cache_path: str, check: bool = True) -> None:
+        """
+        Map the compiled recipe database at cache_path.
+
+        :param cache_path: The path of a file written by write_cache.
+        :param check: Whether to check the contents of the file (see _check_sections), which takes time in
+            proportion to its size. Only pass False for a file that this program has already opened with
+            the check, such as in a worker process.
+        :raises ValueError: if the file is not a compiled recipe database that can be mapped on this machine,
+            or is truncated or corrupt.
+        """
+        header = _read_header(cache_path)
+        if header is None or sys.byteorder != 'little':
+            raise ValueError(f'{cache_path} is not a compiled recipe database for this machine')
+        self._file = open(cache_path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+        sections = _cache_sections(header)
+        if len(self._map) < sections['blob'][1]:
+            # the file was truncated after its header was read
+            self._map.close()
+            self._file.close()
+            raise ValueError(f'{cache_path} is shorter than the sections its header describes')
+        view = memoryview(self._map)
+        for name in ('offsets', 'defaults', 'conflicts', 'keys', 'results', 'name_index'):
+            typecode, position, length = sections[name]
+            size = array(typecode).itemsize
+            setattr(self, '_' + name, view[position:position + length * size].cast(typecode))
+        self._blob = view[sections['blob'][1]:]
+        view.release()
+        if check:
+            try:
+                _check_sections(self._offsets, self._blob, self._defaults, self._conflicts, self._keys,
+                                self._results, self._name_index)
+            except ValueError as error:
+                self.close()
+                raise ValueError(f'{cache_path} is not a valid compiled recipe database: {error}') from error
+
+        self._extra_names, self._extra_ids, self._extra_recipes = [], {}, {}
+        self._handles = {}
+        self._by_result = None
+        self.discovered = _DiscoveredSet(self.vertex(id_) for id_ in self._defaults)
+        conflicts = self._conflicts
+        self.conflicts = [tuple(self.name(id_) for id_ in conflicts[i:i + 4]) for i in range(0, len(conflicts), 4)]
+
+    def __enter__(self) -> MappedGraph:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Release the memory map. The graph must not be used afterwards. Closing it again does nothing.
+        """
+        if self._map.closed:
+            return
+        for view in (self._offsets, self._defaults, self._conflicts, self._keys, self._results,
+                     self._name_index, self._blob):
+            view.release()
+        self._map.close()
+        self._file.close()
+
+    def n_elements(self) -> int:
+        """
+        Returns the number of elements in the database, including those added with new_combo.
+        """
+        return len(self._offsets) - 1 + len(self._extra_names)
+
+    def recipe_keys(self) -> memoryview:
+        """
+        Returns the sorted pair keys (see _pair_key) of the recipes in the map, as a read-only memoryview of
+        64-bit integers. Recipes added with new_combo are not included.
+        """
+        return self._keys
+
+    def recipe_results(self) -> memoryview:
+        """
+        Returns the ID of the element made by the recipe with the same index in recipe_keys(), as a read-only
+        memoryview of 32-bit integers.
+        """
+        return self._results
+
+    def defaults(self) -> memoryview:
+        """
+        Returns the IDs of the $DEFAULT elements, as a read-only memoryview of 32-bit integers.
+        """
+        return self._defaults
+
+    def name(self, id_: int) -> str:
+        """
+        Returns the name of the element with the given ID.
+        """
+        n_mapped = len(self._offsets) - 1
+        if id_ >= n_mapped:
+            return self._extra_names[id_ - n_mapped]
+        return str(self._blob[self._offsets[id_]:self._offsets[id_ + 1]], 'utf-8')
+
+    def id_of(self, item: str) -> int:
+        """
+        Returns the ID of the element named item, or -1 if there is no such element.
+        """
+        if item in self._extra_ids:
+            return self._extra_ids[item]
+        # a bytearray can be compared with the memoryviews of the names, so no name is copied out of the map
+        target = bytearray(item.encode('utf-8'))
+        offsets, blob, name_index = self._offsets, self._blob, self._name_index
+        low, high = 0, len(name_index)
+        while low < high:
+            middle = (low + high) // 2
+            id_ = name_index[middle]
+            if target > blob[offsets[id_]:offsets[id_ + 1]]:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(name_index):
+            id_ = name_index[low]
+            if blob[offsets[id_]:offsets[id_ + 1]] == target:
+                return id_
+        return -1
+
+    def vertex(self, id_: int) -> _CompactVertex:
+        """
+        Returns the handle of the element with the given ID, creating it if needed.
+        """
+        if id_ not in self._handles:
+            self._handles[id_] = _CompactVertex(self.name(id_), id_)
+        return self._handles[id_]
+
+    def _lookup(self, id1: int, id2: int) -> int:
+        """
+        Returns the ID of the element created by combining the elements id1 and id2, or -1 if there is
+        no such recipe.
+        """
+        key = _pair_key(id1, id2)
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            return self._results[index]
+        return self._extra_recipes.get(key, -1)
+
+    def update(self, items: list[str]) -> None:
+        """
+        Updates the discovered elements in self to be in accordance to items, exactly like Graph.update.
+
+        Preconditions:
+        - all the items are the names of existing elements in self
+        :param items: The list of items that is used to update self.discovered
+        """
+        vertices = []
+        for item in items:
+            id_ = self.id_of(item)
+            if id_ == -1:
+                raise ValueError
+            vertices.append(self.vertex(id_))
+        item_set = set(items)
+        if all(vertex.item in item_set for vertex in self.discovered):
+            self.discovered = _DiscoveredSet(vertices)
+
+    def reset(self) -> None:
+        """
+        Forgets every discovery, leaving only the $DEFAULT elements discovered.
+        """
+        self.discovered = _DiscoveredSet(self.vertex(id_) for id_ in self._defaults)
+
+    def snapshot(self) -> tuple[str, ...]:
+        """
+        Returns the player's progress: the names of the discovered elements, in discovery order, like
+        Graph.snapshot.
+        """
+        return tuple(self.discovered.items())
+
+    def restore(self, items: Iterable[str]) -> None:
+        """
+        Replaces the player's progress with items, as returned by snapshot or read from a save, like
+        Graph.restore.
+
+        Preconditions:
+        - all the items are the names of existing elements in self
+        """
+        self.reset()
+        self.update(list(items))
+
+    def downdate(self) -> list[str]:
+        """
+        Return a list of the items given by the currently discovered elements.
+        """
+        return self.discovered.items()
+
+    def get_vertices(self) -> Mapping[str, _CompactVertex]:
+        """
+        Gets a read-only view of the elements of the database, by name.
+        """
+        return _MappedVertices(self)
+
+    def recipes_for(self, item: str) -> list[tuple[str, str]]:
+        """
+        Returns the pairs of elements that combine into item, like Graph.recipes_for. The first call sorts the
+        positions of the mapped recipes by result (see _recipes_by_result), which takes 4 bytes of memory per
+        recipe, and later calls binary search them.
+
+        :param item: The name of the element.
+        """
+        id_ = self.id_of(item)
+        if id_ == -1:
+            return []
+        if self._by_result is None:
+            self._by_result = _recipes_by_result(self._results)
+        keys = _keys_making(id_, self._keys, self._results, self._by_result)
+        keys.extend(key for key, result in self._extra_recipes.items() if result == id_)
+        return [(self.name(key >> 32), self.name(key & 0xFFFFFFFF)) for key in keys]
+
+    def combine(self, item1: str, item2: str) -> tuple[bool, Optional[str]]:
+        """
+        Attempts to combine two discovered items, like Graph.combine.
+
+        :param item1: The name of the first item to combine.
+        :param item2: The name of the second item to combine.
+        :return: A tuple containing a boolean indicating success, and optionally the name of the discovered item.
+        """
+        if not self.discovered.has_item(item1) or not self.discovered.has_item(item2):
+            return False, None
+        result = self._lookup(self.discovered.get(item1).id, self.discovered.get(item2).id)
+        if result == -1:
+            return False, None
+        crafted = self.vertex(result)
+        self.discovered.append(crafted)
+        return True, crafted.item.title()
+
+    def combine_many(self, pairs: Iterable[tuple[int, int]]) -> tuple[array, bytearray]:
+        """
+        Combines every pair of element IDs in pairs (see id_of) and returns the ID of the element each pair
+        created, or -1, and the mask of the pairs that discovered an element, exactly like Graph.combine_many.
+
+        :raises ValueError: if an ID is not the ID of an element, in which case nothing is discovered.
+        """
+        return _combine_ids(self, self.n_elements(), pairs)
+
+    def possible_new_combo(self, item1: str, item2: str) -> bool:
+        """
+        Returns whether item1 and item2 both exist and do not combine into anything yet.
+        """
+        id1, id2 = self.id_of(item1), self.id_of(item2)
+        return id1 != -1 and id2 != -1 and self._lookup(id1, id2) == -1
+
+    def new_combo(self, item1: str, item2: str, item3: str) -> None:
+        """
+        Adds the recipe item1 + item2 = item3 for this process only if possible_new_combo(item1, item2).
+        """
+        if self.possible_new_combo(item1, item2):
+            result = self.id_of(item3)
+            if result == -1:
+                result = self.n_elements()
+                self._extra_ids[item3] = result
+                self._extra_names.append(item3)
+            self._extra_recipes[_pair_key(self.id_of(item1), self.id_of(item2))] = result
+
+
+def compile_to_cache(path: str) -> str:
+    """
+    Compiles the recipe pack at path to its binary cache unless the cache is already current, and
+    returns the path of the cache.
+
+    :param path: The path of a JSON file in the format of recipes.json.
+    """
+    cache_path = cache_path_for(path)
+    if not cache_is_current(cache_path, path):
+        write_cache(compile_pack(path), cache_path, path)
+    return cache_path
+
+
+def load_graph(path: str, engine: Optional[type] = None, use_cache: bool = True) -> Any:
+    """
+    Returns a graph of the given engine (Graph by default, CompactGraph or MappedGraph) for the recipe
+    pack at path.
+
+    The pack is compiled to a binary cache the first time it is loaded, and later calls load the cache
+    instead of parsing the JSON again. The cache is rebuilt automatically when the JSON file changes.
+    If the cache cannot be written (e.g. a read-only directory), the pack is still loaded, except with
+    MappedGraph, which needs the cache file.
+
+    :param path: The path of a JSON file in the format of recipes.json.
+    :param engine: Graph, CompactGraph or MappedGraph. The engines can be swapped for playing a game, but only
+        Graph has the analyses of the player's progress (see CompactGraph).
+    :param use_cache: Whether to read and write the binary cache. MappedGraph always uses it.
+
+    A MappedGraph keeps the cache file open until it is closed, so callers should use it in a with statement.
+    """
+    engine = Graph if engine is None else engine
+    if engine is MappedGraph:
+        cache_path = compile_to_cache(path)
+        try:
+            return MappedGraph(cache_path)
+        except ValueError:
+            # a corrupt cache is compiled again, like in read_cache
+            write_cache(compile_pack(path), cache_path, path)
+            return MappedGraph(cache_path)
+    if not use_cache:
+        with open(path) as file:
+            return engine(file)
+    cache_path = cache_path_for(path)
+    table = read_cache(cache_path, path)
+    if table is None:
+        table = compile_pack(path)
+        try:
+            write_cache(table, cache_path, path)
+        except OSError:
+            pass
+    graph = engine()
+    graph._load_table(table)
+    return graph
+
+
+class GraphRegistry:
+    """
+    Loads each recipe pack at most once per process and hands out the same Graph every time it is asked
+    for again, so moving between the menu and the game does not read the pack from disk again.
+
+    A registry graph is shared between sessions: callers should restore the player's progress onto it
+    (see Graph.restore) when a session starts, rather than assume it is freshly loaded.
+
+    Instance Attributes:
+    - load_times: A dictionary mapping each pack path to the number of seconds it took to load.
+    - _graphs: A dictionary mapping each pack path to its loaded Graph.
+    """
+    load_times: dict[str, float]
+    _graphs: dict[str, Graph]
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty registry.
+        """
+        self.load_times = {}
+        self._graphs = {}
+
+    def get(self, path: str) -> Graph:
+        """
+        Returns the Graph for the recipe pack at path, loading it (see load_graph) on the first request.
+
+        :param path: The path of a JSON file in the format of recipes.json.
+        """
+        if path not in self._graphs:
+            start = time.perf_counter()
+            self._graphs[path] = load_graph(path)
+            self.load_times[path] = time.perf_counter() - start
+        return self._graphs[path]
+
+    def is_loaded(self, path: str) -> bool:
+        """
+        Returns whether the recipe pack at path has already been loaded.
+        """
+        return path in self._graphs
+
+    def clear(self) -> None:
+        """
+        Forgets every loaded graph, so they are loaded from disk again on the next request.
+        """
+        self._graphs.clear()
+        self.load_times.clear()
+
+
+if __name__ == "__main__" and sys.argv[1:2] == ['analyze']:
+    # python -m recipeloader analyze PACK [--workers N] [--report PATH], see packanalyzer.py
+    import packanalyzer
+    sys.exit(packanalyzer.run_from_command_line(sys.argv[2:]))
+elif __name__ == "__main__":
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['sys', 'pygame', 'recipeloader', 'random', 'button', 'json'],
-        'allowed-io': [],  # the names (strs) of functions that call print/open/input
+        'extra-imports': ['sys', 'pygame', 'recipeloader', 'random', 'button', 'json', 'array', 'bisect',
+                          'collections.abc', 'hashlib', 'heapq', 'mmap', 'operator', 'os', 'struct', 'time',
+                          'packanalyzer'],
+        'allowed-io': ['compile_pack', 'write_cache', '_read_header', 'read_cache', 'load_graph', '_source_hash',
+                       'MappedGraph.__init__'],
         'max-line-length': 120,
         'no-member': False
     })
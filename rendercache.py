@@ -0,0 +1,240 @@
+"""
+File Outline
+===============================
+This file provides the caches used to draw text in Python Alchemy. Fonts are loaded from disk once per
+(path, size), and rendered text surfaces are kept in a least-recently-used cache with a memory budget, so
+text that is drawn every frame is only rendered once. Outlined labels, which take several text renders to
+compose, and labels resized for the zoomed board are cached the same way.
+
+Surfaces returned by render_text, render_outlined and scaled are shared between callers and must not be drawn on.
+
+Copyright and Usage Information
+===============================
+This file is provided solely for the private use of the teaching staff
+of CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited.
+
+This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjamin Gavriely
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+import pygame
+
+
+def surface_bytes(surface: pygame.Surface) -> int:
+    """
+    Returns the number of bytes of pixel data held by surface.
+    """
+    return surface.get_pitch() * surface.get_height()
+
+
+class LRUCache:
+    """
+    A least-recently-used cache with a budget on the total size of its values. When adding a value takes
+    the cache over budget, the least recently used values are evicted until it fits again.
+
+    Instance Attributes:
+    - max_size: The budget for the total size of the cached values.
+    - size: The total size of the cached values.
+    - hits: The number of lookups that found their key.
+    - misses: The number of lookups that did not find their key.
+    - evictions: The number of values evicted to stay within max_size.
+    - _size_of: The function giving the size of a value.
+    - _entries: The cached values and their sizes, from least to most recently used.
+
+    Representation Invariants:
+    - 0 <= size <= max_size, unless the cache holds a single value bigger than max_size
+    - size == sum of the sizes in _entries
+    """
+    max_size: int
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+    _size_of: Callable[[Any], int]
+    _entries: OrderedDict[Hashable, tuple[Any, int]]
+
+    def __init__(self, max_size: int, size_of: Callable[[Any], int]) -> None:
+        """
+        Initialize an empty cache.
+
+        :param max_size: The budget for the total size of the cached values.
+        :param size_of: The function giving the size of a value.
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+        self._size_of = size_of
+        self._entries = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the value cached under key and marks it as most recently used, or returns None if there is
+        no such value.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Caches value under key as the most recently used value, evicting other values if needed.
+        """
+        if key in self._entries:
+            self.size -= self._entries.pop(key)[1]
+        value_size = self._size_of(value)
+        self._entries[key] = (value, value_size)
+        self.size += value_size
+        while self.size > self.max_size and len(self._entries) > 1:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Removes every cached value. The counters are kept.
+        """
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the number of entries, their total size and the hit, miss and eviction counters.
+        """
+        return {'entries': len(self._entries), 'size': self.size, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions}
+
+
+# Fonts by (path, size), and how often a font was found in or added to the cache
+_FONTS: dict[tuple[str, int], pygame.font.Font] = {}
+FONT_STATS = {'hits': 0, 'misses': 0}
+
+# Rendered text by (font, text, antialias, colour, background), within an 8 MiB budget
+TEXT_CACHE = LRUCache(8 * 2 ** 20, surface_bytes)
+
+# Outlined labels by (font, text, colour, outline colour, outline width), within an 8 MiB budget
+OUTLINE_CACHE = LRUCache(8 * 2 ** 20, surface_bytes)
+
+# Resized surfaces by (surface, size), within a 16 MiB budget
+SCALED_CACHE = LRUCache(16 * 2 ** 20, surface_bytes)
+
+
+def get_font(path: str, size: int) -> pygame.font.Font:
+    """
+    Returns the font in the file at path with the given size, loading it only the first time it is asked for.
+
+    :param path: The path of the font file.
+    :param size: The size of the font in pixels.
+    """
+    key = (path, size)
+    font = _FONTS.get(key)
+    if font is None:
+        FONT_STATS['misses'] += 1
+        font = _FONTS[key] = pygame.font.Font(path, size)
+    else:
+        FONT_STATS['hits'] += 1
+    return font
+
+
+def _colour_key(colour: Any) -> Optional[tuple[int, int, int, int]]:
+    """
+    Returns a hashable form of a Pygame colour given as a name, hex string, tuple or pygame.Color.
+    """
+    if colour is None:
+        return None
+    return tuple(pygame.Color(colour))
+
+
+def render_text(font: pygame.font.Font, text: str, antialias: bool, colour: Any,
+                background: Any = None) -> pygame.Surface:
+    """
+    Returns font.render(text, antialias, colour, background), rendering it only if the same text has not
+    been rendered recently. The returned surface is shared, so it must not be drawn on.
+    """
+    key = (font, text, antialias, _colour_key(colour), _colour_key(background))
+    surface = TEXT_CACHE.get(key)
+    if surface is None:
+        surface = font.render(text, antialias, colour, background)
+        TEXT_CACHE.put(key, surface)
+    return surface
+
+
+def render_outlined(font: pygame.font.Font, text: str, colour: Any, outline_colour: Any,
+                    outline_width: int) -> pygame.Surface:
+    """
+    Returns an antialiased rendering of text in colour, surrounded by an outline of outline_colour that is
+    outline_width pixels wide. The label is only composed if the same one has not been composed recently.
+    The returned surface is shared, so it must not be drawn on.
+
+    Preconditions:
+    - outline_width > 0
+    """
+    key = (font, text, _colour_key(colour), _colour_key(outline_colour), outline_width)
+    outline = OUTLINE_CACHE.get(key)
+    if outline is not None:
+        return outline
+
+    base = render_text(font, text, True, colour)
+    shadow = render_text(font, text, True, outline_colour)
+    # The outlined label is larger than the base text by the outline width on all sides
+    outline = pygame.Surface((base.get_width() + 2 * outline_width, base.get_height() + 2 * outline_width),
+                             pygame.SRCALPHA)
+    for dx, dy in ((0, 0), (0, 2), (2, 0), (2, 2)):
+        outline.blit(shadow, (dx * outline_width, dy * outline_width))
+    outline.blit(base, (outline_width, outline_width))
+    OUTLINE_CACHE.put(key, outline)
+    return outline
+
+
+def scaled(surface: pygame.Surface, size: tuple[int, int]) -> pygame.Surface:
+    """
+    Returns surface smoothly resized to size, resizing it only if it has not been resized to that size
+    recently. The returned surface is shared, so it must not be drawn on, and neither must surface.
+    """
+    if surface.get_size() == size:
+        return surface
+    key = (surface, size)
+    result = SCALED_CACHE.get(key)
+    if result is None:
+        result = pygame.transform.smoothscale(surface, size)
+        SCALED_CACHE.put(key, result)
+    return result
+
+
+def clear() -> None:
+    """
+    Empties the font cache, the text cache, the outlined label cache and the resized surface cache. The
+    counters are kept.
+    """
+    _FONTS.clear()
+    TEXT_CACHE.clear()
+    OUTLINE_CACHE.clear()
+    SCALED_CACHE.clear()
+
+
+def stats() -> dict[str, dict[str, int]]:
+    """
+    Returns the counters of the font cache, the text cache, the outlined label cache and the resized surface
+    cache.
+    """
+    return {'fonts': {'entries': len(_FONTS), **FONT_STATS}, 'text': TEXT_CACHE.stats(),
+            'outlined': OUTLINE_CACHE.stats(), 'scaled': SCALED_CACHE.stats()}
+
+
+if __name__ == "__main__":
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['collections', 'pygame'],
+        'allowed-io': [],  # the names (strs) of functions that call print/open/input
+        'max-line-length': 120,
+        'no-member': False
+    })
@@ -0,0 +1,181 @@
+"""
+File Outline
+===============================
+This file records sessions of Python Alchemy and reads the recordings back. A recording holds the seed of
+the random number generator, the scene the session started in, the size of the screen, where the mouse
+was, and the events given to every frame the game loop ran. Playing a recording back feeds the same events
+to the same frames with the same seed, so the game does exactly what it did when it was recorded, which
+makes the frame times and combine latencies of different versions of the game comparable on the same
+workload.
+
+Recordings are written as JSON lines: a header object on the first line, then the list of events of each
+frame on a line of its own, so that a session that crashes still leaves every frame written before it.
+A session is recorded by running main.py with the PYTHON_ALCHEMY_RECORD environment variable set to the
+path of the recording, and played back headlessly with
+
+    python headless.py --replay session.jsonl
+
+Sessions that click Save or Load also write or read save.csv, so those are only reproduced if save.csv
+is the same when they are played back.
+
+Copyright and Usage Information
+===============================
+This file is provided solely for the private use of the teaching staff
+of CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited.
+
+This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjamin Gavriely
+"""
+from __future__ import annotations
+from typing import Any, Optional, TextIO
+import json
+import pygame
+
+# The version of the recording format, increased whenever it changes
+FORMAT_VERSION = 1
+
+
+def _to_json(value: Any) -> Any:
+    """
+    Returns value in a form json can write, or raises TypeError if it has none. Tuples become lists.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (tuple, list)):
+        return [_to_json(item) for item in value]
+    raise TypeError(f'{type(value).__name__} cannot be recorded')
+
+
+def _from_json(value: Any) -> Any:
+    """
+    Returns a value read back from _to_json, with lists turned back into tuples, as Pygame gives them.
+    """
+    if isinstance(value, list):
+        return tuple(_from_json(item) for item in value)
+    return value
+
+
+def event_to_json(event: pygame.event.Event) -> dict[str, Any]:
+    """
+    Returns event as a dictionary json can write. Attributes whose values cannot be written, such as the
+    window of a window event, are left out.
+    """
+    attributes = {}
+    for name, value in event.dict.items():
+        try:
+            attributes[name] = _to_json(value)
+        except TypeError:
+            continue
+    return {'type': event.type, 'name': pygame.event.event_name(event.type), 'attributes': attributes}
+
+
+def event_from_json(data: dict[str, Any]) -> pygame.event.Event:
+    """
+    Returns the event written as data by event_to_json.
+    """
+    return pygame.event.Event(data['type'], {name: _from_json(value) for name, value in data['attributes'].items()})
+
+
+class SessionRecorder:
+    """
+    Writes a recording of a session to a file as its frames are run.
+
+    Instance Attributes:
+    - path: The path of the recording.
+    - frames: The number of frames recorded.
+    - _file: The file the recording is written to, or None once it is closed.
+    """
+    path: str
+    frames: int
+    _file: Optional[TextIO]
+
+    def __init__(self, path: str, seed: int, scene: str, screen_size: tuple[int, int],
+                 pointer: tuple[int, int]) -> None:
+        """
+        Initialize a recorder, starting the recording at path with its header.
+
+        :param path: The path of the recording, which is overwritten.
+        :param seed: The seed the random number generator was given when the session started.
+        :param scene: The name of the scene the session starts in.
+        :param screen_size: The size of the screen.
+        :param pointer: The position of the mouse when the session starts.
+        """
+        self.path = path
+        self.frames = 0
+        # line buffered, so every frame is on disk as soon as it is recorded, even if the game is killed
+        self._file = open(path, 'w', encoding='utf-8', buffering=1)
+        header = {'version': FORMAT_VERSION, 'pygame': pygame.version.ver, 'seed': seed, 'scene': scene,
+                  'screen_size': list(screen_size), 'pointer': list(pointer)}
+        self._file.write(json.dumps(header) + '\n')
+
+    def record(self, events: list[pygame.event.Event]) -> None:
+        """
+        Adds a frame run with the given events to the recording.
+
+        Preconditions:
+        - self has not been closed
+        """
+        self._file.write(json.dumps([event_to_json(event) for event in events], separators=(',', ':')) + '\n')
+        self.frames += 1
+
+    def close(self) -> None:
+        """
+        Finishes the recording. Closing it again does nothing.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Session:
+    """
+    A recorded session, read back from a file.
+
+    Instance Attributes:
+    - seed: The seed the random number generator was given when the session started.
+    - scene: The name of the scene the session started in.
+    - screen_size: The size of the screen.
+    - pointer: The position of the mouse when the session started.
+    - frames: The events given to each frame of the session, in order.
+    """
+    seed: int
+    scene: str
+    screen_size: tuple[int, int]
+    pointer: tuple[int, int]
+    frames: list[list[pygame.event.Event]]
+
+    def __init__(self, seed: int, scene: str, screen_size: tuple[int, int], pointer: tuple[int, int],
+                 frames: list[list[pygame.event.Event]]) -> None:
+        """
+        Initialize a session from what was recorded.
+        """
+        self.seed = seed
+        self.scene = scene
+        self.screen_size = screen_size
+        self.pointer = pointer
+        self.frames = frames
+
+
+def load_session(path: str) -> Session:
+    """
+    Returns the session recorded at path. Raises ValueError if the file is not a recording in the current
+    format.
+    """
+    with open(path, encoding='utf-8') as file:
+        header = json.loads(file.readline() or 'null')
+        if not isinstance(header, dict) or header.get('version') != FORMAT_VERSION:
+            raise ValueError(f'{path} is not a recording in format version {FORMAT_VERSION}')
+        frames = [[event_from_json(data) for data in json.loads(line)] for line in file if line.strip()]
+    return Session(header['seed'], header['scene'], tuple(header['screen_size']), tuple(header['pointer']),
+                   frames)
+
+
+if __name__ == "__main__":
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['json', 'pygame'],
+        'allowed-io': ['SessionRecorder.__init__', 'load_session'],
+        'max-line-length': 120,
+        'no-member': False
+    })
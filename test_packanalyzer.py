@@ -0,0 +1,66 @@
+"""
+File Outline
+===============================
+This file contains the tests for packanalyzer.py. Run them with
+
+    python -m pytest test_packanalyzer.py
+
+Copyright and Usage Information
+===============================
+This file is provided solely for the private use of the teaching staff
+of CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited.
+
+This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjamin Gavriely
+"""
+from __future__ import annotations
+import json
+import os
+import shutil
+import pytest
+import packanalyzer
+import recipeloader
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# A pack where water and fire make steam, but mud and clay only make each other, so they are an island,
+# and steam is not used in any recipe, so it is a dead end
+SMALL_PACK = [{'NAME': 'Water', 'RECIPES': '$DEFAULT'}, {'NAME': 'Fire', 'RECIPES': '$DEFAULT'},
+              {'NAME': 'Steam', 'RECIPES': 'water, fire'}, {'NAME': 'Mud', 'RECIPES': 'clay, water'},
+              {'NAME': 'Clay', 'RECIPES': 'mud, fire'}]
+
+
+@pytest.mark.parametrize('pack', ['recipes.json', 'chemistry.json'])
+@pytest.mark.parametrize('workers', [1, 2, 3])
+def test_depths_match_graph(tmp_path: os.PathLike, pack: str, workers: int) -> None:
+    """
+    Test that the depths found by analyze are the crafting depths Graph finds, and that every element that
+    cannot be made is in exactly one island.
+    """
+    path = shutil.copy(os.path.join(HERE, pack), tmp_path)
+    report = packanalyzer.analyze(path, workers)
+    expected = recipeloader.load_graph(path).crafting_depths()
+
+    assert {name: depth for name, depth in zip(report.names, report.depths) if depth != packanalyzer.UNREACHED} \
+        == expected
+    unreached = sorted(id_ for id_, depth in enumerate(report.depths) if depth == packanalyzer.UNREACHED)
+    assert sorted(id_ for island in report.islands for id_ in island) == unreached
+
+
+def test_small_pack(tmp_path: os.PathLike) -> None:
+    """
+    Test every statistic of a pack small enough to check by hand.
+    """
+    path = os.path.join(tmp_path, 'small.json')
+    with open(path, 'w') as file:
+        json.dump(SMALL_PACK, file)
+    report = packanalyzer.analyze(path, 2)
+    ids = {name: id_ for id_, name in enumerate(report.names)}
+
+    assert {name: report.depths[id_] for name, id_ in ids.items()} \
+        == {'water': 0, 'fire': 0, 'steam': 1, 'mud': -1, 'clay': -1}
+    assert {name: (report.made[id_], report.used[id_]) for name, id_ in ids.items()} \
+        == {'water': (0, 2), 'fire': (0, 2), 'steam': (1, 0), 'mud': (1, 1), 'clay': (1, 1)}
+    assert [report.names[id_] for id_ in report.dead_ends()] == ['steam']
+    assert [sorted(report.names[id_] for id_ in island) for island in report.islands] == [['clay', 'mud']]
@@ -0,0 +1,543 @@
+"""
+File Outline
+===============================
+This file contains the tests for recipeloader.py. Run them with
+
+    python -m pytest test_recipeloader.py
+
+Copyright and Usage Information
+===============================
+This file is provided solely for the private use of the teaching staff
+of CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited.
+
+This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjamin Gavriely
+"""
+from __future__ import annotations
+from array import array
+import io
+import json
+import os
+import random
+import shutil
+from typing import Optional
+import pytest
+import recipeloader
+
+PACK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recipes.json')
+SECTIONS = ('offsets', 'defaults', 'conflicts', 'keys', 'results', 'name_index', 'blob')
+
+
+@pytest.fixture
+def pack(tmp_path: os.PathLike) -> str:
+    """
+    Returns the path of a copy of recipes.json in a temporary directory, so its cache is written there.
+    """
+    path = os.path.join(tmp_path, 'recipes.json')
+    shutil.copyfile(PACK, path)
+    return path
+
+
+def _corrupt(cache_path: str, position: int, data: bytes) -> None:
+    """
+    Overwrites the bytes of the cache file at cache_path from position with data.
+    """
+    with open(cache_path, 'r+b') as file:
+        file.seek(position)
+        file.write(data)
+
+
+def _section_ranges(cache_path: str) -> dict[str, tuple[int, int]]:
+    """
+    Returns the byte offset and size of every section of the cache file at cache_path, by section name.
+    """
+    sections = recipeloader._cache_sections(recipeloader._read_header(cache_path))
+    ranges = {}
+    for name in SECTIONS[:-1]:
+        typecode, position, length = sections[name]
+        ranges[name] = (position, length * array(typecode).itemsize)
+    blob = sections['blob'][1]
+    ranges['blob'] = (blob, os.path.getsize(cache_path) - blob)
+    return ranges
+
+
+def _exercise(graph: recipeloader.Graph) -> tuple:
+    """
+    Returns the results of the Graph queries that index the recipe tables, so that a table that is not
+    valid fails here rather than later in a game.
+    """
+    return (sorted(graph.get_vertices()), sorted(graph.downdate()), sorted(graph.recipes_for('steam')),
+            sorted(graph.craftable()), graph.crafting_depths())
+
+
+@pytest.mark.parametrize('section', SECTIONS)
+def test_corrupt_section_is_recompiled(pack: str, section: str) -> None:
+    """
+    Test that a cache with an invalid value at the start of any of its sections is not read, and that
+    load_graph compiles the pack again instead.
+    """
+    expected = _exercise(recipeloader.load_graph(pack, use_cache=False))
+    cache_path = recipeloader.compile_to_cache(pack)
+    position, size = _section_ranges(cache_path)[section]
+    assert size > 0
+    # every ID, offset and key with its top byte set is out of range, and 0xff is never valid UTF-8
+    _corrupt(cache_path, position, b'\xff' * min(size, 8))
+
+    assert recipeloader.read_cache(cache_path, pack) is None
+    assert _exercise(recipeloader.load_graph(pack)) == expected
+    assert recipeloader.read_cache(cache_path, pack) is not None
+
+
+@pytest.mark.parametrize('section', SECTIONS)
+def test_flipped_bytes_never_crash(pack: str, section: str) -> None:
+    """
+    Test that flipping random bytes of any section of the cache either makes load_graph compile the pack
+    again or gives a graph that can be queried.
+    """
+    rng = random.Random(section)
+    cache_path = recipeloader.compile_to_cache(pack)
+    with open(cache_path, 'rb') as file:
+        original = file.read()
+    position, size = _section_ranges(cache_path)[section]
+    for _ in range(50):
+        with open(cache_path, 'wb') as file:
+            file.write(original)
+        for _ in range(rng.randint(1, 3)):
+            flipped = position + rng.randrange(size)
+            _corrupt(cache_path, flipped, bytes([original[flipped] ^ (1 << rng.randrange(8))]))
+        _exercise(recipeloader.load_graph(pack))
+
+
+@pytest.mark.parametrize('section', SECTIONS)
+def test_corrupt_section_is_not_mapped(pack: str, section: str) -> None:
+    """
+    Test that MappedGraph refuses a cache with an invalid value at the start of any of its sections, and
+    that load_graph compiles the pack again instead.
+    """
+    cache_path = recipeloader.compile_to_cache(pack)
+    with recipeloader.MappedGraph(cache_path) as graph:
+        expected = sorted(graph.get_vertices())
+    position, size = _section_ranges(cache_path)[section]
+    _corrupt(cache_path, position, b'\xff' * min(size, 8))
+
+    with pytest.raises(ValueError):
+        recipeloader.MappedGraph(cache_path)
+    with recipeloader.load_graph(pack, recipeloader.MappedGraph) as graph:
+        assert sorted(graph.get_vertices()) == expected
+
+
+def test_truncated_cache_is_not_mapped(pack: str) -> None:
+    """
+    Test that MappedGraph refuses a cache file that is shorter than its header says.
+    """
+    cache_path = recipeloader.compile_to_cache(pack)
+    with open(cache_path, 'r+b') as file:
+        file.truncate(os.path.getsize(cache_path) // 2)
+    with pytest.raises(ValueError):
+        recipeloader.MappedGraph(cache_path)
+
+
+def test_failed_map_closes_file(pack: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that MappedGraph closes the cache file when the file cannot be mapped.
+    """
+    cache_path = recipeloader.compile_to_cache(pack)
+    opened = []
+
+    def open_and_keep(*args: object) -> object:
+        """Opens a file like open, and keeps it in opened."""
+        opened.append(open(*args))
+        return opened[-1]
+
+    def fail_to_map(*_: object, **__: object) -> None:
+        """Fails like mmap.mmap does when the address space is full."""
+        raise OSError('cannot map')
+
+    monkeypatch.setattr(recipeloader, 'open', open_and_keep, raising=False)
+    monkeypatch.setattr(recipeloader.mmap, 'mmap', fail_to_map)
+    with pytest.raises(OSError):
+        recipeloader.MappedGraph(cache_path)
+    assert opened and all(file.closed for file in opened)
+
+
+def _play(graph: object) -> list:
+    """
+    Plays the same game on graph, through the methods every engine has, and returns everything the graph
+    answered, with element IDs replaced by names so that engines that number the elements differently can
+    be compared.
+    """
+    rng = random.Random(4)
+    answers = [graph.snapshot(), graph.id_of('no such element'), graph.combine('water', 'fire'),
+               graph.combine('water', 'steam'), graph.combine('air', 'alien')]
+    for _ in range(20):
+        items = graph.downdate()
+        pairs = [(graph.id_of(rng.choice(items)), graph.id_of(rng.choice(items))) for _ in range(30)]
+        results, mask = graph.combine_many(pairs)
+        answers.append(([graph.name(id_) if id_ != -1 else None for id_ in results], list(mask)))
+    discovered = graph.snapshot()
+    with pytest.raises(ValueError):
+        graph.combine_many([(graph.id_of('water'), graph.id_of('fire')), (0, -1)])
+    answers.append(graph.snapshot() == discovered)
+
+    answers.append(graph.possible_new_combo('water', 'fire'))
+    answers.append(graph.possible_new_combo('earth', 'alien'))
+    graph.new_combo('earth', 'alien', 'martian soil')
+    answers.append(graph.possible_new_combo('alien', 'earth'))
+    answers.append('martian soil' in graph.get_vertices())
+    answers.append(graph.name(graph.id_of('martian soil')))
+    for item in ('steam', 'water', 'human', 'martian soil', 'no such element'):
+        answers.append(sorted(graph.recipes_for(item)))
+
+    graph.reset()
+    answers.append(graph.snapshot())
+    graph.restore(discovered)
+    answers.append(graph.snapshot())
+    graph.restore(list(graph.get_vertices()))
+    answers.append(graph.combine('alien', 'earth'))
+    graph.restore(['water', 'fire'])
+    answers.append(graph.snapshot())
+    return answers
+
+
+def test_engines_play_alike(pack: str) -> None:
+    """
+    Test that Graph, CompactGraph and MappedGraph give the same answers to the same game, so a caller of
+    load_graph can swap one engine for another.
+    """
+    with recipeloader.load_graph(pack, recipeloader.MappedGraph) as mapped:
+        mapped_answers = _play(mapped)
+    assert _play(recipeloader.load_graph(pack)) == mapped_answers
+    assert _play(recipeloader.load_graph(pack, recipeloader.CompactGraph)) == mapped_answers
+    assert _play(recipeloader.load_graph(pack, use_cache=False)) == mapped_answers
+    assert _play(recipeloader.load_graph(pack, recipeloader.CompactGraph, use_cache=False)) == mapped_answers
+
+
+def _table_contents(table: recipeloader._PackTable) -> tuple:
+    """
+    Returns the contents of table as plain values, for comparing tables.
+    """
+    return (table.names, list(table.defaults), list(table.keys), list(table.results), list(table.conflicts))
+
+
+def test_cache_round_trip(pack: str) -> None:
+    """
+    Test that reading a cache gives back the table that was written, and that a graph loaded from the cache
+    is the graph loaded from the JSON.
+    """
+    table = recipeloader.compile_pack(pack)
+    cache_path = recipeloader.cache_path_for(pack)
+    recipeloader.write_cache(table, cache_path, pack)
+
+    assert _table_contents(recipeloader.read_cache(cache_path, pack)) == _table_contents(table)
+    assert _exercise(recipeloader.load_graph(pack)) == _exercise(recipeloader.load_graph(pack, use_cache=False))
+    assert os.listdir(os.path.dirname(cache_path)) == [os.path.basename(cache_path)]
+
+
+def test_round_trip_keeps_names_and_conflicts(tmp_path: os.PathLike) -> None:
+    """
+    Test that names that are not ASCII and recipes that replace earlier ones survive the cache.
+    """
+    path = os.path.join(tmp_path, 'pack.json')
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump([{'NAME': 'Eau', 'RECIPES': '$DEFAULT'}, {'NAME': 'Feu', 'RECIPES': '$DEFAULT'},
+                   {'NAME': 'Vapeur', 'RECIPES': 'eau, feu'}, {'NAME': 'Café', 'RECIPES': 'feu, eau'},
+                   {'NAME': '蒸気', 'RECIPES': 'vapeur, café'}], file, ensure_ascii=False)
+    table = recipeloader.compile_pack(path)
+    recipeloader.write_cache(table, recipeloader.cache_path_for(path), path)
+
+    cached = recipeloader.load_graph(path)
+    assert _table_contents(recipeloader.read_cache(recipeloader.cache_path_for(path), path)) \
+        == _table_contents(table)
+    assert cached.conflicts == [('eau', 'feu', 'vapeur', 'café')]
+    assert sorted(cached.recipes_for('蒸気')) == [('vapeur', 'café')]
+    with recipeloader.load_graph(path, recipeloader.MappedGraph) as mapped:
+        assert mapped.id_of('蒸気') == cached.id_of('蒸気') != -1
+        assert mapped.conflicts == cached.conflicts
+
+
+def test_changed_source_is_compiled_again(pack: str) -> None:
+    """
+    Test that a cache is out of date once its source changes, and that load_graph then loads the new pack
+    and writes a new cache.
+    """
+    cache_path = recipeloader.compile_to_cache(pack)
+    with open(pack) as file:
+        rows = json.load(file)
+    rows.append({'NAME': 'Martian Soil', 'RECIPES': 'earth, alien'})
+    with open(pack, 'w') as file:
+        json.dump(rows, file)
+
+    assert not recipeloader.cache_is_current(cache_path, pack)
+    assert recipeloader.read_cache(cache_path, pack) is None
+    assert recipeloader.load_graph(pack).recipes_for('martian soil') == [('alien', 'earth')]
+    assert recipeloader.cache_is_current(cache_path, pack)
+
+
+def test_touched_source_is_restamped(pack: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that a source that was touched without being changed keeps its cache, and that the cache is
+    stamped again so the source is only hashed once.
+    """
+    cache_path = recipeloader.compile_to_cache(pack)
+    with open(cache_path, 'rb') as file:
+        before = file.read()
+    stat = os.stat(pack)
+    os.utime(pack, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    hashed = []
+    source_hash = recipeloader._source_hash
+    monkeypatch.setattr(recipeloader, '_source_hash', lambda path: hashed.append(path) or source_hash(path))
+    assert recipeloader.cache_is_current(cache_path, pack)
+    assert recipeloader.cache_is_current(cache_path, pack)
+    assert hashed == [pack]
+
+    header = recipeloader._read_header(cache_path)
+    assert header[2:4] == recipeloader._source_stamp(pack)
+    with open(cache_path, 'rb') as file:
+        after = file.read()
+    # only the modification time in the header changed
+    assert after[:8] == before[:8] and after[24:] == before[24:]
+
+
+def test_failed_write_leaves_no_temporary_file(pack: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that a cache write that fails removes its temporary file and leaves the old cache in place.
+    """
+    cache_path = recipeloader.compile_to_cache(pack)
+    with open(cache_path, 'rb') as file:
+        before = file.read()
+
+    def fail(*_: object) -> None:
+        """Fails like os.replace does on a full disk."""
+        raise OSError('no space left on device')
+
+    monkeypatch.setattr(recipeloader.os, 'replace', fail)
+    with pytest.raises(OSError):
+        recipeloader.write_cache(recipeloader.compile_pack(pack), cache_path, pack)
+    assert os.listdir(os.path.dirname(cache_path)) == [os.path.basename(cache_path)]
+    with open(cache_path, 'rb') as file:
+        assert file.read() == before
+
+
+def _random_value(rng: random.Random, depth: int = 0) -> object:
+    """
+    Returns a random JSON value, with strings that hold the characters the streaming parser looks for.
+    """
+    kind = rng.randrange(7 if depth < 3 else 5)
+    if kind == 0:
+        return rng.choice([0, -7, 12345678901234567890, 1.5e-300, -0.25, 3e20])
+    elif kind == 1:
+        return rng.choice([True, False, None])
+    elif kind in (2, 3, 4):
+        return ''.join(rng.choice(['a', ' ', ',', ']', '[', '{', '"', '\\', '\n', 'é', '蒸', '\U0001f525', '$'])
+                       for _ in range(rng.randrange(12)))
+    elif kind == 5:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    else:
+        return {_random_value(rng, 3): _random_value(rng, depth + 1) for _ in range(rng.randrange(4))}
+
+
+def _random_array_text(rng: random.Random) -> str:
+    """
+    Returns a random JSON array, formatted in one of the ways json.dump can format it.
+    """
+    values = [_random_value(rng) for _ in range(rng.randrange(8))]
+    layout = rng.choice([{}, {'indent': 1}, {'indent': '\t'}, {'separators': (',', ':')},
+                         {'ensure_ascii': False}])
+    return rng.choice(['', ' ', '\n']) + json.dumps(values, **layout) + rng.choice(['', '\n', ' \r\n '])
+
+
+def _parse(text: str, chunk_size: int) -> list:
+    """
+    Returns the values iter_json_array yields for text, read chunk_size characters at a time.
+    """
+    return list(recipeloader.iter_json_array(io.StringIO(text), chunk_size))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 1 << 16])
+def test_iter_json_array_matches_json(chunk_size: int) -> None:
+    """
+    Test that iter_json_array yields the values json.loads finds in random arrays, whatever the chunk size.
+    """
+    rng = random.Random(chunk_size)
+    for _ in range(200):
+        text = _random_array_text(rng)
+        assert _parse(text, chunk_size) == json.loads(text)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 64])
+def test_iter_json_array_rejects_what_json_rejects(chunk_size: int) -> None:
+    """
+    Test that iter_json_array raises json.JSONDecodeError for every prefix of random arrays that json.loads
+    rejects, and for arrays followed by anything but whitespace.
+    """
+    rng = random.Random(chunk_size)
+    for _ in range(40):
+        text = _random_array_text(rng)
+        for end in range(len(text)):
+            try:
+                expected = json.loads(text[:end])
+            except json.JSONDecodeError:
+                with pytest.raises(json.JSONDecodeError):
+                    _parse(text[:end], chunk_size)
+            else:
+                assert _parse(text[:end], chunk_size) == expected
+    for text in ('', '{}', '1', '"[]"', '[1 2]', '[1,]', '[,1]', '[1,,2]', '[tru]', '[1] 2', '[1]]', '[1],',
+                 '[] []', '[]\n\n\nx', '[1]' + ' ' * 200 + ','):
+        with pytest.raises(json.JSONDecodeError):
+            _parse(text, chunk_size)
+
+
+def _random_graph(rng: random.Random, n_elements: int, n_recipes: int) -> recipeloader.Graph:
+    """
+    Returns a Graph of a random pack with n_elements elements, four of them $DEFAULT, and about n_recipes
+    recipes between random elements, so that some elements cannot be made and some recipes conflict.
+    """
+    rows = [{'NAME': f'e{i}', 'RECIPES': '$DEFAULT'} for i in range(4)]
+    recipes = {}
+    for _ in range(n_recipes):
+        recipes.setdefault(rng.randrange(4, n_elements), []).append(
+            f'e{rng.randrange(n_elements)}, e{rng.randrange(n_elements)}')
+    rows.extend({'NAME': f'e{i}', 'RECIPES': ' / '.join(recipes[i])} for i in sorted(recipes))
+    return recipeloader.Graph(io.StringIO(json.dumps(rows)))
+
+
+def _result_of(graph: recipeloader.Graph, item1: str, item2: str) -> Optional[str]:
+    """
+    Returns the element item1 and item2 make in graph, or None, without discovering it.
+    """
+    vertices = graph.get_vertices()
+    vertex = graph._recipes.get(recipeloader._pair_key(vertices[item1].id, vertices[item2].id))
+    return None if vertex is None else vertex.item
+
+
+def _brute_force_craftable(graph: recipeloader.Graph) -> tuple[set, int]:
+    """
+    Returns the recipes of graph that make an undiscovered element from two discovered ones, found by trying
+    every pair of discovered elements, and the number of undiscovered elements that repeated combining
+    could discover.
+    """
+    discovered = graph.downdate()
+    craftable = set()
+    for i, item1 in enumerate(discovered):
+        for item2 in discovered[i:]:
+            result = _result_of(graph, item1, item2)
+            if result is not None and result not in discovered:
+                craftable.add((frozenset((item1, item2)), result))
+    reached, changed = set(discovered), True
+    while changed:
+        changed = False
+        for item1 in list(reached):
+            for item2 in list(reached):
+                result = _result_of(graph, item1, item2)
+                if result is not None and result not in reached:
+                    reached.add(result)
+                    changed = True
+    return craftable, len(reached) - len(discovered)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_craftable_matches_brute_force(seed: int) -> None:
+    """
+    Test that the craftable recipes and the number of elements left to discover are those found by trying
+    every pair, after each step of a random game of combine, new_combo, add_edge, update and restore.
+    """
+    rng = random.Random(seed)
+    graph = _random_graph(rng, rng.choice([20, 40, 60]), rng.choice([80, 160, 320]))
+    for step in range(120):
+        items, discovered = list(graph.get_vertices()), graph.downdate()
+        craftable = list(graph.craftable())
+        action = rng.random()
+        if action < 0.3 and craftable:
+            graph.combine(*rng.choice(craftable)[:2])
+        elif action < 0.55:
+            graph.combine(rng.choice(discovered), rng.choice(discovered))
+        elif action < 0.65:
+            graph.new_combo(rng.choice(items), rng.choice(items), rng.choice(items + [f'new {step}']))
+        elif action < 0.72:
+            # may replace an existing recipe
+            graph.add_edge(rng.choice(items), rng.choice(items), rng.choice(items))
+        elif action < 0.8:
+            graph.update(discovered + rng.sample(items, 3))
+        elif action < 0.85:
+            graph.restore(graph.snapshot()[:rng.randrange(1, len(discovered) + 1)])
+        if step % 3 == 0:
+            craftable, remaining = _brute_force_craftable(graph)
+            assert {(frozenset((item1, item2)), result) for item1, item2, result in graph.craftable()} == craftable
+            assert graph.craftable_count() == len(craftable)
+            assert graph.remaining_discoverable() == remaining
+
+
+def _brute_force_costs(graph: recipeloader.Graph, sources: list, additive: bool) -> dict[int, int]:
+    """
+    Returns the cost of making each element of graph that can be made from sources, found by lowering the
+    costs through every recipe until none of them change, where an element costs 1 more than the total of
+    its inputs' costs (if additive) or the larger of them (if not).
+    """
+    costs, changed = {vertex.id: 0 for vertex in sources}, True
+    while changed:
+        changed = False
+        for key, vertex in graph._recipes.items():
+            cost1, cost2 = costs.get(key >> 32), costs.get(key & 0xFFFFFFFF)
+            if cost1 is None or cost2 is None:
+                continue
+            cost = cost1 + cost2 + 1 if additive else max(cost1, cost2) + 1
+            if cost < costs.get(vertex.id, cost + 1):
+                costs[vertex.id] = cost
+                changed = True
+    return costs
+
+
+def _check_crafting(graph: recipeloader.Graph) -> None:
+    """
+    Checks the crafting depths and plans of graph against the costs found by brute force.
+    """
+    vertices = graph.get_vertices()
+    by_id = {vertex.id: name for name, vertex in vertices.items()}
+    depths = _brute_force_costs(graph, list(graph._defaults), False)
+    assert graph.crafting_depths() == {by_id[id_]: depth for id_, depth in depths.items()}
+
+    costs = _brute_force_costs(graph, list(graph.discovered), True)
+    for name, vertex in vertices.items():
+        assert graph.crafting_depth(name) == depths.get(vertex.id)
+        plan = graph.crafting_plan(name)
+        if vertex.id not in costs:
+            assert plan is None
+            continue
+        assert graph._plans.costs[vertex.id] == costs[vertex.id]
+        made = set(graph.downdate())
+        for item1, item2, result in plan:
+            assert item1 in made and item2 in made and _result_of(graph, item1, item2) == result
+            made.add(result)
+        assert name in made and len(plan) <= costs[vertex.id]
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_crafting_matches_brute_force(seed: int) -> None:
+    """
+    Test that the crafting depths, and the costs and steps of the crafting plans, match the costs found by
+    brute force after each step of a random game of combine, new_combo, add_edge and restore, which lower
+    the costs found so far or have them found again from scratch.
+    """
+    rng = random.Random(seed)
+    graph = _random_graph(rng, rng.choice([20, 40, 60]), rng.choice([40, 80, 160]))
+    for step in range(80):
+        items, discovered = list(graph.get_vertices()), graph.downdate()
+        action = rng.random()
+        if action < 0.35:
+            craftable = list(graph.craftable())
+            if craftable:
+                graph.combine(*rng.choice(craftable)[:2])
+        elif action < 0.5:
+            graph.combine(rng.choice(discovered), rng.choice(discovered))
+        elif action < 0.7:
+            graph.new_combo(rng.choice(items), rng.choice(items), rng.choice(items + [f'new {step}']))
+        elif action < 0.8:
+            # may replace an existing recipe, so the costs are found again from scratch
+            graph.add_edge(rng.choice(items), rng.choice(items), rng.choice(items))
+        elif action < 0.9:
+            graph.restore(graph.snapshot()[:rng.randrange(1, len(discovered) + 1)])
+        if step % 4 == 0:
+            _check_crafting(graph)
+    _check_crafting(graph)
@@ -0,0 +1,98 @@
+"""
+File Outline
+===============================
+This file contains the tests for the outlined label cache in rendercache.py and its use by main.Element.
+They draw with SDL's dummy video driver, so they need no display. Run them with
+
+    python -m pytest test_rendercache.py
+
+Copyright and Usage Information
+===============================
+This file is provided solely for the private use of the teaching staff
+of CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited.
+
+This file is Copyright (c) 2024 Omid Hemmati, Yianni Culmone, Neyl Nasr, Benjamin Gavriely
+"""
+from __future__ import annotations
+import os
+from typing import Iterator
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+import pytest
+import main
+import rendercache
+
+
+@pytest.fixture
+def font() -> Iterator[pygame.font.Font]:
+    """
+    Returns the font of the play scene's elements, with empty caches.
+    """
+    pygame.font.init()
+    rendercache.clear()
+    yield rendercache.get_font('Roboto-Regular.ttf', 24)
+    rendercache.clear()
+
+
+def test_repeated_label_is_cached(font: pygame.font.Font) -> None:
+    """
+    Test that outlining the same label with the same font and colours again returns the surface composed
+    the first time, and counts as a hit.
+    """
+    before = rendercache.OUTLINE_CACHE.stats()
+    first = rendercache.render_outlined(font, 'Water', 'White', pygame.Color('black'), 1)
+    second = rendercache.render_outlined(font, 'Water', pygame.Color('white'), 'black', 1)
+    after = rendercache.OUTLINE_CACHE.stats()
+
+    assert second is first
+    assert (after['hits'] - before['hits'], after['misses'] - before['misses']) == (1, 1)
+
+
+def test_different_labels_are_not_shared(font: pygame.font.Font) -> None:
+    """
+    Test that a label with different text, colours or outline width is composed separately.
+    """
+    label = rendercache.render_outlined(font, 'Water', 'White', 'black', 1)
+    others = [rendercache.render_outlined(font, 'Fire', 'White', 'black', 1),
+              rendercache.render_outlined(font, 'Water', 'Red', 'black', 1),
+              rendercache.render_outlined(font, 'Water', 'White', 'blue', 1),
+              rendercache.render_outlined(font, 'Water', 'White', 'black', 2)]
+    assert all(other is not label for other in others)
+    assert others[3].get_size() == (label.get_width() + 2, label.get_height() + 2)
+
+
+def test_elements_share_their_label(font: pygame.font.Font) -> None:
+    """
+    Test that elements spawned with the same label, font and colours share one outlined label, like the
+    elements spawned by clicking the same sidebar item twice.
+    """
+    first = main.Element(400, 300, 140, 45, 'Water', font, 'White', 'Blue')
+    second = main.Element(100, 200, 140, 45, 'Water', font, 'White', 'Blue')
+    other = main.Element(400, 300, 140, 45, 'Fire', font, 'White', 'Blue')
+
+    assert second.text_surface is first.text_surface
+    assert other.text_surface is not first.text_surface
+
+
+def test_least_recently_used_label_is_evicted(font: pygame.font.Font) -> None:
+    """
+    Test that a full cache evicts the label used least recently, not the one just looked up again.
+    """
+    cache = rendercache.OUTLINE_CACHE
+    budget = cache.max_size
+    # the same text in different colours, so that every label is the same size
+    white = rendercache.render_outlined(font, 'Water', 'White', 'black', 1)
+    red = rendercache.render_outlined(font, 'Water', 'Red', 'black', 1)
+    try:
+        cache.max_size = cache.size
+        rendercache.render_outlined(font, 'Water', 'White', 'black', 1)
+        rendercache.render_outlined(font, 'Water', 'Blue', 'black', 1)
+        assert rendercache.render_outlined(font, 'Water', 'White', 'black', 1) is white
+        assert rendercache.render_outlined(font, 'Water', 'Red', 'black', 1) is not red
+    finally:
+        cache.max_size = budget